@@ -0,0 +1,448 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
+
+import yaml
+
+from observability.metrics import llm_usage
+from tools.llm_scheduler import llm_priority
+
+_log = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("ASK_WORKERS", "16"))
+# two_pass: paralegal draft, then the router (heuristics, else LLM judge)
+# single_pass: one structured call drafts and self-scores; the judge call is skipped
+PIPELINES = ("two_pass", "single_pass")
+BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "4"))
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="ask")
+    return _pool
+
+
+def _load_routing_cfg() -> Dict[str, Any]:
+    cfg_path = os.path.join(os.path.dirname(__file__), "..", "configs", "routing.yaml")
+    with open(os.path.normpath(cfg_path), "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def compact_sources(ctx: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Prepare compact sources from retrieval context; score is always the vector similarity
+    out = []
+    for c in ctx:
+        src = {
+            "source": c.get("source", ""),
+            "section": c.get("section", ""),
+            "score": c.get("score", 0.0),
+            "text": c.get("text", ""),
+        }
+        if "fused_score" in c:
+            src["fused_score"] = c["fused_score"]
+        out.append(src)
+    return out
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], name: str):
+    # Wall time in ms, plus token counts of any Ollama calls made inside the stage
+    start = time.perf_counter()
+    with llm_usage() as usage:
+        try:
+            yield
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+            for k, v in usage.items():
+                timings[f"{name}_{k}"] = v
+
+
+class AskOrchestrator:
+    """Runs the /ask pipeline, overlapping stages that don't depend on each other.
+
+    - The query embedding runs on the shared pool while the retriever
+      connection is prepared on the calling thread.
+    - With ``web_fallback.speculative`` enabled in configs/routing.yaml, the
+      Firecrawl search starts right after retrieval when the router expects
+      the web to be needed (freshness keywords or weak retrieval) and runs
+      alongside drafting and judging; its result is discarded if the verdict
+      passes. Firecrawl bills the search either way.
+    - ``pipeline`` (per request, default ``pipeline.mode`` in routing.yaml)
+      selects two_pass or single_pass drafting/judging.
+
+    Every stage records its wall time (ms) in ``timings``; LLM stages also
+    report prompt_chars, prompt_tokens, completion_tokens and prompt_eval_ms.
+    """
+
+    def __init__(
+        self,
+        retriever,
+        paralegal,
+        router,
+        synthesizer,
+        firecrawl,
+        packer=None,
+        speculative_web: Optional[bool] = None,
+        pipeline: Optional[str] = None,
+    ):
+        self.retriever = retriever
+        self.packer = packer
+        self.paralegal = paralegal
+        self.router = router
+        self.synthesizer = synthesizer
+        self.firecrawl = firecrawl
+        cfg = _load_routing_cfg()
+        if speculative_web is None:
+            speculative_web = bool((cfg.get("web_fallback") or {}).get("speculative", False))
+        self.speculative_web = speculative_web
+        pipeline_cfg = cfg.get("pipeline") or {}
+        self.pipeline = pipeline or str(pipeline_cfg.get("mode", "two_pass"))
+        if self.pipeline not in PIPELINES:
+            raise ValueError(f"routing.yaml: pipeline.mode must be one of {', '.join(PIPELINES)}")
+        # Full JSON schema needs Ollama >= 0.5; "json" only asks for valid JSON
+        self.json_schema = str(pipeline_cfg.get("format", "schema")) == "schema"
+
+    def _web(self, query: str, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        with _timed(timings, "web_search"):
+            try:
+                return self.firecrawl.search_and_extract(query)
+            except Exception as e:
+                _log.exception("Web search failed: %s", e)
+                return []
+
+    def run(
+        self,
+        query: str,
+        cache=None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[Dict[str, Any]] = None,
+        pipeline: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Run the whole pipeline and return the /ask response payload."""
+        for event, data in self.events(query, cache=cache, filters=filters, search=search, pipeline=pipeline):
+            if event == "done":
+                return data
+        raise RuntimeError("ask pipeline ended without a result")
+
+    def run_batch(
+        self,
+        queries: List[str],
+        cache=None,
+        filters: Optional[Dict[str, Any]] = None,
+        concurrency: Optional[int] = None,
+        search: Optional[Dict[str, Any]] = None,
+        pipeline: Optional[str] = None,
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Answer many queries, yielding ``(index, payload)`` as each one completes.
+
+        All queries are embedded in one batched call and retrieved with one
+        multi-vector Milvus search; the agent stages then run with at most
+        ``concurrency`` (ASK_BATCH_CONCURRENCY) queries in flight. Speculative
+        web search is not used here. A failed query yields ``{"error": ...}``.
+        """
+        shared: Dict[str, float] = {}
+        start = time.perf_counter()
+        with _timed(shared, "batch_embed"):
+            self.retriever.prepare()
+            vectors = self.retriever.embed_queries(queries)
+        with _timed(shared, "batch_retrieve"):
+            contexts = self.retriever.retrieve_many(queries, vectors=vectors, filters=filters, search=search)
+
+        def answer(i: int) -> Dict[str, Any]:
+            timings = dict(shared)
+            # Batch LLM calls queue behind interactive /ask traffic instead of being shed
+            with llm_priority("batch"):
+                for event, data in self._answer(queries[i], vectors[i], contexts[i], cache, False, timings, start, pipeline, speculative=False):
+                    if event == "done":
+                        return data
+            raise RuntimeError("ask pipeline ended without a result")
+
+        workers = max(1, min(concurrency or BATCH_CONCURRENCY, len(queries)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ask-batch")
+        try:
+            futures = {pool.submit(answer, i): i for i in range(len(queries))}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    yield i, fut.result()
+                except Exception as e:
+                    _log.exception("Batch query %d failed: %s", i, e)
+                    yield i, {"error": str(e)}
+        finally:
+            # Consumer went away (e.g. client disconnected): don't start the queries still queued
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def events(
+        self,
+        query: str,
+        cache=None,
+        stream: bool = False,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[Dict[str, Any]] = None,
+        pipeline: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (event, data) pairs: retrieved, drafted, judged, web, token (stream only), done."""
+        pool = _get_pool()
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        # 1) embed the query while the Milvus connection is set up
+        with _timed(timings, "embed"):
+            embed_future = pool.submit(self.retriever.embed_query, query)
+            self.retriever.prepare()
+            vec = embed_future.result()
+
+        # 2) retrieve context
+        with _timed(timings, "retrieve"):
+            ctx = self.retriever.retrieve(query, vector=vec, filters=filters, search=search)
+
+        yield from self._answer(query, vec, ctx, cache, stream, timings, start, pipeline)
+
+    def _answer(
+        self,
+        query: str,
+        vec: List[float],
+        ctx: List[Dict[str, Any]],
+        cache,
+        stream: bool,
+        timings: Dict[str, float],
+        start: float,
+        pipeline: Optional[str] = None,
+        speculative: bool = True,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Everything after retrieval: pack, cache check, draft, judge, web, synthesize."""
+        # 3) dedup, merge, rerank and fit the context to the prompt budget
+        if self.packer is not None:
+            with _timed(timings, "pack"):
+                ctx = self.packer.pack(query, ctx)
+        yield "retrieved", {"sources": compact_sources(ctx)}
+
+        # Near-identical question over the same sources: reuse the stored answer
+        cached = self._cached(vec, ctx, cache, timings, start)
+        if cached is not None:
+            yield "done", cached
+            return
+
+        web_future: Optional[Future] = None
+        if speculative and self.speculative_web and self.router.web_likely(query, ctx):
+            web_future = _get_pool().submit(self._web, query, timings)
+
+        try:
+            # 4) draft answer (single_pass: with a self-assessment the router can use instead of the judge)
+            with _timed(timings, "draft"):
+                if (pipeline or self.pipeline) == "single_pass":
+                    draft = self.paralegal.draft_and_assess(query, ctx, schema=self.json_schema)
+                else:
+                    draft = self.paralegal.generate(query, ctx)
+            yield "drafted", {"text": draft.get("text", "")}
+
+            # 5) route/judge
+            with _timed(timings, "judge"):
+                verdict = self.router.route(query, draft, ctx)
+            yield "judged", {"routing": verdict}
+
+            # 6) web search fallback
+            web_ctx: List[Dict[str, Any]] = []
+            if not verdict.get("pass", False):
+                with _timed(timings, "web_wait"):
+                    web_ctx = web_future.result() if web_future is not None else self._web(query, timings)
+                yield "web", {"web_sources": web_ctx}
+
+            # 7) synthesize
+            with _timed(timings, "synthesize"):
+                if stream:
+                    parts = []
+                    for token in self.synthesizer.synthesize_stream(query, ctx, web_ctx, draft, verdict):
+                        parts.append(token)
+                        yield "token", {"text": token}
+                    final = {"text": "".join(parts), "citations": self.synthesizer.citations(ctx, web_ctx)}
+                else:
+                    final = self.synthesizer.synthesize(query, ctx, web_ctx, draft, verdict)
+            yield "done", self._respond(vec, ctx, web_ctx, verdict, final, cache, timings, start)
+        finally:
+            # Verdict passed (or the request failed): drop the speculative result
+            if web_future is not None and not web_future.done():
+                web_future.cancel()
+
+    def _cached(self, vec, ctx, cache, timings: Dict[str, float], start: float) -> Optional[Dict[str, Any]]:
+        hit = cache.lookup(vec, ctx) if cache is not None else None
+        if hit is None:
+            return None
+        payload, similarity = hit
+        timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+        payload.update(sources=compact_sources(ctx), timings=timings, cache={"hit": True, "similarity": round(similarity, 4)})
+        return payload
+
+    def _respond(self, vec, ctx, web_ctx, verdict, final, cache, timings: Dict[str, float], start: float) -> Dict[str, Any]:
+        timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+        resp = {
+            "answer": final.get("text", ""),
+            "citations": final.get("citations", []),
+            "sources": compact_sources(ctx),
+            "web_sources": web_ctx,
+            "routing": verdict,
+            "timings": dict(final.get("timings", {}), **timings),
+        }
+        if cache is not None:
+            cache.store(vec, ctx, resp)
+        return dict(resp, cache={"hit": False})
+
+    # Async path (asgi.py): same stages and events, awaiting the a* methods of the agents and clients.
+    # Concurrent work runs as tasks on the event loop instead of on the "ask" thread pool.
+
+    async def _aweb(self, query: str, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        with _timed(timings, "web_search"):
+            try:
+                return await self.firecrawl.asearch_and_extract(query)
+            except Exception as e:
+                _log.exception("Web search failed: %s", e)
+                return []
+
+    async def arun(
+        self,
+        query: str,
+        cache=None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[Dict[str, Any]] = None,
+        pipeline: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        async for event, data in self.aevents(query, cache=cache, filters=filters, search=search, pipeline=pipeline):
+            if event == "done":
+                return data
+        raise RuntimeError("ask pipeline ended without a result")
+
+    async def arun_batch(
+        self,
+        queries: List[str],
+        cache=None,
+        filters: Optional[Dict[str, Any]] = None,
+        concurrency: Optional[int] = None,
+        search: Optional[Dict[str, Any]] = None,
+        pipeline: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """run_batch() for coroutines: up to ``concurrency`` queries in flight as tasks."""
+        shared: Dict[str, float] = {}
+        start = time.perf_counter()
+        with _timed(shared, "batch_embed"):
+            await asyncio.to_thread(self.retriever.prepare)
+            vectors = await self.retriever.aembed_queries(queries)
+        with _timed(shared, "batch_retrieve"):
+            contexts = await self.retriever.aretrieve_many(queries, vectors=vectors, filters=filters, search=search)
+
+        sem = asyncio.Semaphore(max(1, min(concurrency or BATCH_CONCURRENCY, len(queries))))
+
+        async def answer(i: int) -> Tuple[int, Dict[str, Any]]:
+            async with sem:
+                timings = dict(shared)
+                try:
+                    with llm_priority("batch"):
+                        async for event, data in self._aanswer(queries[i], vectors[i], contexts[i], cache, False, timings, start, pipeline, speculative=False):
+                            if event == "done":
+                                return i, data
+                    raise RuntimeError("ask pipeline ended without a result")
+                except Exception as e:
+                    _log.exception("Batch query %d failed: %s", i, e)
+                    return i, {"error": str(e)}
+
+        tasks = [asyncio.ensure_future(answer(i)) for i in range(len(queries))]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            # Consumer went away (e.g. client disconnected): cancel what is still running
+            for t in tasks:
+                t.cancel()
+
+    async def aevents(
+        self,
+        query: str,
+        cache=None,
+        stream: bool = False,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[Dict[str, Any]] = None,
+        pipeline: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """events() for coroutines."""
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        with _timed(timings, "embed"):
+            embed_task = asyncio.ensure_future(self.retriever.aembed_query(query))
+            await asyncio.to_thread(self.retriever.prepare)
+            vec = await embed_task
+
+        with _timed(timings, "retrieve"):
+            ctx = await self.retriever.aretrieve(query, vector=vec, filters=filters, search=search)
+
+        async for item in self._aanswer(query, vec, ctx, cache, stream, timings, start, pipeline):
+            yield item
+
+    async def _aanswer(
+        self,
+        query: str,
+        vec: List[float],
+        ctx: List[Dict[str, Any]],
+        cache,
+        stream: bool,
+        timings: Dict[str, float],
+        start: float,
+        pipeline: Optional[str] = None,
+        speculative: bool = True,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        # Packing and the answer cache are CPU-bound and take locks: keep them off the event loop
+        if self.packer is not None:
+            with _timed(timings, "pack"):
+                ctx = await asyncio.to_thread(self.packer.pack, query, ctx)
+        yield "retrieved", {"sources": compact_sources(ctx)}
+
+        cached = await asyncio.to_thread(self._cached, vec, ctx, cache, timings, start)
+        if cached is not None:
+            yield "done", cached
+            return
+
+        web_task: Optional[asyncio.Task] = None
+        if speculative and self.speculative_web and self.router.web_likely(query, ctx):
+            web_task = asyncio.ensure_future(self._aweb(query, timings))
+
+        try:
+            with _timed(timings, "draft"):
+                if (pipeline or self.pipeline) == "single_pass":
+                    draft = await self.paralegal.adraft_and_assess(query, ctx, schema=self.json_schema)
+                else:
+                    draft = await self.paralegal.agenerate(query, ctx)
+            yield "drafted", {"text": draft.get("text", "")}
+
+            with _timed(timings, "judge"):
+                verdict = await self.router.aroute(query, draft, ctx)
+            yield "judged", {"routing": verdict}
+
+            web_ctx: List[Dict[str, Any]] = []
+            if not verdict.get("pass", False):
+                with _timed(timings, "web_wait"):
+                    web_ctx = await web_task if web_task is not None else await self._aweb(query, timings)
+                yield "web", {"web_sources": web_ctx}
+
+            with _timed(timings, "synthesize"):
+                if stream:
+                    parts = []
+                    async for token in self.synthesizer.asynthesize_stream(query, ctx, web_ctx, draft, verdict):
+                        parts.append(token)
+                        yield "token", {"text": token}
+                    final = {"text": "".join(parts), "citations": self.synthesizer.citations(ctx, web_ctx)}
+                else:
+                    final = await self.synthesizer.asynthesize(query, ctx, web_ctx, draft, verdict)
+            yield "done", await asyncio.to_thread(self._respond, vec, ctx, web_ctx, verdict, final, cache, timings, start)
+        finally:
+            if web_task is not None and not web_task.done():
+                web_task.cancel()
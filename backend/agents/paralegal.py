@@ -1,41 +1,112 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import re
+import json
+import logging
 import textwrap
 
-from tools.ollama_client import generate as ollama_generate
+from tools.ollama_client import generate as ollama_generate, agenerate as ollama_agenerate
+from .prompts import DRAFT_INSTRUCTIONS, assemble
 
+_log = logging.getLogger(__name__)
 
-def _format_context(ctx: List[Dict[str, Any]]) -> str:
-    lines = []
-    for i, c in enumerate(ctx, 1):
-        src = c.get("source") or ""
-        sec = c.get("section") or ""
-        txt = c.get("text") or ""
-        lines.append(f"[{i}] source={src} section={sec}\n{txt}")
-    return "\n\n".join(lines[:20])
+_DIMENSIONS = ["coverage", "grounding", "citations", "freshness"]
+_DRAFT_KEY = re.compile(r'"draft"\s*:\s*"')
+
+# Output schema for the single-pass mode: the draft comes first so the scores assess text already written
+DRAFT_AND_ASSESS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "draft": {"type": "string"},
+        "scores": {
+            "type": "object",
+            "properties": {k: {"type": "integer", "minimum": 0, "maximum": 5} for k in _DIMENSIONS},
+            "required": _DIMENSIONS,
+        },
+        "pass": {"type": "boolean"},
+        "notes": {"type": "string"},
+    },
+    "required": ["draft", "scores", "pass", "notes"],
+}
+
+
+def _salvage_draft(raw: str) -> Optional[str]:
+    """The "draft" string of a reply cut off after it, or None if the draft itself was cut off."""
+    m = _DRAFT_KEY.search(raw or "")
+    if m is None:
+        return None
+    try:
+        text, _ = json.JSONDecoder().raw_decode(raw, m.end() - 1)
+    except ValueError:
+        return None
+    return text.strip() or None
 
 
 class ParalegalAgent:
     def __init__(self, model: str = "mistral"):
         self.model = model
 
-    def generate(self, query: str, context: List[Dict[str, Any]]) -> Dict[str, Any]:
-        ctx_block = _format_context(context)
-        prompt = textwrap.dedent(
-            f"""
-            You are a meticulous paralegal. Using ONLY the provided context, draft a concise answer to the query.
-            - Cite passages using bracketed indices like [1], [2] referring to the context items.
-            - If the answer is uncertain or not covered, say so explicitly.
+    def _draft_prompt(self, query: str, context: List[Dict[str, Any]]) -> str:
+        return assemble(context, DRAFT_INSTRUCTIONS, [("QUERY", query)], "DRAFT:")
 
-            Query:
-            {query}
+    def _assess_prompt(self, query: str, context: List[Dict[str, Any]]) -> str:
+        assessment = textwrap.dedent(
+            """
+            Then judge your draft strictly, 0-5 each:
+            - coverage: Does it answer the question fully?
+            - grounding: Is every claim supported by the context?
+            - citations: Are sources cited sufficiently and appropriately?
+            - freshness: Is the information likely up-to-date given the query?
+            Set "pass" only if the average is >= 4 and no score is below 3.
+            Reply as JSON: {"draft": string, "scores": {...}, "pass": boolean, "notes": string}
+            """
+        )
+        return assemble(context, DRAFT_INSTRUCTIONS + "\n" + assessment.strip(), [("QUERY", query)], "JSON:")
 
-            Context:
-            {ctx_block}
+    def _assessed(self, raw: str, context: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # None when the reply holds no complete draft
+        cites = [{"source": c.get("source"), "section": c.get("section")} for c in context]
+        try:
+            obj = json.loads(raw)
+            text = str(obj["draft"])
+        except (ValueError, KeyError, TypeError):
+            text = _salvage_draft(raw)
+            _log.warning(
+                "Single-pass reply was not complete JSON (len=%d); %s",
+                len(raw or ""), "using its draft with the judge" if text else "redrafting",
+            )
+            return {"text": text, "citations": cites, "assessment": None} if text else None
+        assessment = {k: obj[k] for k in ("pass", "scores", "notes") if k in obj}
+        return {"text": text, "citations": cites, "assessment": assessment}
 
-            Draft:
-            """
-        ).strip()
+    def generate(self, query: str, context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        text = ollama_generate(self.model, self._draft_prompt(query, context), temperature=0.2, max_tokens=512)
+        cites = [{"source": c.get("source"), "section": c.get("section")} for c in context]
+        return {"text": text, "citations": cites}
 
-        text = ollama_generate(self.model, prompt, temperature=0.2, max_tokens=512)
+    async def agenerate(self, query: str, context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        text = await ollama_agenerate(self.model, self._draft_prompt(query, context), temperature=0.2, max_tokens=512)
         cites = [{"source": c.get("source"), "section": c.get("section")} for c in context]
         return {"text": text, "citations": cites}
+
+    def draft_and_assess(self, query: str, context: List[Dict[str, Any]], schema: bool = True) -> Dict[str, Any]:
+        """Draft and self-score in one structured call, replacing the separate judge prompt.
+
+        Returns the generate() shape plus ``assessment`` (judge-style
+        ``{"pass", "scores", "notes"}``), or ``assessment: None`` if the reply
+        was cut off before valid JSON, so the caller can fall back to the judge.
+        The draft is then taken from the reply if it was complete, else
+        redrafted with generate(). ``schema=False`` only asks for JSON, for
+        Ollama versions before 0.5.
+        """
+        raw = ollama_generate(
+            self.model, self._assess_prompt(query, context), temperature=0.2, max_tokens=704,
+            fmt=DRAFT_AND_ASSESS_SCHEMA if schema else "json",
+        )
+        return self._assessed(raw, context) or dict(self.generate(query, context), assessment=None)
+
+    async def adraft_and_assess(self, query: str, context: List[Dict[str, Any]], schema: bool = True) -> Dict[str, Any]:
+        raw = await ollama_agenerate(
+            self.model, self._assess_prompt(query, context), temperature=0.2, max_tokens=704,
+            fmt=DRAFT_AND_ASSESS_SCHEMA if schema else "json",
+        )
+        return self._assessed(raw, context) or dict(await self.agenerate(query, context), assessment=None)
@@ -0,0 +1,45 @@
+from typing import List, Dict, Any, Tuple
+
+# Prompt layout shared by the paralegal, router and synthesizer:
+#
+#   PREAMBLE + CONTEXT block     <- identical bytes for every call of one request
+#   task instructions            <- fixed per agent
+#   query, draft, web evidence   <- per request
+#
+# Ollama keeps the KV cache of the previous prompt evaluated on a model slot and
+# only evaluates tokens after the longest common prefix, so the judge and the
+# synthesizer re-use the context tokens the paralegal already paid for. That only
+# works if nothing variable (not even the query) comes before the context.
+
+MAX_CONTEXT_ITEMS = 20
+
+PREAMBLE = (
+    "You are part of a legal research assistant. The numbered CONTEXT passages below were "
+    "retrieved from the legal corpus for the user's question. Refer to them by their labels "
+    "([R1], [R2], ...). Instructions for your task follow the context."
+)
+
+# How the paralegal answers. The two_pass draft and the single_pass draft+assessment both start from
+# this text, so scripts/bench_pipeline.py compares the two pipelines on the same instructions.
+DRAFT_INSTRUCTIONS = (
+    "You are a meticulous paralegal. Using ONLY the context, draft a concise answer to the query.\n"
+    "- Cite passages by their labels, like [R1], [R2].\n"
+    "- If the answer is uncertain or not covered, say so explicitly."
+)
+
+
+def format_context(ctx: List[Dict[str, Any]]) -> str:
+    lines = []
+    for i, c in enumerate(ctx[:MAX_CONTEXT_ITEMS], 1):
+        lines.append(f"[R{i}] source={c.get('source') or ''} section={c.get('section') or ''}\n{c.get('text') or ''}")
+    return "\n\n".join(lines) or "(no passages retrieved)"
+
+
+def shared_prefix(ctx: List[Dict[str, Any]]) -> str:
+    return f"{PREAMBLE}\n\nCONTEXT:\n{format_context(ctx)}\n\n"
+
+
+def assemble(ctx: List[Dict[str, Any]], instructions: str, parts: List[Tuple[str, str]], cue: str) -> str:
+    """Shared prefix, then the agent's instructions, then the labelled per-request parts and the answer cue."""
+    body = "\n\n".join(f"{label}:\n{text}" for label, text in parts if text)
+    return f"{shared_prefix(ctx)}TASK:\n{instructions.strip()}\n\n{body}\n\n{cue}".rstrip()
@@ -1,16 +1,162 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import os
+import re
 import json
+import logging
 import textwrap
 
-from tools.ollama_client import generate as ollama_generate
+import yaml
+
+from tools.ollama_client import generate as ollama_generate, agenerate as ollama_agenerate
+from .prompts import assemble
+from observability.metrics import ROUTING_DECISIONS
+
+_log = logging.getLogger(__name__)
+
+DIMENSIONS = ["coverage", "grounding", "citations", "freshness"]
+_CITE = re.compile(r"\[R?(\d+)\]")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\[])")
+
+
+def _load_routing_cfg() -> Dict[str, Any]:
+    cfg_path = os.path.join(os.path.dirname(__file__), "..", "configs", "routing.yaml")
+    with open(os.path.normpath(cfg_path), "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def parse_json_object(raw: str) -> Optional[Dict[str, Any]]:
+    """Last JSON object in an LLM reply, tolerating code fences, prose and trailing text."""
+    text = re.sub(r"```(?:json)?", "", raw or "")
+    decoder = json.JSONDecoder()
+    found = None
+    pos = text.find("{")
+    while pos != -1:
+        try:
+            obj, end = decoder.raw_decode(text, pos)
+        except ValueError:
+            pos = text.find("{", pos + 1)
+            continue
+        # Skip past a decoded object so its nested objects are not taken for the answer
+        found = obj
+        pos = text.find("{", end)
+    return found
 
 
 class RouterAgent:
-    def __init__(self, model: str = "mistral"):
+    """Decides whether a draft is good enough or the web fallback is needed.
+
+    ``route`` first applies cheap local signals (retrieval scores, ``[R1]``
+    citation coverage of the draft, uncertainty phrases in the draft,
+    freshness keywords in the query) with thresholds from the ``heuristics``
+    block of configs/routing.yaml, and only calls the LLM judge
+    (``evaluate``) when they are inconclusive. Verdicts carry ``tier``:
+    "heuristic" or "llm", or "self" when the draft came with the
+    single-pass self-assessment and no second LLM call was made.
+    """
+
+    def __init__(self, model: str = "mistral", cfg: Optional[Dict[str, Any]] = None):
         self.model = model
+        cfg = cfg if cfg is not None else _load_routing_cfg()
+        thresholds = cfg.get("pass_threshold") or {}
+        self.min_dimension = float(thresholds.get("min_dimension", 3))
+        self.min_average = float(thresholds.get("average", 4))
+        h = cfg.get("heuristics") or {}
+        self.heuristics = bool(h.get("enabled", True))
+        self.strong_score = float(h.get("strong_score", 0.6))
+        self.weak_score = float(h.get("weak_score", 0.3))
+        self.cite_pass_ratio = float(h.get("citation_pass_ratio", 0.6))
+        self.cite_fail_ratio = float(h.get("citation_fail_ratio", 0.2))
+        self.uncertainty = [p.lower() for p in h.get("uncertainty_phrases") or []]
+        self.freshness = [k.lower() for k in h.get("freshness_keywords") or []]
 
-    def evaluate(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Dict[str, Any]:
-        # Simple rubric enforced via JSON output
+    def route(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        verdict = self._local_verdict(query, draft, context)
+        if verdict is None:
+            verdict = dict(self.evaluate(query, draft, context), tier="llm")
+        return self._decided(verdict)
+
+    async def aroute(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        verdict = self._local_verdict(query, draft, context)
+        if verdict is None:
+            verdict = dict(await self.aevaluate(query, draft, context), tier="llm")
+        return self._decided(verdict)
+
+    def _local_verdict(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # Heuristics, then the draft's own assessment; None means the LLM judge has to decide
+        verdict = self.pre_route(query, draft, context) if self.heuristics else None
+        if verdict is None and draft.get("assessment"):
+            verdict = dict(self.verdict_from_json(draft["assessment"]), tier="self")
+            if verdict.get("notes") == "judge_parse_error":
+                verdict = None
+        return verdict
+
+    def _decided(self, verdict: Dict[str, Any]) -> Dict[str, Any]:
+        ROUTING_DECISIONS.inc(tier=verdict["tier"], result="pass" if verdict.get("pass") else "fail")
+        return verdict
+
+    def signals(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Dense similarity when hybrid search fused in lexical hits; RRF scores are not comparable
+        scores = sorted(
+            (float(c["vector_score"] if c.get("vector_score") is not None else c.get("score") or 0.0) for c in context),
+            reverse=True,
+        )
+        text = draft.get("text") or ""
+        sentences = [s for s in _SENTENCE.split(text.strip()) if len(s.split()) >= 4]
+        cited = [s for s in sentences if _CITE.search(s)]
+        refs = [int(n) for n in _CITE.findall(text)]
+        q = query.lower()
+        return {
+            "top_score": round(scores[0], 4) if scores else 0.0,
+            "mean_top3": round(sum(scores[:3]) / len(scores[:3]), 4) if scores else 0.0,
+            "cited_ratio": round(len(cited) / len(sentences), 3) if sentences else 0.0,
+            "valid_refs": len({n for n in refs if 1 <= n <= len(context)}),
+            "invalid_refs": len([n for n in refs if not 1 <= n <= len(context)]),
+            "uncertain": any(p in text.lower() for p in self.uncertainty),
+            "fresh": [k for k in self.freshness if re.search(r"\b" + re.escape(k) + r"\b", q)],
+        }
+
+    def web_likely(self, query: str, context: List[Dict[str, Any]]) -> bool:
+        """The draft-independent part of ``pre_route``: freshness keywords or weak retrieval."""
+        s = self.signals(query, {}, context)
+        return bool(s["fresh"]) or s["top_score"] < self.weak_score
+
+    def pre_route(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Heuristic verdict, or None when the signals are inconclusive."""
+        s = self.signals(query, draft, context)
+        fail_reasons = []
+        if not context:
+            fail_reasons.append("no_context")
+        if s["top_score"] < self.weak_score:
+            fail_reasons.append("weak_retrieval")
+        if s["uncertain"]:
+            fail_reasons.append("draft_uncertain")
+        if s["valid_refs"] == 0 or s["cited_ratio"] < self.cite_fail_ratio:
+            fail_reasons.append("uncited_draft")
+        if s["fresh"]:
+            fail_reasons.append("freshness")
+        if fail_reasons:
+            return self._verdict(False, s, "heuristic fail: " + ", ".join(fail_reasons))
+        if s["top_score"] >= self.strong_score and s["cited_ratio"] >= self.cite_pass_ratio and not s["invalid_refs"]:
+            return self._verdict(True, s, "heuristic pass")
+        return None
+
+    def _verdict(self, passed: bool, s: Dict[str, Any], notes: str) -> Dict[str, Any]:
+        # Scores on the judge's 0-5 scale so clients see the same shape either way
+        def scale(x: float) -> int:
+            return max(0, min(5, int(round(x * 5))))
+
+        span = max(self.strong_score - self.weak_score, 1e-6)
+        retrieval = scale((s["top_score"] - self.weak_score) / span)
+        scores = {
+            "coverage": retrieval,
+            "grounding": min(retrieval, scale(s["cited_ratio"])),
+            "citations": scale(s["cited_ratio"]) if not s["invalid_refs"] else min(2, scale(s["cited_ratio"])),
+            "freshness": 1 if s["fresh"] else 5,
+        }
+        return {"pass": passed, "scores": scores, "notes": notes, "tier": "heuristic", "signals": s}
+
+    def _judge_prompt(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> str:
+        # Simple rubric enforced via JSON output; the context is the shared prefix the paralegal already evaluated
         rubric = textwrap.dedent(
             """
             You are a strict legal QA judge. Score the DRAFT answer against the CONTEXT for:
@@ -24,18 +170,27 @@ class RouterAgent:
               "notes": string
             }
             """
-        ).strip()
+        )
+        return assemble(context, rubric, [("USER QUERY", query), ("DRAFT", draft.get("text", ""))], "JSON:")
+
+    def evaluate(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        raw = ollama_generate(self.model, self._judge_prompt(query, draft, context), temperature=0.0, max_tokens=256)
+        return self.verdict_from_json(parse_json_object(raw))
 
-        ctx_preview = "\n\n".join([(c.get("text") or "")[:500] for c in context[:5]])
-        prompt = f"{rubric}\n\nUSER QUERY:\n{query}\n\nCONTEXT (snippets):\n{ctx_preview}\n\nDRAFT:\n{draft.get('text','')}\n\nJSON:".strip()
+    async def aevaluate(self, query: str, draft: Dict[str, Any], context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        raw = await ollama_agenerate(self.model, self._judge_prompt(query, draft, context), temperature=0.0, max_tokens=256)
+        return self.verdict_from_json(parse_json_object(raw))
 
-        raw = ollama_generate(self.model, prompt, temperature=0.0, max_tokens=256)
+    def verdict_from_json(self, obj: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply the pass_threshold from configs/routing.yaml to a judge reply."""
         try:
-            obj = json.loads(raw.strip().splitlines()[-1])
-            scores = obj.get("scores", {})
-            avg = sum(scores.get(k, 0) for k in ["coverage", "grounding", "citations", "freshness"]) / 4.0
-            passed = bool(obj.get("pass", False)) and all(scores.get(k, 0) >= 3 for k in scores) and avg >= 4
-            obj["pass"] = passed
-            return obj
-        except Exception:
-            return {"pass": False, "scores": {"coverage": 0, "grounding": 0, "citations": 0, "freshness": 0}, "notes": "judge_parse_error"}
+            raw_scores = obj.get("scores") if obj else None
+            if not isinstance(raw_scores, dict):
+                raise ValueError("no scores")
+            scores = {k: max(0, min(5, int(float(raw_scores.get(k, 0))))) for k in DIMENSIONS}
+        except (TypeError, ValueError):
+            _log.warning("Judge reply could not be parsed: %r", obj)
+            return {"pass": False, "scores": {k: 0 for k in DIMENSIONS}, "notes": "judge_parse_error"}
+        avg = sum(scores.values()) / float(len(scores))
+        passed = bool(obj.get("pass", False)) and min(scores.values()) >= self.min_dimension and avg >= self.min_average
+        return dict(obj, scores=scores, **{"pass": passed})
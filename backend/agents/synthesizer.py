@@ -1,14 +1,13 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterator
 import textwrap
 
-from tools.ollama_client import generate as ollama_generate
-
-
-def _format_rag(rag_ctx: List[Dict[str, Any]]) -> str:
-    lines = []
-    for i, c in enumerate(rag_ctx, 1):
-        lines.append(f"[R{i}] {c.get('source','')} {c.get('section','')}:\n{c.get('text','')}")
-    return "\n\n".join(lines[:15])
+from tools.ollama_client import (
+    generate as ollama_generate,
+    generate_stream as ollama_generate_stream,
+    agenerate as ollama_agenerate,
+    agenerate_stream as ollama_agenerate_stream,
+)
+from .prompts import assemble
 
 
 def _format_web(web_ctx: List[Dict[str, Any]]) -> str:
@@ -25,19 +24,17 @@ class SynthesizerAgent:
     def __init__(self, model: str = "mistral"):
         self.model = model
 
-    def synthesize(self, query: str, rag_ctx: List[Dict[str, Any]], web_ctx: List[Dict[str, Any]], draft: Dict[str, Any], verdict: Dict[str, Any]) -> Dict[str, Any]:
-        rag_block = _format_rag(rag_ctx)
+    def _build_prompt(self, query: str, rag_ctx: List[Dict[str, Any]], web_ctx: List[Dict[str, Any]], draft: Dict[str, Any], verdict: Dict[str, Any]) -> str:
         web_block = _format_web(web_ctx)
         needs_web = not verdict.get("pass", False)
-        web_section = f"WEB EVIDENCE:\n{web_block}" if needs_web else ""
 
-        prompt = textwrap.dedent(
-            f"""
+        instructions = textwrap.dedent(
+            """
             You are a senior legal writer. Produce a thorough and well-structured final answer for the USER QUERY using the draft and evidence.
             Rules:
             - Target length: approximately 180–300 words (more detailed than a brief summary).
-            - Ground claims strictly in the RAG and, if needed, WEB evidence. Avoid hallucinations.
-            - Include inline bracket citations like [R1], [R2] and [W1] exactly where claims are supported.
+            - Ground claims strictly in the CONTEXT and, if needed, WEB EVIDENCE. Avoid hallucinations.
+            - Include inline bracket citations like [R1], [R2] (context) and [W1] (web) exactly where claims are supported.
             - Formatting: Use Markdown with headings (## ...), short paragraphs, bullet lists (-), numbered steps (1.), and bold key terms (**like this**). End with a '## Summary' section of 2–4 bullets.
             - Structure the answer with:
               1) A clear rule statement and statutory references.
@@ -45,28 +42,39 @@ class SynthesizerAgent:
               3) Practical guidance (e.g., deadlines, accrual rules, tolling, caveats).
               4) A short "Summary" section with 2–4 bullets.
             - If information is missing or outdated, explicitly state limitations and what further sources would be needed.
-
-            USER QUERY:
-            {query}
-
-            DRAFT (from paralegal):
-            {draft.get('text','')}
-
-            RAG EVIDENCE:
-            {rag_block}
-
-            {web_section}
-
-            Final Answer:
             """
-        ).strip()
-
-        text = ollama_generate(self.model, prompt, temperature=0.2, max_tokens=1100)
-
+        )
+        parts = [
+            ("USER QUERY", query),
+            ("DRAFT (from paralegal)", draft.get("text", "")),
+            ("WEB EVIDENCE", web_block if needs_web else ""),
+        ]
+        return assemble(rag_ctx, instructions, parts, "Final Answer:")
+
+    def citations(self, rag_ctx: List[Dict[str, Any]], web_ctx: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         merged_cites: List[Dict[str, Any]] = []
         for c in rag_ctx:
             merged_cites.append({"source": c.get("source"), "section": c.get("section")})
         for c in web_ctx:
             merged_cites.append({"url": c.get("url")})
+        return merged_cites
 
-        return {"text": text, "citations": merged_cites, "timings": {}}
+    def synthesize(self, query: str, rag_ctx: List[Dict[str, Any]], web_ctx: List[Dict[str, Any]], draft: Dict[str, Any], verdict: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._build_prompt(query, rag_ctx, web_ctx, draft, verdict)
+        text = ollama_generate(self.model, prompt, temperature=0.2, max_tokens=1100)
+        return {"text": text, "citations": self.citations(rag_ctx, web_ctx), "timings": {}}
+
+    def synthesize_stream(self, query: str, rag_ctx: List[Dict[str, Any]], web_ctx: List[Dict[str, Any]], draft: Dict[str, Any], verdict: Dict[str, Any]) -> Iterator[str]:
+        """Same prompt as synthesize(), but yields answer tokens as Ollama produces them."""
+        prompt = self._build_prompt(query, rag_ctx, web_ctx, draft, verdict)
+        yield from ollama_generate_stream(self.model, prompt, temperature=0.2, max_tokens=1100)
+
+    async def asynthesize(self, query: str, rag_ctx: List[Dict[str, Any]], web_ctx: List[Dict[str, Any]], draft: Dict[str, Any], verdict: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._build_prompt(query, rag_ctx, web_ctx, draft, verdict)
+        text = await ollama_agenerate(self.model, prompt, temperature=0.2, max_tokens=1100)
+        return {"text": text, "citations": self.citations(rag_ctx, web_ctx), "timings": {}}
+
+    async def asynthesize_stream(self, query: str, rag_ctx: List[Dict[str, Any]], web_ctx: List[Dict[str, Any]], draft: Dict[str, Any], verdict: Dict[str, Any]) -> AsyncIterator[str]:
+        prompt = self._build_prompt(query, rag_ctx, web_ctx, draft, verdict)
+        async for token in ollama_agenerate_stream(self.model, prompt, temperature=0.2, max_tokens=1100):
+            yield token
@@ -1,21 +1,31 @@
 import os
+import threading
 from typing import Any, Dict, List
 
 # Lazy, minimal stubs; replace with real implementations
 from retriever.milvus_client import MilvusRetriever
+from retriever.context_packer import ContextPacker
 from agents.paralegal import ParalegalAgent
 from agents.router import RouterAgent
 from agents.synthesizer import SynthesizerAgent
+from agents.orchestrator import AskOrchestrator
 from tools.firecrawl_client import FirecrawlClient
 from retriever.ingest import Ingestor as RealIngestor
+from jobs.ingest_jobs import IngestJobQueue
+from tools.answer_cache import get_answer_cache
 
 
 _retriever = None
+_packer = None
 _paralegal = None
 _router = None
 _synth = None
 _firecrawl = None
 _ingestor = None
+_ingest_jobs = None
+_orchestrator = None
+# Guards first creation; reentrant because get_orchestrator builds the other singletons
+_lock = threading.RLock()
 
 
 class Ingestor:
@@ -25,51 +35,104 @@ class Ingestor:
         collection = os.getenv("MILVUS_COLLECTION", "legal_chunks")
         self.impl = RealIngestor(host, port, collection)
 
-    def ingest(self, source_uri: str, options: Dict[str, Any]) -> Dict[str, Any]:
-        return self.impl.ingest(source_uri, options)
+    def ingest(self, source_uri: str, options: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        return self.impl.ingest(source_uri, options, **kwargs)
 
 
 def get_retriever() -> MilvusRetriever:
     global _retriever
     if _retriever is None:
-        host = os.getenv("MILVUS_HOST", "localhost")
-        port = os.getenv("MILVUS_PORT", "19530")
-        collection = os.getenv("MILVUS_COLLECTION", "legal_chunks")
-        _retriever = MilvusRetriever(host, port, collection)
+        with _lock:
+            if _retriever is None:
+                host = os.getenv("MILVUS_HOST", "localhost")
+                port = os.getenv("MILVUS_PORT", "19530")
+                collection = os.getenv("MILVUS_COLLECTION", "legal_chunks")
+                _retriever = MilvusRetriever(host, port, collection)
     return _retriever
 
 
+def get_context_packer() -> ContextPacker:
+    global _packer
+    if _packer is None:
+        with _lock:
+            if _packer is None:
+                _packer = ContextPacker()
+    return _packer
+
+
 def get_paralegal_agent() -> ParalegalAgent:
     global _paralegal
     if _paralegal is None:
-        _paralegal = ParalegalAgent()
+        with _lock:
+            if _paralegal is None:
+                _paralegal = ParalegalAgent()
     return _paralegal
 
 
 def get_router_agent() -> RouterAgent:
     global _router
     if _router is None:
-        _router = RouterAgent()
+        with _lock:
+            if _router is None:
+                _router = RouterAgent()
     return _router
 
 
 def get_synthesizer_agent() -> SynthesizerAgent:
     global _synth
     if _synth is None:
-        _synth = SynthesizerAgent()
+        with _lock:
+            if _synth is None:
+                _synth = SynthesizerAgent()
     return _synth
 
 
 def get_firecrawl() -> FirecrawlClient:
     global _firecrawl
     if _firecrawl is None:
-        api_key = os.getenv("FIRECRAWL_API_KEY", "")
-        _firecrawl = FirecrawlClient(api_key)
+        with _lock:
+            if _firecrawl is None:
+                api_key = os.getenv("FIRECRAWL_API_KEY", "")
+                _firecrawl = FirecrawlClient(api_key)
     return _firecrawl
 
 
+def get_orchestrator() -> AskOrchestrator:
+    global _orchestrator
+    if _orchestrator is None:
+        with _lock:
+            if _orchestrator is None:
+                _orchestrator = AskOrchestrator(
+                    get_retriever(),
+                    get_paralegal_agent(),
+                    get_router_agent(),
+                    get_synthesizer_agent(),
+                    get_firecrawl(),
+                    packer=get_context_packer(),
+                )
+    return _orchestrator
+
+
 def get_ingestor() -> Ingestor:
     global _ingestor
     if _ingestor is None:
-        _ingestor = Ingestor()
+        with _lock:
+            if _ingestor is None:
+                _ingestor = Ingestor()
     return _ingestor
+
+
+def _invalidate_answers(job: Dict[str, Any]) -> None:
+    # Any ingest that wrote rows can change what /ask should answer
+    cache = get_answer_cache()
+    if cache is not None and job.get("progress", {}).get("rows_inserted", 0) > 0:
+        cache.invalidate()
+
+
+def get_ingest_jobs() -> IngestJobQueue:
+    global _ingest_jobs
+    if _ingest_jobs is None:
+        with _lock:
+            if _ingest_jobs is None:
+                _ingest_jobs = IngestJobQueue(get_ingestor().ingest, on_finish=_invalidate_answers)
+    return _ingest_jobs
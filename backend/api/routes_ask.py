@@ -1,7 +1,105 @@
-from flask import Blueprint, request, jsonify
-from api.deps import get_retriever, get_paralegal_agent, get_router_agent, get_synthesizer_agent, get_firecrawl
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from api.deps import get_orchestrator, get_retriever, get_paralegal_agent
+from agents.orchestrator import PIPELINES
+from tools.answer_cache import get_answer_cache
+from retriever.filters import build_expr
+from tools.ollama_client import get_scheduler
+from tools.llm_scheduler import LLMOverloaded
 
 ask_bp = Blueprint("ask", __name__)
+_log = logging.getLogger(__name__)
+
+BATCH_MAX = int(os.getenv("ASK_BATCH_MAX", "500"))
+
+
+def _answer_cache(data):
+    # Callers can opt out per request with {"no_cache": true}
+    return None if data.get("no_cache") else get_answer_cache()
+
+
+def _filters(data):
+    # {"filters": {"jurisdiction": "CA", "effective_date": {"gte": "2020-01-01"}}}
+    filters = data.get("filters") or {}
+    if not isinstance(filters, dict):
+        return None, "filters must be an object"
+    try:
+        build_expr(filters)
+    except ValueError as e:
+        return None, str(e)
+    return filters, None
+
+
+def _search(data):
+    # {"search": {"mode": "fast" | "balanced" | "thorough", "ef": 128, "k": 10}}
+    search = data.get("search") or {}
+    try:
+        get_retriever().search_params.validate(search)
+    except ValueError as e:
+        return None, str(e)
+    return search, None
+
+
+def _pipeline(data):
+    # {"pipeline": "single_pass" | "two_pass"}; default from configs/routing.yaml
+    pipeline = data.get("pipeline")
+    if pipeline is not None and pipeline not in PIPELINES:
+        return None, f"pipeline must be one of: {', '.join(PIPELINES)}"
+    return pipeline, None
+
+
+def ask_options(data) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Validated filters, search, pipeline and answer cache for an /ask body, or an error message.
+
+    Shared by the Flask routes and the ASGI app (asgi.py) so both accept the same bodies.
+    """
+    filters, err = _filters(data)
+    if not err:
+        search, err = _search(data)
+    if not err:
+        pipeline, err = _pipeline(data)
+    if err:
+        return None, err
+    return {"filters": filters, "search": search, "pipeline": pipeline, "cache": _answer_cache(data)}, None
+
+
+def batch_request(data) -> Tuple[Optional[List[str]], Optional[int], Optional[str]]:
+    """Queries and concurrency of an /ask/batch body, or an error message."""
+    queries = data.get("queries") or []
+    if not isinstance(queries, list) or not queries:
+        return None, None, "queries must be a non-empty list"
+    queries = [str(q).strip() for q in queries]
+    if any(not q for q in queries):
+        return None, None, "queries must not be empty"
+    if len(queries) > BATCH_MAX:
+        return None, None, f"at most {BATCH_MAX} queries per batch"
+    try:
+        concurrency = int(data["concurrency"]) if data.get("concurrency") else None
+    except (TypeError, ValueError):
+        return None, None, "concurrency must be an integer"
+    return queries, concurrency, None
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_error(e: Exception) -> Dict[str, Any]:
+    # Payload of the in-band "error" event once a stream has started
+    err: Dict[str, Any] = {"error": str(e)}
+    if isinstance(e, LLMOverloaded):
+        err["retry_after"] = e.retry_after
+    return err
+
+
+def batch_line(i: int, query: str, payload: Dict[str, Any]) -> str:
+    if "error" in payload:
+        return json.dumps({"index": i, "query": query, "error": payload["error"]}) + "\n"
+    return json.dumps({"index": i, "query": query, "result": payload}) + "\n"
 
 
 @ask_bp.post("/ask")
@@ -11,46 +109,68 @@ def ask():
     if not query:
         return jsonify({"error": "query is required"}), 400
 
-    # 1) retrieve context
-    retriever = get_retriever()
-    # Use retriever default 'k' from configs/retrieval.yaml
-    ctx = retriever.retrieve(query)
-
-    # 2) draft answer
-    paralegal = get_paralegal_agent()
-    draft = paralegal.generate(query, ctx)
-
-    # 3) route/judge
-    router = get_router_agent()
-    verdict = router.evaluate(query, draft, ctx)
-
-    web_ctx = []
-    if not verdict.get("pass", False):
-        # 4) web search fallback
-        firecrawl = get_firecrawl()
-        web_ctx = firecrawl.search_and_extract(query)
-
-    # 5) synthesize
-    synthesizer = get_synthesizer_agent()
-    final = synthesizer.synthesize(query, ctx, web_ctx, draft, verdict)
-
-    # Prepare compact sources from retrieval context
-    sources = [
-        {
-            "source": c.get("source", ""),
-            "section": c.get("section", ""),
-            "score": c.get("score", 0.0),
-            "text": c.get("text", ""),
-        }
-        for c in ctx
-    ]
-
-    resp = {
-        "answer": final.get("text", ""),
-        "citations": final.get("citations", []),
-        "sources": sources,
-        "web_sources": web_ctx,
-        "routing": verdict,
-        "timings": final.get("timings", {}),
-    }
+    opts, err = ask_options(data)
+    if err:
+        return jsonify({"error": err}), 400
+
+    # retrieve -> draft -> judge -> (web) -> synthesize, see agents/orchestrator.py
+    resp = get_orchestrator().run(query, **opts)
     return jsonify(resp)
+
+
+@ask_bp.post("/ask/stream")
+def ask_stream():
+    """Server-Sent Events variant of /ask.
+
+    Emits one event per pipeline stage (retrieved, drafted, judged, web),
+    then the synthesizer output as ``token`` events and a final ``done``
+    event carrying the same payload /ask returns.
+    """
+    data = request.get_json(force=True)
+    query = data.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "query is required"}), 400
+    opts, err = ask_options(data)
+    if err:
+        return jsonify({"error": err}), 400
+    # A shed LLM call can only become a 503 before the stream starts, so check the queue up front;
+    # /ask sheds at the draft call instead, which lets answer cache hits through
+    get_scheduler().admit(get_paralegal_agent().model)
+
+    def events():
+        try:
+            for event, payload in get_orchestrator().events(query, stream=True, **opts):
+                yield sse(event, payload)
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            _log.exception("ask stream failed: %s", e)
+            yield sse("error", stream_error(e))
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+
+@ask_bp.post("/ask/batch")
+def ask_batch():
+    """Answer many queries in one call, streaming NDJSON lines as each completes.
+
+    Body: {"queries": [...], "filters": {...}, "search": {...}, "pipeline": ..., "concurrency": n}. Each line is
+    {"index": i, "query": ..., "result": <same payload as /ask>} or
+    {"index": i, "query": ..., "error": ...}.
+    """
+    data = request.get_json(force=True)
+    queries, concurrency, err = batch_request(data)
+    if not err:
+        opts, err = ask_options(data)
+    if err:
+        return jsonify({"error": err}), 400
+
+    def lines():
+        try:
+            for i, payload in get_orchestrator().run_batch(queries, concurrency=concurrency, **opts):
+                yield batch_line(i, queries[i], payload)
+        except Exception as e:
+            _log.exception("ask batch failed: %s", e)
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
@@ -1,5 +1,11 @@
 from flask import Blueprint, jsonify
 
+from api.warmup import readiness
+from tools.http_pool import pool_stats
+from tools.embedding_cache import get_embedding_cache
+from tools.answer_cache import get_answer_cache
+from tools.ollama_client import OLLAMA_KEEP_ALIVE, OLLAMA_PINNED_MODELS, loaded_models, get_scheduler
+
 health_bp = Blueprint("health", __name__)
 
 
@@ -10,5 +16,35 @@ def healthz():
 
 @health_bp.get("/readyz")
 def readyz():
-    # In a fuller impl, check Milvus and Ollama readiness.
-    return jsonify({"ready": True})
+    # 503 until warm-up has passed and Milvus and Ollama answer, so load balancers hold traffic back
+    status = readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
+
+@health_bp.get("/healthz/pools")
+def pools():
+    # Connection reuse per outbound HTTP pool (Ollama, Firecrawl)
+    return jsonify(pool_stats())
+
+
+@health_bp.get("/healthz/cache")
+def cache():
+    # Embedding and answer cache hit/miss counters and sizes
+    emb = get_embedding_cache()
+    ans = get_answer_cache()
+    return jsonify({
+        "embeddings": emb.stats() if emb else {"enabled": False},
+        "answers": ans.stats() if ans else {"enabled": False},
+    })
+
+
+@health_bp.get("/healthz/llm")
+def llm():
+    # Models resident in Ollama (a model missing here pays the load again on its next call)
+    # and the client-side scheduler's slots and queues
+    scheduler = get_scheduler().stats()
+    try:
+        models = loaded_models()
+    except Exception as e:
+        return jsonify({"error": str(e), "pinned": OLLAMA_PINNED_MODELS, "scheduler": scheduler}), 503
+    return jsonify({"keep_alive": OLLAMA_KEEP_ALIVE, "pinned": OLLAMA_PINNED_MODELS, "loaded": models, "scheduler": scheduler})
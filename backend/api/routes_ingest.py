@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from api.deps import get_ingestor
+from api.deps import get_ingest_jobs
 
 ingest_bp = Blueprint("ingest", __name__)
 
@@ -12,6 +12,22 @@ def ingest():
     if not source:
         return jsonify({"error": "source_uri is required"}), 400
 
-    ingestor = get_ingestor()
-    job = ingestor.ingest(source, options)
-    return jsonify({"job_id": job["id"], "status": "queued"})
+    # Runs on the background worker pool; poll GET /ingest/<job_id> for progress
+    job = get_ingest_jobs().submit(source, options)
+    return jsonify({"job_id": job["id"], "status": job["status"]}), 202
+
+
+@ingest_bp.get("/ingest/<job_id>")
+def ingest_status(job_id: str):
+    job = get_ingest_jobs().get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job)
+
+
+@ingest_bp.post("/ingest/<job_id>/cancel")
+def ingest_cancel(job_id: str):
+    job = get_ingest_jobs().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job)
@@ -0,0 +1,27 @@
+import time
+
+from flask import Blueprint, Response, request, g
+
+from observability.metrics import HTTP_SECONDS, render
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.before_app_request
+def _start_timer():
+    g._metrics_start = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def _observe(response):
+    start = getattr(g, "_metrics_start", None)
+    if start is not None:
+        # Label by URL rule, not path, so /ingest/<job_id> is one series
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_SECONDS.observe(time.perf_counter() - start, route=route, method=request.method, status=response.status_code)
+    return response
+
+
+@metrics_bp.get("/metrics")
+def metrics():
+    return Response(render(), mimetype="text/plain; version=0.0.4")
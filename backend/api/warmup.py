@@ -0,0 +1,128 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from api.deps import (
+    get_retriever,
+    get_paralegal_agent,
+    get_router_agent,
+    get_synthesizer_agent,
+    get_orchestrator,
+    get_ingest_jobs,
+)
+from tools import embeddings
+from tools.ollama_client import OLLAMA_PINNED_MODELS, preload_models, pull_model, ping as ollama_ping
+
+_log = logging.getLogger(__name__)
+
+# Env configuration
+WARMUP = os.getenv("WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "10"))  # seconds between attempts of failed steps
+WARMUP_PULL_MODELS = os.getenv("WARMUP_PULL_MODELS", "false").lower() in ("1", "true", "yes")
+
+_state: Dict[str, Any] = {"started": None, "finished": None, "attempts": 0, "checks": {}}
+_state_lock = threading.Lock()
+_thread = None
+
+
+def _models() -> List[str]:
+    names = [get_paralegal_agent().model, get_router_agent().model, get_synthesizer_agent().model]
+    if embeddings.BACKEND == "ollama":
+        names.append(embeddings.OLLAMA_MODEL)
+    return list(dict.fromkeys(names + OLLAMA_PINNED_MODELS))
+
+
+def _warm_singletons() -> str:
+    get_orchestrator()
+    get_ingest_jobs()
+    return "created"
+
+
+def _warm_milvus() -> str:
+    # Connects every proxy, loads the collection if needed and caches the handles
+    retriever = get_retriever()
+    retriever.prepare()
+    return retriever.collection_name
+
+
+def _warm_models() -> str:
+    models = _models()
+    missing = [m for m in models if m not in preload_models([m])]
+    if missing and WARMUP_PULL_MODELS:
+        for m in missing:
+            pull_model(m)
+        missing = [m for m in missing if m not in preload_models([m])]
+    if missing:
+        raise RuntimeError(f"could not load {', '.join(missing)}")
+    return ", ".join(models)
+
+
+def _warm_embedding() -> str:
+    # Goes through the embedding cache like a real query; the model itself is loaded by the ollama step
+    return f"dim={len(get_retriever().embed_query('statute of limitations'))}"
+
+
+# (name, step); each returns a short detail string or raises
+STEPS: List[Tuple[str, Callable[[], Any]]] = [
+    ("singletons", _warm_singletons),
+    ("milvus", _warm_milvus),
+    ("ollama", _warm_models),
+    ("embedding", _warm_embedding),
+]
+
+
+def warm_up() -> bool:
+    """Run the steps that have not passed yet; True once all have."""
+    with _state_lock:
+        _state["started"] = _state["started"] or time.time()
+        _state["attempts"] += 1
+        pending = [(n, fn) for n, fn in STEPS if not (_state["checks"].get(n) or {}).get("ok")]
+    for name, fn in pending:
+        start = time.perf_counter()
+        try:
+            check = {"ok": True, "detail": fn()}
+        except Exception as e:
+            _log.warning("Warm-up step %s failed: %s", name, e)
+            check = {"ok": False, "error": str(e)}
+        check["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        with _state_lock:
+            _state["checks"][name] = check
+    with _state_lock:
+        done = all((_state["checks"].get(n) or {}).get("ok") for n, _ in STEPS)
+        if done and _state["finished"] is None:
+            _state["finished"] = time.time()
+            _log.info("Warm-up finished in %.1fs", _state["finished"] - _state["started"])
+    return done
+
+
+def _loop() -> None:
+    while not warm_up():
+        time.sleep(WARMUP_RETRY_INTERVAL)
+
+
+def start_warm_up() -> None:
+    """Warm up on a background thread, retrying failed steps, so the server can accept probes meanwhile."""
+    global _thread
+    if not WARMUP:
+        return
+    with _state_lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, name="warmup", daemon=True)
+    _thread.start()
+
+
+def readiness() -> Dict[str, Any]:
+    """Warm-up results plus live Milvus and Ollama checks; ``ready`` only when all pass."""
+    with _state_lock:
+        state = {k: (dict(v) if isinstance(v, dict) else v) for k, v in _state.items()}
+    warmed = state["finished"] is not None or not WARMUP
+    live: Dict[str, Any] = {}
+    if warmed:
+        live["milvus"] = get_retriever().ping()
+        live["ollama"] = ollama_ping()
+    # One reachable Ollama host is enough; the scheduler routes around the others
+    ready = warmed and live["milvus"] and any(live["ollama"].values())
+    return {"ready": bool(ready), "warmup": state, "live": live}
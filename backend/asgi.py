@@ -0,0 +1,246 @@
+"""ASGI entry point: the /ask routes run natively on asyncio, everything else on the Flask app.
+
+Usage: SERVER=asgi python serve.py   (or: uvicorn asgi:app)
+
+POST /ask, /ask/stream and /ask/batch await the async agents and clients, so
+a request waiting on Ollama holds a coroutine, not a thread. Every other
+route (/ingest, /healthz, /readyz, /metrics, CORS preflights) is passed to the
+Flask app through uvicorn's WSGI adapter, with the same request and
+response contract as under serve.py.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(env_path):
+    load_dotenv(env_path)
+
+from uvicorn.middleware.wsgi import WSGIMiddleware  # noqa: E402
+
+from main import create_app  # noqa: E402
+from api.deps import get_orchestrator, get_paralegal_agent  # noqa: E402
+from api.routes_ask import ask_options, batch_request, batch_line, sse, stream_error  # noqa: E402
+from observability.metrics import HTTP_SECONDS  # noqa: E402
+from tools.http_pool import aclose_all  # noqa: E402
+from tools.llm_scheduler import LLMOverloaded  # noqa: E402
+from tools.ollama_client import get_scheduler  # noqa: E402
+
+_log = logging.getLogger(__name__)
+
+MAX_BODY = int(os.getenv("ASGI_MAX_BODY", str(1 << 20)))  # bytes
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "10"))  # threads serving the routes handed to Flask
+BLOCKING_THREADS = int(os.getenv("ASGI_BLOCKING_THREADS", "32"))  # Milvus searches and other blocking calls
+ORIGINS = os.getenv("ALLOWED_ORIGINS", "*")
+
+flask_app = create_app()
+_wsgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class _BadRequest(Exception):
+    pass
+
+
+class _Disconnected(Exception):
+    pass
+
+
+def _cors(scope) -> Headers:
+    # Same policy flask-cors applies to the Flask routes
+    if ORIGINS == "*":
+        return [(b"access-control-allow-origin", b"*")]
+    origin = dict(scope.get("headers") or []).get(b"origin", b"").decode("latin-1")
+    allowed = [o.strip() for o in ORIGINS.split(",") if o.strip()]
+    if origin in allowed:
+        return [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+    return []
+
+
+async def _read_json(receive) -> Dict[str, Any]:
+    body = b""
+    while True:
+        msg = await receive()
+        if msg["type"] == "http.disconnect":
+            raise _Disconnected()
+        body += msg.get("body", b"")
+        if len(body) > MAX_BODY:
+            raise _BadRequest("request body too large")
+        if not msg.get("more_body", False):
+            break
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise _BadRequest("request body must be JSON")
+    if not isinstance(data, dict):
+        raise _BadRequest("request body must be a JSON object")
+    return data
+
+
+async def _send_json(send, status: int, body: Any, headers: Optional[Headers] = None) -> None:
+    data = json.dumps(body).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": data})
+
+
+async def _start_stream(send, content_type: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", content_type), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")],
+    })
+
+
+async def _until_disconnect(receive, coro: Awaitable[Any]) -> Tuple[bool, Any]:
+    """Run ``coro``, cancelling it if the client goes away first. Returns (finished, result)."""
+    task = asyncio.ensure_future(coro)
+
+    async def watch() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if not task.done():
+        # Client disconnected: stop the pipeline, which frees its LLM slots
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return False, None
+    return True, task.result()
+
+
+def _overloaded(e: LLMOverloaded) -> Tuple[int, Dict[str, Any], Headers]:
+    return 503, {"error": str(e)}, [(b"retry-after", str(e.retry_after).encode())]
+
+
+async def ask(scope, receive, send) -> None:
+    data = await _read_json(receive)
+    query = str(data.get("query") or "").strip()
+    if not query:
+        return await _send_json(send, 400, {"error": "query is required"})
+    opts, err = ask_options(data)
+    if err:
+        return await _send_json(send, 400, {"error": err})
+    try:
+        finished, resp = await _until_disconnect(receive, get_orchestrator().arun(query, **opts))
+    except LLMOverloaded as e:
+        return await _send_json(send, *_overloaded(e))
+    if finished:
+        await _send_json(send, 200, resp)
+
+
+async def ask_stream(scope, receive, send) -> None:
+    data = await _read_json(receive)
+    query = str(data.get("query") or "").strip()
+    if not query:
+        return await _send_json(send, 400, {"error": "query is required"})
+    opts, err = ask_options(data)
+    if err:
+        return await _send_json(send, 400, {"error": err})
+    try:
+        get_scheduler().admit(get_paralegal_agent().model)
+    except LLMOverloaded as e:
+        return await _send_json(send, *_overloaded(e))
+
+    await _start_stream(send, b"text/event-stream")
+
+    async def pump() -> None:
+        try:
+            async for event, payload in get_orchestrator().aevents(query, stream=True, **opts):
+                await send({"type": "http.response.body", "body": sse(event, payload).encode("utf-8"), "more_body": True})
+        except Exception as e:
+            _log.exception("ask stream failed: %s", e)
+            await send({"type": "http.response.body", "body": sse("error", stream_error(e)).encode("utf-8"), "more_body": True})
+
+    await _until_disconnect(receive, pump())
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def ask_batch(scope, receive, send) -> None:
+    data = await _read_json(receive)
+    queries, concurrency, err = batch_request(data)
+    if not err:
+        opts, err = ask_options(data)
+    if err:
+        return await _send_json(send, 400, {"error": err})
+
+    await _start_stream(send, b"application/x-ndjson")
+
+    async def pump() -> None:
+        try:
+            async for i, payload in get_orchestrator().arun_batch(queries, concurrency=concurrency, **opts):
+                await send({"type": "http.response.body", "body": batch_line(i, queries[i], payload).encode("utf-8"), "more_body": True})
+        except Exception as e:
+            _log.exception("ask batch failed: %s", e)
+            await send({"type": "http.response.body", "body": (json.dumps({"error": str(e)}) + "\n").encode("utf-8"), "more_body": True})
+
+    await _until_disconnect(receive, pump())
+    await send({"type": "http.response.body", "body": b""})
+
+
+ROUTES: Dict[str, Callable[..., Awaitable[None]]] = {"/ask": ask, "/ask/stream": ask_stream, "/ask/batch": ask_batch}
+
+
+async def _native(handler, scope, receive, send) -> None:
+    start = time.perf_counter()
+    started = False
+
+    async def send_with_cors(msg) -> None:
+        nonlocal started
+        if msg["type"] == "http.response.start":
+            started = True
+            msg = dict(msg, headers=list(msg.get("headers") or []) + _cors(scope))
+            # Time to first byte for streams, like the Flask after_request hook
+            HTTP_SECONDS.observe(time.perf_counter() - start, route=scope["path"], method="POST", status=msg["status"])
+        await send(msg)
+
+    try:
+        await handler(scope, receive, send_with_cors)
+    except _BadRequest as e:
+        await _send_json(send_with_cors, 400, {"error": str(e)})
+    except _Disconnected:
+        pass
+    except Exception as e:
+        _log.exception("%s failed: %s", scope["path"], e)
+        if not started:
+            await _send_json(send_with_cors, 500, {"error": str(e)})
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            # Bounded pool for asyncio.to_thread (pymilvus is blocking)
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="asgi-blocking"))
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            await aclose_all()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    handler = ROUTES.get(scope.get("path", "")) if scope["type"] == "http" and scope.get("method") == "POST" else None
+    if handler is not None:
+        return await _native(handler, scope, receive, send)
+    await _wsgi(scope, receive, send)
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import uuid
+import glob
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to PID checks
+    fcntl = None
+
+from retriever.ingest import IngestCancelled, STATE_DIR
+
+_log = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+JOBS_DIR = os.path.normpath(os.path.join(STATE_DIR, "jobs"))
+
+# queued -> running -> succeeded | failed | cancelled
+# Jobs found queued/running at startup become "interrupted" unless their owning process is still alive.
+_ACTIVE = ("queued", "running")
+
+
+class IngestJobQueue:
+    """Runs ingests on a background worker pool and tracks them as job records.
+
+    Each record is persisted as JSON under INGEST_STATE_DIR/jobs so status
+    survives restarts. Each queue holds an flock on its own owner file for its
+    lifetime, so another process can tell a live peer's job from one cut off
+    by a restart. ``run`` is any callable with the Ingestor.ingest
+    signature. ``on_finish(job)`` is called after every job reaches a
+    terminal state, e.g. to invalidate caches that depend on the collection.
+    """
+
+    def __init__(
+        self,
+        run: Callable[..., Dict[str, Any]],
+        workers: int = WORKERS,
+        jobs_dir: str = JOBS_DIR,
+        on_finish: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self._run = run
+        self._on_finish = on_finish
+        self._dir = jobs_dir
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+        self._last_save: Dict[str, float] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        os.makedirs(os.path.join(self._dir, "owners"), exist_ok=True)
+        self._owner = uuid.uuid4().hex
+        self._owner_file = self._hold_owner_lock()
+        self._load()
+
+    def _owner_path(self, owner: str) -> str:
+        return os.path.join(self._dir, "owners", f"{owner}.lock")
+
+    def _hold_owner_lock(self):
+        if fcntl is None:
+            return None
+        f = open(self._owner_path(self._owner), "w")
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return f
+
+    def _owner_alive(self, job: Dict[str, Any]) -> bool:
+        owner = job.get("owner")
+        if owner == self._owner:
+            return True
+        if owner and fcntl is not None:
+            path = self._owner_path(owner)
+            if not os.path.exists(path):
+                return False
+            with open(path, "a") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return True
+                # Nobody holds it: the owner is gone
+                os.remove(path)
+            return False
+        pid = job.get("pid")
+        if not pid or pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self._dir, f"{job_id}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load(self) -> None:
+        # Drop owner files of processes that are gone (their jobs are handled below)
+        for p in glob.glob(os.path.join(self._dir, "owners", "*.lock")):
+            owner = os.path.basename(p)[: -len(".lock")]
+            if owner != self._owner:
+                self._owner_alive({"owner": owner})
+        for p in glob.glob(os.path.join(self._dir, "*.json")):
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except Exception:
+                _log.warning("Skipping unreadable job record %s", p)
+                continue
+            if job.get("status") in _ACTIVE and not self._owner_alive(job):
+                job["status"] = "interrupted"
+                job["finished_at"] = time.time()
+                self._save(job)
+            self._jobs[job["id"]] = job
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        path = os.path.join(self._dir, f"{job['id']}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
+        self._last_save[job["id"]] = time.time()
+
+    def submit(self, source_uri: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "source_uri": source_uri,
+            "status": "queued",
+            "owner": self._owner,
+            "pid": os.getpid(),
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": {"files_read": 0, "files_skipped": 0, "files_failed": 0, "chunks_embedded": 0, "rows_inserted": 0},
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._cancel[job_id] = threading.Event()
+            self._save(job)
+        self._pool.submit(self._execute, job_id, source_uri, options)
+        _log.info("Ingest job queued: id=%s source=%s", job_id, source_uri)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.get("owner") == self._owner:
+                return json.loads(json.dumps(job))
+        # Not ours: another process may have queued it or moved it on since we last looked
+        return self._read(job_id) or (json.loads(json.dumps(job)) if job else None)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Request cancellation. Queued jobs never start; running ones stop at the next batch."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            ev = self._cancel.get(job_id)
+            if job["status"] in _ACTIVE and ev is not None:
+                ev.set()
+                if job["status"] == "queued":
+                    job["status"] = "cancelled"
+                    job["finished_at"] = time.time()
+                    self._save(job)
+                    self._cancel.pop(job_id, None)
+        return self.get(job_id)
+
+    def _progress(self, job_id: str, counter: str, n: int) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["progress"][counter] = job["progress"].get(counter, 0) + n
+            # Throttle disk writes; the in-memory record is always current
+            if time.time() - self._last_save.get(job_id, 0) >= 1.0:
+                self._save(job)
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update({"status": status, "result": result, "error": error, "finished_at": time.time()})
+            self._save(job)
+            self._cancel.pop(job_id, None)
+            snapshot = json.loads(json.dumps(job))
+        if self._on_finish is not None:
+            try:
+                self._on_finish(snapshot)
+            except Exception as e:
+                _log.exception("Ingest job on_finish hook failed: id=%s: %s", job_id, e)
+
+    def _execute(self, job_id: str, source_uri: str, options: Dict[str, Any]) -> None:
+        ev = self._cancel.get(job_id)
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["status"] != "queued" or ev is None or ev.is_set():
+                return
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self._save(job)
+        try:
+            result = self._run(
+                source_uri,
+                options,
+                on_progress=lambda counter, n: self._progress(job_id, counter, n),
+                should_cancel=ev.is_set,
+            )
+            self._finish(job_id, "succeeded", result=result)
+            _log.info("Ingest job finished: id=%s result=%s", job_id, result)
+        except IngestCancelled:
+            self._finish(job_id, "cancelled")
+            _log.info("Ingest job cancelled: id=%s", job_id)
+        except Exception as e:
+            _log.exception("Ingest job failed: id=%s: %s", job_id, e)
+            self._finish(job_id, "failed", error=str(e))
@@ -1,10 +1,13 @@
 import os
 import logging
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from api.routes_health import health_bp
 from api.routes_ask import ask_bp
 from api.routes_ingest import ingest_bp
+from api.routes_metrics import metrics_bp
+from api.warmup import start_warm_up
+from tools.llm_scheduler import LLMOverloaded
 from dotenv import load_dotenv
 
 
@@ -39,11 +42,21 @@ def create_app() -> Flask:
     app.register_blueprint(health_bp)
     app.register_blueprint(ask_bp)
     app.register_blueprint(ingest_bp)
+    app.register_blueprint(metrics_bp)
+
+    @app.errorhandler(LLMOverloaded)
+    def llm_overloaded(e: LLMOverloaded):
+        # Shed by the Ollama scheduler: tell the client when to come back instead of letting it time out
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    # Connect Milvus, load Ollama models and embed once in the background; /readyz reports progress
+    start_warm_up()
 
     return app
 
 
 if __name__ == "__main__":
+    # Flask development server; production runs serve.py
     app = create_app()
     port = int(os.getenv("APP_PORT", 8000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,169 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple, Any
+
+# Seconds; spans a fast cache hit up to a slow CPU-bound LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels: Any) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for k, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(k)} {v}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: Any) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = float(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for k, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(k)} {v}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        k = _key(labels)
+        with self._lock:
+            s = self._series.get(k)
+            if s is None:
+                s = self._series[k] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for k, s in sorted(self._series.items()):
+                for i, b in enumerate(self.buckets):
+                    lines.append(f"{self.name}_bucket{_fmt_labels(k, ('le', repr(float(b))))} {int(s[i])}")
+                lines.append(f"{self.name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {int(s[-1])}")
+                lines.append(f"{self.name}_sum{_fmt_labels(k)} {s[-2]}")
+                lines.append(f"{self.name}_count{_fmt_labels(k)} {int(s[-1])}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("legal_stage_seconds", "Wall time of hot-path stages (embed, milvus_search, llm, firecrawl).")
+HTTP_SECONDS = Histogram("legal_http_request_seconds", "Flask request latency by route (time to first byte for streams).")
+LLM_SECONDS = Histogram("legal_llm_seconds", "Client-side wall time of Ollama generate calls.")
+LLM_PHASE_SECONDS = Histogram("legal_llm_phase_seconds", "Ollama-reported durations: load, prompt_eval, eval, total.")
+LLM_TOKENS = Counter("legal_llm_tokens_total", "Tokens processed by Ollama, by kind (prompt, completion).")
+LLM_PROMPT_CHARS = Histogram("legal_llm_prompt_chars", "Prompt size in characters sent to Ollama.", SIZE_BUCKETS)
+ROUTING_DECISIONS = Counter("legal_routing_decisions_total", "Routing verdicts by tier (heuristic, llm) and result.")
+LLM_QUEUE_DEPTH = Gauge("legal_llm_queue_depth", "Ollama calls waiting for a slot, by model and priority.")
+LLM_IN_FLIGHT = Gauge("legal_llm_in_flight", "Ollama calls holding a slot, by host and model.")
+LLM_QUEUE_WAIT = Histogram("legal_llm_queue_wait_seconds", "Time Ollama calls waited for a slot, by model and priority.")
+LLM_SHED = Counter("legal_llm_shed_total", "Ollama calls rejected by the scheduler, by model, priority and reason.")
+
+_METRICS = [
+    STAGE_SECONDS, HTTP_SECONDS, LLM_SECONDS, LLM_PHASE_SECONDS, LLM_TOKENS, LLM_PROMPT_CHARS, ROUTING_DECISIONS,
+    LLM_QUEUE_DEPTH, LLM_IN_FLIGHT, LLM_QUEUE_WAIT, LLM_SHED,
+]
+
+# LLM usage collected for the current request (see llm_usage())
+_usage: ContextVar[Optional[Dict[str, float]]] = ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def timer(stage: str, **labels: Any):
+    """Observe the wall time of the enclosed block under legal_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, **labels)
+
+
+def record_llm(model: str, prompt_chars: int, seconds: float, data: Dict[str, Any]) -> None:
+    """Record one finished Ollama call from its final response object."""
+    LLM_SECONDS.observe(seconds, model=model)
+    STAGE_SECONDS.observe(seconds, stage="llm")
+    LLM_PROMPT_CHARS.observe(prompt_chars, model=model)
+    prompt_tokens = data.get("prompt_eval_count") or 0
+    completion_tokens = data.get("eval_count") or 0
+    LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+    for phase in ("load", "prompt_eval", "eval", "total"):
+        ns = data.get(f"{phase}_duration")
+        if ns:
+            LLM_PHASE_SECONDS.observe(ns / 1e9, model=model, phase=phase)
+    usage = _usage.get()
+    if usage is not None:
+        usage["prompt_chars"] = usage.get("prompt_chars", 0) + prompt_chars
+        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + prompt_tokens
+        usage["completion_tokens"] = usage.get("completion_tokens", 0) + completion_tokens
+        usage["prompt_eval_ms"] = usage.get("prompt_eval_ms", 0) + round((data.get("prompt_eval_duration") or 0) / 1e6, 1)
+
+
+@contextmanager
+def llm_usage():
+    """Collect token counts of the Ollama calls made by the enclosed block on this thread.
+
+    Yields a dict that is filled in as calls complete.
+    """
+    usage: Dict[str, float] = {}
+    previous = _usage.get()
+    _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.set(previous)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in _METRICS:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,299 @@
+import os
+import re
+import logging
+import functools
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Callable, Tuple
+
+import yaml
+
+from retriever.context_packer import estimate_tokens
+
+_log = logging.getLogger(__name__)
+
+# Heading patterns, outermost first; the index is the heading's level in the section path.
+# The number must be followed by a period, a colon, the end of the line or a capitalized title,
+# so prose such as "Section 1983 claims ..." is not taken for a heading
+_TAIL = r"(?:[.:]|\s*$|\s+[A-Z\u2014\u2013-])"
+_HEADINGS = [
+    re.compile(r"^(?:TITLE|Title|PART|Part)\s+[IVXLC\d]+[A-Za-z]?" + _TAIL),
+    re.compile(r"^(?:CHAPTER|Chapter|DIVISION|Division)\s+[IVXLC\d]+[A-Za-z\-\d]*" + _TAIL),
+    re.compile(r"^(?:ARTICLE|Article|SUBCHAPTER|Subchapter)\s+[IVXLC\d]+[A-Za-z\-\d]*" + _TAIL),
+    re.compile(r"^(?:§§?\s*|(?:SECTION|Section|SEC\.|Sec\.)\s+)\d[\w\-]*(?:\.\d[\w\-]*)*" + _TAIL),
+]
+_MARKDOWN = re.compile(r"^(#{1,6})\s+\S")
+_CAPS = re.compile(r"^[A-Z][A-Z0-9 ,;:'&()\-]{2,79}$")
+_SUBSECTION = re.compile(r"^\(([a-z]{1,2}|[0-9]{1,3}|[ivxl]{1,5}|[A-Z])\)\s")
+_SENTENCE_END = re.compile(r"[.!?;][\"')\]]*\s+")
+# Words whose trailing period does not end a sentence in legal text
+_ABBREV = {
+    "art", "cal", "civ", "cf", "ch", "co", "corp", "dr", "e.g", "etc", "i.e", "id", "inc", "ltd",
+    "mr", "ms", "no", "nos", "p", "para", "pp", "proc", "sec", "secs", "stat", "subd", "supp",
+    "u.s", "u.s.c", "v", "vs", "cir", "app", "ct", "f", "rev", "gov", "pen", "bus", "prof",
+}
+_LABEL_MAX = 1024  # section field length in the Milvus schema
+_WORD_LOOKBACK = 32  # chars searched for the word before a period; longer than any abbreviation
+
+
+def load_chunking_cfg() -> Dict[str, Any]:
+    cfg_path = os.path.join(os.path.dirname(__file__), "..", "configs", "retrieval.yaml")
+    with open(os.path.normpath(cfg_path), "r", encoding="utf-8") as f:
+        return (yaml.safe_load(f) or {}).get("chunking") or {}
+
+
+@functools.lru_cache(maxsize=None)
+def token_counter(encoding: str = "") -> Callable[[str], int]:
+    """Token count function: a tiktoken encoding when installed, else the ~4 chars/token estimate."""
+    if encoding and encoding != "estimate":
+        try:
+            import tiktoken
+
+            enc = tiktoken.get_encoding(encoding)
+            return lambda text: len(enc.encode(text, disallowed_special=()))
+        except Exception as e:
+            _log.warning("Tokenizer %s unavailable (%s); sizing chunks with the character estimate", encoding, e)
+    return estimate_tokens
+
+
+def _heading_level(line: str, in_paragraph: bool) -> Optional[int]:
+    md = _MARKDOWN.match(line)
+    if md:
+        return len(md.group(1)) - 1
+    for level, pat in enumerate(_HEADINGS):
+        if pat.match(line):
+            return level
+    if not in_paragraph and _CAPS.match(line) and sum(c.isalpha() for c in line) >= 3:
+        return 2  # free-standing all-caps title, e.g. "GENERAL PROVISIONS"
+    return None
+
+
+def _heading_label(line: str) -> str:
+    label = line.lstrip("#").strip()
+    return label if len(label) <= 120 else label[:117].rstrip() + "..."
+
+
+def sentence_starts(text: str) -> List[int]:
+    """Offsets where sentences begin, skipping periods of common legal abbreviations."""
+    starts = [0]
+    for m in _SENTENCE_END.finditer(text):
+        # Only the last word matters; a bounded window keeps long paragraphs linear
+        before = text[max(0, m.start() - _WORD_LOOKBACK):m.start()].rsplit(None, 1)
+        word = before[-1].lower().lstrip("(\"'") if before else ""
+        if text[m.start()] == "." and (word in _ABBREV or (len(word) == 1 and word.isalpha())):
+            continue
+        if m.end() < len(text):
+            starts.append(m.end())
+    return starts
+
+
+def _split_oversized(text: str, max_tokens: int, count: Callable[[str], int]) -> List[str]:
+    """Split one over-long paragraph at sentence boundaries, then at words as a last resort."""
+    starts = sentence_starts(text) + [len(text)]
+    sentences = [text[a:b].strip() for a, b in zip(starts, starts[1:]) if text[a:b].strip()]
+    pieces: List[str] = []
+    cur: List[str] = []
+    for s in sentences:
+        if count(s) > max_tokens:
+            words = s.split()
+            part: List[str] = []
+            for w in words:
+                if part and count(" ".join(part + [w])) > max_tokens:
+                    pieces.append(" ".join(part))
+                    part = []
+                part.append(w)
+            s = " ".join(part)
+        if cur and count(" ".join(cur + [s])) > max_tokens:
+            pieces.append(" ".join(cur))
+            cur = []
+        cur.append(s)
+    if cur:
+        pieces.append(" ".join(cur))
+    return pieces
+
+
+class LegalChunker:
+    """Structure-aware chunker for statutes, regulations and other legal text.
+
+    Lines are grouped into units (paragraphs and lettered/numbered
+    subsections) under a section path built from detected headings (Title /
+    Chapter / Article / § or Section, markdown and all-caps headings). Units
+    are packed into chunks of at most ``max_tokens`` without crossing a
+    section boundary; over-long paragraphs are split at sentences. Each chunk
+    after the first in a section starts with the trailing whole sentences of
+    the previous one, up to ``overlap_tokens``, as an exact copy so the
+    context packer can merge neighbours back together. A section holding
+    only a heading shorter than ``min_tokens`` (a bare "CHAPTER 3" line) is
+    carried into the next chunk instead of being emitted alone.
+
+    ``chunks(lines)`` consumes any iterable of lines, so files are chunked
+    as they are read. With ``first_page`` set, form feeds (``\f``) mark page
+    breaks and chunks carry ``page_start``/``page_end``. Settings come from the ``chunking`` block of
+    configs/retrieval.yaml.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        cfg: Optional[Dict[str, Any]] = None,
+    ):
+        cfg = cfg if cfg is not None else load_chunking_cfg()
+        self.max_tokens = int(max_tokens or cfg.get("max_tokens", 350))
+        self.overlap_tokens = int(overlap_tokens if overlap_tokens is not None else cfg.get("overlap_tokens", 50))
+        self.min_tokens = int(cfg.get("min_tokens", 30))
+        self.count = token_counter(str(cfg.get("tokenizer", "cl100k_base")))
+
+    def chunks(
+        self, lines: Iterable[str], default_section: str = "", first_page: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield ``{"text", "section"}`` dicts (plus page range when paged) in document order."""
+        path: List[Tuple[int, str]] = []
+        para: List[str] = []
+        para_tokens = 0
+        para_page: Optional[int] = None
+        page = first_page
+        marker = ""
+        state = _ChunkState(self)
+
+        def section() -> str:
+            label = " > ".join(lbl for _, lbl in path) or default_section
+            return label[:_LABEL_MAX]
+
+        def end_para(heading: bool = False) -> Iterator[Dict[str, Any]]:
+            nonlocal para, para_tokens, marker
+            text = " ".join(para)
+            para, para_tokens = [], 0
+            if text:
+                yield from state.add(text, marker, heading, (para_page, page))
+            marker = ""
+
+        def feed(raw: str) -> Iterator[Dict[str, Any]]:
+            nonlocal path, para_tokens, para_page, marker
+            line = raw.strip()
+            if not line:
+                yield from end_para()
+                return
+            # Indented lines continue the paragraph they are in
+            level = _heading_level(line, bool(para)) if (not para or raw[:1] not in " \t") else None
+            if level is not None:
+                yield from end_para()
+                yield from state.end_section()
+                path = [(lvl, lbl) for lvl, lbl in path if lvl < level] + [(level, _heading_label(line))]
+                state.section = section()
+            sub = _SUBSECTION.match(line)
+            if sub and para and level is None:
+                yield from end_para()
+            if sub and not para:
+                marker = f"({sub.group(1)})"
+            if not para:
+                para_page = page
+            para.append(line)
+            para_tokens += self.count(line)
+            if para_tokens > self.max_tokens * 4:
+                # Pathologically long paragraph: flush it before it grows without bound
+                yield from end_para()
+            if level is not None:
+                # A heading line is a unit of its own; the body follows as new paragraphs
+                yield from end_para(heading=True)
+
+        state.section = section()
+        for raw in lines:
+            # Paragraphs run on across page breaks; only the page counter moves
+            for n, part in enumerate(raw.split("\f")):
+                if n and page is not None:
+                    page += 1
+                if n and not part.strip():
+                    continue  # a break at the end of a line is not a blank line
+                yield from feed(part)
+        yield from end_para()
+        yield from state.end_section(final=True)
+
+
+class _ChunkState:
+    """Accumulates units for the current section and emits sized, overlapping chunks."""
+
+    def __init__(self, chunker: LegalChunker):
+        self.c = chunker
+        self.section = ""
+        self.units: List[str] = []
+        self.tokens = 0
+        self.fresh = False  # current chunk holds more than carried-over overlap
+        self.heading_only = True
+        self.emitted = False  # a chunk of the current section was already yielded
+        self.markers: List[str] = []
+        self.pages: List[Tuple[Optional[int], Optional[int]]] = []  # page span of each unit
+
+    def add(
+        self, text: str, marker: str = "", heading: bool = False, pages: Tuple[Optional[int], Optional[int]] = (None, None)
+    ) -> Iterator[Dict[str, Any]]:
+        c = self.c
+        t = c.count(text)
+        # Leave room for the overlap carried into each continuation chunk
+        budget = max(c.max_tokens - c.overlap_tokens, c.max_tokens // 2)
+        pieces = [text] if t <= c.max_tokens else _split_oversized(text, budget, c.count)
+        for i, piece in enumerate(pieces):
+            pt = t if len(pieces) == 1 else c.count(piece)
+            if self.tokens + pt > c.max_tokens:
+                if not self.fresh:
+                    self.units, self.tokens, self.pages = [], 0, []  # overlap does not fit: drop it
+                elif not (self.heading_only and self.tokens < c.min_tokens):
+                    # A short heading stays with its body even if that overshoots a little
+                    yield self._emit()
+                    self._carry_overlap()
+                    if self.tokens + pt > c.max_tokens:
+                        self.units, self.tokens, self.pages = [], 0, []
+            self.units.append(piece)
+            self.pages.append(pages)
+            self.tokens += pt
+            self.fresh = True
+            self.heading_only = self.heading_only and heading
+            # Pieces of a split subsection keep its marker in the section label
+            if marker and (i == 0 or not self.markers):
+                self.markers.append(marker)
+
+    def end_section(self, final: bool = False) -> Iterator[Dict[str, Any]]:
+        if not self.fresh:
+            self._reset()
+            return
+        if not final and self.heading_only and not self.emitted and self.tokens < self.c.min_tokens:
+            # Bare heading: fold it into the next section's first chunk
+            units, tokens, pages = self.units, self.tokens, self.pages
+            self._reset()
+            self.units, self.tokens, self.pages, self.fresh = units, tokens, pages, True
+            return
+        yield self._emit()
+        self._reset()
+
+    def _emit(self) -> Dict[str, Any]:
+        label = self.section
+        if self.markers:
+            span = self.markers[0] if len(self.markers) == 1 else f"{self.markers[0]}-{self.markers[-1]}"
+            label = f"{label} {span}".strip() if label else span
+        self.emitted = True
+        out: Dict[str, Any] = {"text": "\n\n".join(self.units), "section": label[:_LABEL_MAX]}
+        pages = [p for span in self.pages for p in span if p is not None]
+        if pages:
+            out["page_start"], out["page_end"] = min(pages), max(pages)
+        return out
+
+    def _carry_overlap(self) -> None:
+        c = self.c
+        last = self.units[-1] if self.units else ""
+        last_pages = self.pages[-1] if self.pages else (None, None)
+        self.units, self.tokens, self.fresh, self.markers, self.pages = [], 0, False, [], []
+        self.heading_only = False
+        if c.overlap_tokens <= 0 or not last:
+            return
+        # Earliest sentence start whose suffix fits the overlap budget; the suffix is copied verbatim
+        for start in sentence_starts(last):
+            if start == 0:
+                continue
+            tail = last[start:]
+            n = c.count(tail)
+            if n <= c.overlap_tokens:
+                self.units, self.tokens, self.pages = [tail], n, [(last_pages[1], last_pages[1])]
+                return
+
+    def _reset(self) -> None:
+        self.units, self.tokens, self.fresh, self.markers, self.pages = [], 0, False, [], []
+        self.heading_only = True
+        self.emitted = False
@@ -0,0 +1,132 @@
+import os
+import re
+import math
+import logging
+from typing import List, Dict, Any, Set, Optional
+
+import yaml
+
+_log = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose; good enough for budgeting
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _shingles(text: str, n: int = 3) -> Set[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) < n:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _overlap(left: str, right: str, min_len: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right`` (0 if below ``min_len``)."""
+    max_len = min(len(left), len(right))
+    for size in range(max_len, min_len - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextPacker:
+    """Turns raw retrieval hits into the context actually sent to the agents.
+
+    1. Merges chunks from the same source whose text overlaps end-to-start,
+       as produced by the ingest chunk overlap.
+    2. Drops near-duplicates (word-shingle Jaccard >= ``dedup_threshold``).
+    3. Reranks by a blend of retrieval rank and IDF-weighted query-term
+       coverage.
+    4. Greedily fills ``token_budget`` in rerank order.
+
+    Settings come from the ``packing`` block of configs/retrieval.yaml.
+    """
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        if cfg is None:
+            cfg_path = os.path.join(os.path.dirname(__file__), "..", "configs", "retrieval.yaml")
+            with open(os.path.normpath(cfg_path), "r", encoding="utf-8") as f:
+                cfg = (yaml.safe_load(f) or {}).get("packing") or {}
+        self.enabled = bool(cfg.get("enabled", True))
+        self.token_budget = int(cfg.get("token_budget", 2000))
+        self.dedup_threshold = float(cfg.get("dedup_threshold", 0.85))
+        self.min_merge_overlap = int(cfg.get("min_merge_overlap", 40))
+        weights = cfg.get("weights") or {}
+        self.w_retrieval = float(weights.get("retrieval", 0.5))
+        self.w_terms = float(weights.get("terms", 0.5))
+
+    def pack(self, query: str, ctx: List[Dict[str, Any]], token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        if not self.enabled or not ctx:
+            return ctx
+        budget = token_budget or self.token_budget
+        # Dedup again after merging: a merged chunk can now duplicate another hit
+        items = self._dedup(self._merge_adjacent(self._dedup(ctx)))
+        ranked = self._rerank(query, items)
+
+        out: List[Dict[str, Any]] = []
+        used = 0
+        for c in ranked:
+            cost = estimate_tokens(c.get("text") or "")
+            if used + cost > budget:
+                continue
+            out.append(c)
+            used += cost
+        _log.info("Context packed: in=%d out=%d tokens~%d budget=%d", len(ctx), len(out), used, budget)
+        return out
+
+    def _dedup(self, ctx: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        kept: List[Dict[str, Any]] = []
+        seen: List[Set[str]] = []
+        for c in ctx:
+            sh = _shingles(c.get("text") or "")
+            if any(_jaccard(sh, s) >= self.dedup_threshold for s in seen):
+                continue
+            kept.append(dict(c))
+            seen.append(sh)
+        return kept
+
+    def _merge_adjacent(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        merged = True
+        while merged:
+            merged = False
+            for i, a in enumerate(items):
+                for j, b in enumerate(items):
+                    if i == j or a.get("source") != b.get("source"):
+                        continue
+                    n = _overlap(a.get("text") or "", b.get("text") or "", self.min_merge_overlap)
+                    if n:
+                        # Keep the better-ranked position; scores take the max
+                        a["text"] = a["text"] + b["text"][n:]
+                        a["score"] = max(a.get("score") or 0.0, b.get("score") or 0.0)
+                        if "fused_score" in a or "fused_score" in b:
+                            a["fused_score"] = max(a.get("fused_score") or 0.0, b.get("fused_score") or 0.0)
+                        items.pop(j)
+                        merged = True
+                        break
+                if merged:
+                    break
+        return items
+
+    def _rerank(self, query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        terms = set(_WORD.findall(query.lower()))
+        docs = [set(_WORD.findall((c.get("text") or "").lower())) for c in items]
+        n = len(items)
+        # IDF over the candidate set: terms present in every chunk carry no signal
+        idf = {t: math.log((n + 1) / (1 + sum(1 for d in docs if t in d))) + 1e-6 for t in terms}
+        total = sum(idf.values()) or 1.0
+        scored = []
+        for rank, (c, d) in enumerate(zip(items, docs)):
+            coverage = sum(w for t, w in idf.items() if t in d) / total
+            retrieval = 1.0 / (1 + rank)
+            c["rerank_score"] = round(self.w_retrieval * retrieval + self.w_terms * coverage, 6)
+            scored.append(c)
+        return sorted(scored, key=lambda c: c["rerank_score"], reverse=True)
@@ -0,0 +1,107 @@
+import re
+import json
+import datetime
+from typing import Dict, Any, List, Optional
+
+# Filterable scalar fields stored as real Milvus columns (see scripts/init_milvus.py)
+STRING_FIELDS = ("jurisdiction", "source_type")
+DATE_FIELDS = ("effective_date",)
+SCALAR_FIELDS = STRING_FIELDS + DATE_FIELDS
+
+_RANGE_OPS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def to_date_int(value: Any) -> int:
+    """Normalize a date to YYYYMMDD as stored in ``effective_date`` (0 = unknown)."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, datetime.date, type(None))):
+        raise ValueError(f"invalid date: {value!r}")
+    if value in (None, "", 0):
+        return 0
+    if isinstance(value, datetime.date):
+        return int(value.strftime("%Y%m%d"))
+    # 2020 and "2020" alike mean 20200101
+    digits = re.sub(r"[^0-9]", "", str(value))
+    if len(digits) == 4:
+        digits += "0101"
+    if len(digits) != 8:
+        raise ValueError(f"invalid date: {value!r}")
+    return int(digits)
+
+
+def scalar_values(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Scalar column values for a row, taken from its meta dict."""
+    out: Dict[str, Any] = {f: str(meta.get(f) or "") for f in STRING_FIELDS}
+    out["effective_date"] = to_date_int(meta.get("effective_date"))
+    return out
+
+
+def _check(filters: Dict[str, Any]) -> None:
+    unknown = set(filters) - set(SCALAR_FIELDS)
+    if unknown:
+        raise ValueError(f"unsupported filter field(s): {', '.join(sorted(unknown))}")
+    for field in STRING_FIELDS:
+        value = filters.get(field)
+        values = value if isinstance(value, (list, tuple)) else [value]
+        if any(isinstance(v, (dict, list, tuple)) for v in values):
+            raise ValueError(f"{field} must be a string or a list of strings")
+
+
+def build_expr(filters: Optional[Dict[str, Any]]) -> str:
+    """Compile structured filters to a Milvus boolean expression.
+
+    ``{"jurisdiction": "CA"}``, ``{"source_type": ["statute", "case"]}`` and
+    ``{"effective_date": {"gte": "2020-01-01", "lt": "2024-01-01"}}`` are
+    supported; conditions are AND-ed. Values are JSON-quoted, never
+    interpolated raw.
+    """
+    if not filters:
+        return ""
+    _check(filters)
+    clauses: List[str] = []
+    for field in STRING_FIELDS:
+        value = filters.get(field)
+        if value in (None, "", []):
+            continue
+        if isinstance(value, (list, tuple)):
+            clauses.append(f"{field} in [{', '.join(json.dumps(str(v)) for v in value)}]")
+        else:
+            clauses.append(f"{field} == {json.dumps(str(value))}")
+    for field in DATE_FIELDS:
+        value = filters.get(field)
+        if value in (None, ""):
+            continue
+        if isinstance(value, dict):
+            for op, v in value.items():
+                if op not in _RANGE_OPS:
+                    raise ValueError(f"unsupported operator for {field}: {op}")
+                clauses.append(f"{field} {_RANGE_OPS[op]} {to_date_int(v)}")
+        else:
+            clauses.append(f"{field} == {to_date_int(value)}")
+    return " and ".join(clauses)
+
+
+def matches(meta: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the same filters in Python, for hits from the local lexical index."""
+    if not filters:
+        return True
+    _check(filters)
+    values = scalar_values(meta or {})
+    for field in STRING_FIELDS:
+        want = filters.get(field)
+        if want in (None, "", []):
+            continue
+        allowed = [str(v) for v in want] if isinstance(want, (list, tuple)) else [str(want)]
+        if values[field] not in allowed:
+            return False
+    for field in DATE_FIELDS:
+        want = filters.get(field)
+        if want in (None, ""):
+            continue
+        have = values[field]
+        conds = want.items() if isinstance(want, dict) else [("eq", want)]
+        for op, v in conds:
+            v = to_date_int(v)
+            ok = {"gt": have > v, "gte": have >= v, "lt": have < v, "lte": have <= v, "eq": have == v}.get(op)
+            if not ok:
+                return False
+    return True
@@ -1,35 +1,232 @@
 import os
 import json
 import glob
-from typing import Dict, Any, List, Iterable
+import queue
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple, Callable
 
-from pymilvus import connections, Collection
 from tools.embeddings import embed_texts
+from retriever.milvus_conn import get_milvus
+from retriever.manifest import IngestManifest
+from retriever.lexical_index import LexicalIndex
+from retriever.filters import scalar_values
+from retriever.search_params import load_milvus_cfg, truncate_vectors
+from retriever.chunker import LegalChunker
+from retriever.loaders import supported, extract_all
 
+_log = logging.getLogger(__name__)
 
-def _yield_texts_from_dir(path: str) -> Iterable[Dict[str, str]]:
-    # Read only .txt for simplicity
-    for p in glob.glob(os.path.join(path, "**", "*.txt"), recursive=True):
+STATE_DIR = os.getenv("INGEST_STATE_DIR", os.path.join(os.path.dirname(__file__), "..", ".ingest_state"))
+_DONE = object()
+_READ_BLOCK = 1 << 16
+
+
+class IngestCancelled(Exception):
+    """Raised when an ingest is cancelled between batches; the checkpoint is kept."""
+
+
+def _list_dir(path: str) -> Iterator[str]:
+    # Every file type with a loader in retriever/loaders.py
+    for p in sorted(glob.iglob(os.path.join(path, "**", "*"), recursive=True)):
+        if supported(p) and os.path.isfile(p):
+            yield os.path.relpath(p, path)
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_lines(path: str) -> Iterator[str]:
+    # Bounded reads: a huge single-line file arrives in pieces rather than all at once
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        yield from iter(lambda: f.readline(_READ_BLOCK), "")
+
+
+def _yield_texts_from_dir(path: str, skip: Optional[set] = None) -> Iterable[Dict[str, str]]:
+    # Files are hashed here and only read (or extracted) when chunked, so no file is held in memory whole
+    for source in _list_dir(path):
+        if skip and source in skip:
+            continue
+        full = os.path.join(path, source)
         try:
-            with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                yield {"text": f.read(), "source": os.path.relpath(p, path), "section": ""}
+            sha = _file_sha256(full)
         except Exception:
             continue
+        yield {
+            "path": full,
+            "source": source,
+            "section": "",
+            "sha256": sha,
+        }
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _rows(items: Iterable[Dict[str, str]], chunker: LegalChunker) -> Iterator[Dict[str, Any]]:
+    # The last chunk of each item is flagged so the inserter knows when a source is complete;
+    # one chunk of lookahead is enough, so items are never materialized
+    for it in items:
+        lines = _read_lines(it["path"]) if "path" in it else it["text"].splitlines(keepends=True)
+        prev: Optional[Dict[str, Any]] = None
+        idx = 0
+        try:
+            for ch in chunker.chunks(lines, default_section=it.get("section", ""), first_page=it.get("first_page")):
+                if prev is not None:
+                    yield _row(it, prev, idx == 1, False)
+                prev = ch
+                idx += 1
+        finally:
+            if it.get("spool") and os.path.exists(it["spool"]):
+                os.remove(it["spool"])
+        if prev is not None:
+            yield _row(it, prev, idx == 1, True)
+
+
+def _row(it: Dict[str, Any], ch: Dict[str, Any], first: bool, last: bool) -> Dict[str, Any]:
+    h = _hash_text(ch["text"])
+    pages = {k: ch[k] for k in ("page_start", "page_end") if k in ch}
+    return {
+        "text": ch["text"],
+        "source": it.get("source", ""),
+        "section": ch["section"],
+        "meta": dict(it.get("meta") or {}, chunk_hash=h, **pages),
+        "hash": h,
+        "file_sha256": it.get("sha256"),
+        "first": first,
+        "last": last,
+    }
+
+
+def _batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for r in rows:
+        batch.append(r)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _pipelined(it: Iterable[Any], maxsize: int) -> Iterator[Any]:
+    """Run ``it`` in a background thread, handing items over through a bounded queue.
+
+    The producer blocks when the queue is full, so at most ``maxsize`` items
+    are buffered between two stages. Producer exceptions are re-raised in
+    the consumer.
+    """
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        # Gives up once the consumer has stopped, so a full queue never strands this thread
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in it:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:  # forwarded to the consumer
+            put(e)
+
+    t = threading.Thread(target=produce, daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class _VectorMemo:
+    """Bounded LRU of chunk hash -> vector so repeated chunks are embedded once per run."""
 
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, List[float]]" = OrderedDict()
 
-def _chunk(text: str, size: int = 800, overlap: int = 100) -> List[str]:
-    if size <= 0:
-        return [text]
-    chunks: List[str] = []
-    start = 0
-    n = len(text)
-    while start < n:
-        end = min(n, start + size)
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        start = end - overlap if end - overlap > start else end
-    return chunks
+    def embed(self, rows: List[Dict[str, Any]], **embed_opts: Any) -> List[List[float]]:
+        missing: "OrderedDict[str, str]" = OrderedDict()
+        for r in rows:
+            if r["hash"] not in self._items:
+                missing.setdefault(r["hash"], r["text"])
+        if missing:
+            vecs = embed_texts(list(missing.values()), **embed_opts)
+            for h, v in zip(missing.keys(), vecs):
+                self._items[h] = v
+        out = []
+        for r in rows:
+            self._items.move_to_end(r["hash"])
+            out.append(self._items[r["hash"]])
+        while len(self._items) > max(self.capacity, len(rows)):
+            self._items.popitem(last=False)
+        return out
+
+
+class _Checkpoint:
+    """Per-source progress for a directory ingest, persisted as JSON.
+
+    ``done`` sources were fully inserted; ``partial`` sources may have some
+    rows in the collection and are deleted and re-ingested on resume. A batch
+    marks its sources partial *before* inserting, so a crash mid-insert never
+    leaves unaccounted rows behind.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: set = set()
+        self.partial: set = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.partial = set(data.get("partial", [])) - self.done
+
+    def begin(self, rows: List[Dict[str, Any]]) -> None:
+        self.partial.update(r["source"] for r in rows if r["source"] not in self.done)
+        self.save()
+
+    def record(self, rows: List[Dict[str, Any]]) -> None:
+        for r in rows:
+            if r["last"]:
+                self.done.add(r["source"])
+                self.partial.discard(r["source"])
+            elif r["source"] not in self.done:
+                self.partial.add(r["source"])
+        self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "partial": sorted(self.partial)}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
 
 class Ingestor:
@@ -37,52 +234,222 @@ class Ingestor:
         self.host = host
         self.port = port
         self.collection = collection
+        self._lexical: Optional[LexicalIndex] = None
+        # Must match the stored vector dimension; see vectors.truncate_dim in configs/milvus.yaml
+        self.truncate_dim = int((load_milvus_cfg().get("vectors") or {}).get("truncate_dim") or 0)
+
+    def _lexical_index(self) -> LexicalIndex:
+        # Shared with MilvusRetriever's hybrid search; kept in step with every insert/delete
+        if self._lexical is None:
+            self._lexical = LexicalIndex(self.collection)
+        return self._lexical
+
+    def _state_path(self, kind: str, source_uri: str) -> str:
+        key = hashlib.sha1(f"{self.collection}:{os.path.abspath(source_uri)}".encode("utf-8")).hexdigest()[:16]
+        return os.path.normpath(os.path.join(STATE_DIR, f"{kind}-{key}"))
+
+    def ingest(
+        self,
+        source_uri: str,
+        options: Dict[str, Any],
+        on_progress: Optional[Callable[[str, int], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, Any]:
+        """Stream read -> chunk -> embed batch -> insert batch with bounded buffering.
 
-    def ingest(self, source_uri: str, options: Dict[str, Any]) -> Dict[str, Any]:
-        # Collect texts
-        items: List[Dict[str, str]] = []
+        Directory ingests are incremental: a manifest of file and chunk
+        hashes lets unchanged files be skipped, changed files have their old
+        rows replaced, and removed files have their rows deleted (unless
+        ``options.prune`` is false). Pass ``options.force`` to re-ingest
+        everything. A checkpoint after every inserted batch lets an
+        interrupted run resume where it stopped. Non-text files are parsed
+        by the loaders in retriever/loaders.py on a process pool
+        (``options.parse_workers``).
+        ``on_progress(counter, n)`` is called with files_read, files_skipped,
+        files_failed, chunks_embedded and rows_inserted increments; ``should_cancel()`` is
+        polled between batches and raises IngestCancelled when it returns True.
+        """
+        progress = on_progress or (lambda counter, n: None)
+        cancelled = should_cancel or (lambda: False)
+        checkpoint: Optional[_Checkpoint] = None
+        manifest: Optional[IngestManifest] = None
+        known: Dict[str, str] = {}
+        # options.metadata (jurisdiction, source_type, effective_date, ...) applies to every item;
+        # inline texts may also be objects carrying their own metadata next to "text"
+        base_meta = dict(options.get("metadata") or {})
+        scalar_values(base_meta)  # fail fast on a malformed effective_date
         texts_opt = options.get("texts") or []
         if isinstance(texts_opt, list) and texts_opt:
-            for i, t in enumerate(texts_opt):
-                items.append({"text": str(t), "source": options.get("source", "inline"), "section": f"item-{i}"})
+            items: Iterable[Dict[str, Any]] = (
+                {
+                    "text": str(t.get("text", "")) if isinstance(t, dict) else str(t),
+                    "source": options.get("source", "inline"),
+                    "section": f"item-{i}",
+                    "meta": dict(base_meta, **{k: v for k, v in t.items() if k != "text"}) if isinstance(t, dict) else base_meta,
+                }
+                for i, t in enumerate(texts_opt)
+            )
         elif os.path.isdir(source_uri):
-            items.extend(list(_yield_texts_from_dir(source_uri)))
+            checkpoint = _Checkpoint(options.get("checkpoint") or self._state_path("checkpoint", source_uri) + ".json")
+            manifest = IngestManifest(self._state_path("manifest", source_uri) + ".sqlite", source_uri)
+            if not options.get("force"):
+                known = manifest.hashes()
+            items = (dict(it, meta=base_meta) for it in _yield_texts_from_dir(source_uri, skip=checkpoint.done))
         else:
-            raise ValueError("ingest: either provide options.texts or a directory path with .txt files")
-
-        # Chunk
-        max_chars = int(options.get("chunk_size", 800))
-        overlap = int(options.get("chunk_overlap", 100))
-        rows: List[Dict[str, Any]] = []
-        for it in items:
-            chs = _chunk(it["text"], size=max_chars, overlap=overlap)
-            for idx, ch in enumerate(chs):
-                rows.append({
-                    "text": ch,
-                    "source": it.get("source", ""),
-                    "section": it.get("section", ""),
-                    "meta": {},
-                })
-
-        if not rows:
-            return {"id": "noop", "inserted": 0}
-
-        # Embed
-        vecs = embed_texts([r["text"] for r in rows])
-
-        # Upsert (insert)
-        connections.connect(host=self.host, port=self.port)
-        col = Collection(self.collection)
-        col.load()
-
-        entities = [
-            [r["text"] for r in rows],
-            [r["source"] for r in rows],
-            [r["section"] for r in rows],
-            [json.dumps(r.get("meta", {})) for r in rows],
-            vecs,
-        ]
-        mr = col.insert(entities)
-        col.flush()
-
-        return {"id": "job-ok", "inserted": len(rows), "ids": getattr(mr, "primary_keys", [])}
+            raise ValueError("ingest: either provide options.texts or a directory of supported files (see retriever/loaders.py)")
+
+        # Chunk sizes are in tokens; the older character options are converted at ~4 chars per token
+        max_tokens = options.get("chunk_tokens") or (int(options["chunk_size"]) // 4 if "chunk_size" in options else None)
+        overlap_tokens = options.get("chunk_overlap_tokens")
+        if overlap_tokens is None and "chunk_overlap" in options:
+            overlap_tokens = int(options["chunk_overlap"]) // 4
+        chunker = LegalChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        batch_size = int(options.get("insert_batch_size", 256))
+        queue_size = int(options.get("queue_size", 4))
+        memo = _VectorMemo(int(options.get("dedup_cache_size", 50000)))
+        embed_opts = {"batch_size": options.get("embed_batch_size"), "workers": options.get("embed_workers")}
+
+        col = None
+
+        def collection():
+            nonlocal col
+            if col is None:
+                col = self._collection()
+            return col
+
+        def delete_source(src: str) -> None:
+            collection().delete(f"source == {json.dumps(src)}")
+            self._lexical_index().delete_source(src)
+
+        # Filled by the reader thread, drained by the inserter
+        state_lock = threading.Lock()
+        stale: List[str] = []  # changed files whose previous rows are still in the collection
+        unfinished: Dict[str, str] = {}  # source -> sha256 of files read but not yet fully inserted
+        failed: set = set()
+
+        def delete_stale() -> int:
+            with state_lock:
+                srcs = list(stale)
+                stale.clear()
+            for src in srcs:
+                delete_source(src)
+            return len(srcs)
+
+        def parse_failed(it: Dict[str, Any], e: Exception) -> None:
+            with state_lock:
+                failed.add(it["source"])
+            progress("files_failed", 1)
+
+        try:
+            if checkpoint and checkpoint.partial:
+                for src in sorted(checkpoint.partial):
+                    _log.info("Resuming ingest: removing partial rows for source=%s", src)
+                    delete_source(src)
+                checkpoint.partial.clear()
+                checkpoint.save()
+
+            def changed(src: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+                for it in src:
+                    progress("files_read", 1)
+                    # Inline texts have no manifest entry or file hash and are always ingested
+                    if manifest is not None and it.get("sha256") and known.get(it["source"]) == it["sha256"]:
+                        progress("files_skipped", 1)
+                        continue
+                    if manifest is not None:
+                        with state_lock:
+                            if it["source"] in known:
+                                # Changed file: its old rows go before any new row is inserted, even if it now yields none
+                                stale.append(it["source"])
+                            unfinished[it["source"]] = it["sha256"]
+                    yield it
+
+            def extracted(src: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+                if manifest is None:  # inline texts
+                    return src
+                # PDF/HTML/DOCX are parsed in a process pool; see retriever/loaders.py
+                return extract_all(
+                    src,
+                    os.path.join(STATE_DIR, "spool"),
+                    workers=options.get("parse_workers"),
+                    on_error=parse_failed,
+                )
+
+            def embedded() -> Iterator[Tuple[List[Dict[str, Any]], List[List[float]]]]:
+                batches = _pipelined(_batched(_rows(extracted(changed(items)), chunker), batch_size), queue_size)
+                for batch in batches:
+                    if cancelled():
+                        raise IngestCancelled()
+                    vecs = truncate_vectors(memo.embed(batch, **embed_opts), self.truncate_dim)
+                    progress("chunks_embedded", len(batch))
+                    yield batch, vecs
+
+            inserted = 0
+            replaced = 0
+            file_chunks: Dict[str, List[str]] = {}
+            for batch, vecs in _pipelined(embedded(), queue_size):
+                if cancelled():
+                    # Rows inserted so far are sealed so a resumed run sees them
+                    if col is not None:
+                        col.flush()
+                    raise IngestCancelled()
+                if checkpoint:
+                    checkpoint.begin(batch)
+                replaced += delete_stale()
+                collection().insert([
+                    dict(
+                        text=r["text"],
+                        source=r["source"],
+                        section=r["section"],
+                        meta=json.dumps(r.get("meta", {})),
+                        vector=v,
+                        **scalar_values(r.get("meta", {})),
+                    )
+                    for r, v in zip(batch, vecs)
+                ])
+                self._lexical_index().add(batch)
+                inserted += len(batch)
+                progress("rows_inserted", len(batch))
+                if manifest:
+                    done: Dict[str, Dict[str, Any]] = {}
+                    for r in batch:
+                        file_chunks.setdefault(r["source"], []).append(r["hash"])
+                        if r["last"]:
+                            done[r["source"]] = {"sha256": r["file_sha256"], "chunks": file_chunks.pop(r["source"])}
+                    manifest.update(done)
+                    with state_lock:
+                        for src in done:
+                            unfinished.pop(src, None)
+                if checkpoint:
+                    checkpoint.record(batch)
+                _log.info("Ingest progress: inserted=%d", inserted)
+
+            # Changed files that now produce no rows were never seen by the loop above
+            replaced += delete_stale()
+            if manifest and unfinished:
+                # Files read without producing rows: record empty ones so they are skipped next
+                # time, and forget failed ones so they are retried
+                manifest.update({src: {"sha256": sha, "chunks": []} for src, sha in unfinished.items() if src not in failed})
+                manifest.remove([src for src in unfinished if src in failed])
+
+            removed = 0
+            if manifest and options.get("prune", True):
+                gone = set(known) - set(_list_dir(source_uri))
+                for src in sorted(gone):
+                    delete_source(src)
+                manifest.remove(gone)
+                removed = len(gone)
+
+            if col is not None:
+                # Seal segments once for the whole run rather than per batch
+                col.flush()
+            if checkpoint:
+                checkpoint.clear()
+            # The job id comes from IngestJobQueue; this is the job's result
+            return {"inserted": inserted, "replaced_files": replaced, "removed_files": removed}
+        finally:
+            if manifest:
+                manifest.close()
+
+    def _collection(self):
+        # Shared warm handle; the collection is loaded once per process, not per ingest
+        return get_milvus(self.host, self.port).collection(self.collection, write=True)
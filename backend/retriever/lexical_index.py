@@ -0,0 +1,118 @@
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Any, List, Iterable, Optional
+
+from retriever.filters import matches
+
+INDEX_DIR = os.getenv("INGEST_STATE_DIR", os.path.join(os.path.dirname(__file__), "..", ".ingest_state"))
+
+_TOKEN = re.compile(r"[\w.]+")
+# Very common words only add posting-list work; BM25 would weight them near zero anyway
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it of on or that the this to was what when where which who why will with".split()
+)
+
+
+def chunk_key(source: str, text: str) -> str:
+    """Identity of a chunk shared by the lexical index and Milvus hits, used for fusion."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _match_expr(query: str) -> str:
+    terms = []
+    for tok in _TOKEN.findall(query.lower()):
+        tok = tok.strip(".")
+        if tok and tok not in _STOPWORDS and tok not in terms:
+            terms.append(tok)
+    # Quote every term so FTS5 operators in user input are taken literally
+    return " OR ".join('"%s"' % t.replace('"', '""') for t in terms)
+
+
+class LexicalIndex:
+    """BM25 inverted index over ingested chunks, stored in a local SQLite FTS5 table.
+
+    Kept in step with the Milvus collection by the Ingestor, so exact-term
+    queries (statute numbers, citations) can be matched lexically.
+    """
+
+    def __init__(self, collection: str, path: str = ""):
+        path = os.path.normpath(path or os.path.join(INDEX_DIR, f"lexical-{collection}.sqlite"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+            " text, source UNINDEXED, section UNINDEXED, meta UNINDEXED, key UNINDEXED)"
+        )
+        self._db.commit()
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO chunks (text, source, section, meta, key) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (r["text"], r.get("source", ""), r.get("section", ""), json.dumps(r.get("meta", {})), chunk_key(r.get("source", ""), r["text"]))
+                    for r in rows
+                ],
+            )
+
+    def delete_source(self, source: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks WHERE source = ?", (source,))
+
+    def search(self, query: str, k: int, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        expr = _match_expr(query)
+        if not expr:
+            return []
+        # Metadata filters are checked in Python on meta, so over-fetch when filtering
+        limit = k * 5 if filters else k
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT text, source, section, meta, key, bm25(chunks) AS s FROM chunks WHERE chunks MATCH ? ORDER BY s LIMIT ?",
+                (expr, limit),
+            ).fetchall()
+        out: List[Dict[str, Any]] = []
+        for text, source, section, meta, key, score in rows:
+            try:
+                meta = json.loads(meta)
+            except Exception:
+                meta = {}
+            if not matches(meta, filters):
+                continue
+            if len(out) >= k:
+                break
+            # FTS5 bm25() is lower-is-better; flip it so higher means more relevant
+            out.append({"text": text, "source": source, "section": section, "meta": meta, "key": key, "score": -float(score)})
+        return out
+
+
+def reciprocal_rank_fusion(ranked: List[List[Dict[str, Any]]], weights: List[float], rrf_k: int, k: int) -> List[Dict[str, Any]]:
+    """Fuse ranked lists by weighted RRF: score(d) = sum_i w_i / (rrf_k + rank_i(d)).
+
+    Items are matched across lists by ``chunk_key(source, text)``; the first
+    list an item appears in provides its fields, including its ``score``;
+    the fused value is added as ``fused_score``.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for hits, w in zip(ranked, weights):
+        for rank, h in enumerate(hits, 1):
+            key = h.get("key") or chunk_key(h.get("source", ""), h.get("text", ""))
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {"item": dict(h), "score": 0.0}
+            else:
+                # Keep the earlier list's fields, add any it lacks (e.g. lexical_score)
+                entry["item"] = dict(h, **entry["item"])
+            entry["score"] += w / (rrf_k + rank)
+    ordered = sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:k]
+    out = []
+    for e in ordered:
+        item = dict(e["item"], fused_score=round(e["score"], 6))
+        item.pop("key", None)
+        out.append(item)
+    return out
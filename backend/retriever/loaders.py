@@ -0,0 +1,238 @@
+import os
+import re
+import logging
+import zipfile
+import tempfile
+import multiprocessing
+from collections import deque
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, TextIO
+
+_log = logging.getLogger(__name__)
+
+PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 2)))
+_READ_BLOCK = 1 << 16
+
+# Plain-text formats are read line by line in the ingest process; everything else is
+# extracted to a spool file in a worker process first
+PLAIN_EXTENSIONS = (".txt", ".md")
+
+# extension -> loader(path, out) writing plain text to ``out`` and returning metadata for ``meta``.
+# Loaders emit markdown "#" headings where the format marks them, and "\f" between pages;
+# a returned "first_page" makes the chunker count pages from it.
+LOADERS: Dict[str, Callable[[str, TextIO], Dict[str, Any]]] = {}
+
+
+def register_loader(*extensions: str):
+    def deco(fn: Callable[[str, TextIO], Dict[str, Any]]):
+        for ext in extensions:
+            LOADERS[ext.lower()] = fn
+        return fn
+    return deco
+
+
+def supported(path: str) -> bool:
+    ext = os.path.splitext(path)[1].lower()
+    return ext in PLAIN_EXTENSIONS or ext in LOADERS
+
+
+@register_loader(".pdf")
+def load_pdf(path: str, out: TextIO) -> Dict[str, Any]:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("PDF ingest requires pypdf (pip install pypdf)") from e
+    # PdfReader parses page objects on demand, so only one page's text is held at a time
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt("")
+    n = 0
+    for n, page in enumerate(reader.pages, start=1):
+        if n > 1:
+            out.write("\n\f")
+        out.write(page.extract_text() or "")
+    meta: Dict[str, Any] = {"format": "pdf", "pages": n, "first_page": 1}
+    title = reader.metadata.title if reader.metadata else None
+    if title:
+        meta["title"] = str(title)
+    return meta
+
+
+class _HTMLText(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "nav", "header", "footer", "template", "svg", "head"}
+    _BLOCK = {"p", "div", "li", "tr", "section", "article", "blockquote", "pre", "table", "ul", "ol", "dd", "dt", "main"}
+    _HEADING = re.compile(r"^h([1-6])$")
+
+    def __init__(self, out: TextIO):
+        super().__init__(convert_charrefs=True)
+        self.out = out
+        self.skip = 0
+        self.in_title = False
+        self.title = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self.skip += 1
+        elif tag == "title":
+            self.in_title = True
+        elif tag in self._BLOCK:
+            self.out.write("\n\n")
+        elif tag == "br":
+            self.out.write("\n")
+        else:
+            m = self._HEADING.match(tag)
+            if m:
+                self.out.write("\n\n" + "#" * int(m.group(1)) + " ")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self.skip = max(0, self.skip - 1)
+        elif tag == "title":
+            self.in_title = False
+        elif tag in self._BLOCK or self._HEADING.match(tag):
+            self.out.write("\n\n")
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        elif not self.skip:
+            # Source line breaks are layout, not structure
+            self.out.write(re.sub(r"\s+", " ", data))
+
+
+@register_loader(".html", ".htm", ".xhtml")
+def load_html(path: str, out: TextIO) -> Dict[str, Any]:
+    parser = _HTMLText(out)
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), ""):
+            parser.feed(block)
+    parser.close()
+    meta: Dict[str, Any] = {"format": "html"}
+    if parser.title.strip():
+        meta["title"] = parser.title.strip()
+    return meta
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DC_TITLE = "{http://purl.org/dc/elements/1.1/}title"
+
+
+@register_loader(".docx")
+def load_docx(path: str, out: TextIO) -> Dict[str, Any]:
+    meta: Dict[str, Any] = {"format": "docx"}
+    breaks = 0
+    with zipfile.ZipFile(path) as z:
+        # iterparse + clear keeps memory flat on long documents
+        with z.open("word/document.xml") as f:
+            for _, el in ElementTree.iterparse(f, events=("end",)):
+                if el.tag != _W + "p":
+                    continue
+                parts = []
+                for node in el.iter():
+                    if node.tag == _W + "t" and node.text:
+                        parts.append(node.text)
+                    elif node.tag == _W + "tab":
+                        parts.append(" ")
+                    elif node.tag == _W + "lastRenderedPageBreak" or (
+                        node.tag == _W + "br" and node.get(_W + "type") == "page"
+                    ):
+                        parts.append("\f")
+                        breaks += 1
+                text = "".join(parts).strip(" ")
+                style = el.find(f"{_W}pPr/{_W}pStyle")
+                name = style.get(_W + "val", "") if style is not None else ""
+                level = re.match(r"^(?:Heading|heading)\s*([1-6])$", name)
+                if level and text.strip():
+                    text = "#" * int(level.group(1)) + " " + text
+                elif name == "Title" and text.strip():
+                    text = "# " + text
+                if text:
+                    out.write(text + "\n\n")
+                el.clear()
+        if "docProps/core.xml" in z.namelist():
+            with z.open("docProps/core.xml") as f:
+                title = ElementTree.parse(f).getroot().find(_DC_TITLE)
+            if title is not None and (title.text or "").strip():
+                meta["title"] = title.text.strip()
+    if breaks:
+        # Page numbers as last laid out by Word; approximate, but good enough for citations
+        meta["first_page"] = 1
+    return meta
+
+
+def extract(path: str, spool_dir: str) -> Dict[str, Any]:
+    """Run the registered loader for ``path`` into a spool file. Executed in a worker process."""
+    loader = LOADERS[os.path.splitext(path)[1].lower()]
+    os.makedirs(spool_dir, exist_ok=True)
+    fd, spool = tempfile.mkstemp(suffix=".txt", dir=spool_dir)
+    try:
+        with open(fd, "w", encoding="utf-8") as out:
+            meta = loader(path, out)
+    except BaseException:
+        if os.path.exists(spool):
+            os.remove(spool)
+        raise
+    return {"spool": spool, "meta": meta}
+
+
+def extract_all(
+    items: Iterable[Dict[str, Any]],
+    spool_dir: str,
+    workers: Optional[int] = None,
+    on_error: Optional[Callable[[Dict[str, Any], Exception], None]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Extract items in a process pool, yielding them in input order.
+
+    Plain-text items pass through untouched. Others come back with ``path``
+    pointing at their spool file (delete it once read), ``spool`` set and
+    the loader's metadata merged into ``meta``. At most ``2 * workers``
+    files are in flight, so extracted text never piles up ahead of the
+    chunker. Items whose extraction fails are reported to ``on_error`` and
+    dropped.
+    """
+    workers = max(1, int(workers or PARSE_WORKERS))
+    pending: "deque" = deque()
+    pool: Optional[ProcessPoolExecutor] = None
+
+    def finish(item: Dict[str, Any], fut) -> Iterator[Dict[str, Any]]:
+        if fut is None:
+            yield item
+            return
+        try:
+            res = fut.result()
+        except Exception as e:
+            _log.warning("Extraction failed for %s: %s", item.get("source"), e)
+            if on_error:
+                on_error(item, e)
+            return
+        meta = dict(item.get("meta") or {}, **{k: v for k, v in res["meta"].items() if k != "first_page"})
+        out = dict(item, path=res["spool"], spool=res["spool"], meta=meta)
+        if res["meta"].get("first_page"):
+            out["first_page"] = res["meta"]["first_page"]
+        yield out
+
+    try:
+        for item in items:
+            ext = os.path.splitext(item["path"])[1].lower()
+            fut = None
+            if ext not in PLAIN_EXTENSIONS:
+                if pool is None:
+                    # spawn: the ingest runs on a thread of a threaded server, where fork is unsafe
+                    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                fut = pool.submit(extract, item["path"], spool_dir)
+            pending.append((item, fut))
+            while len(pending) >= 2 * workers:
+                yield from finish(*pending.popleft())
+        while pending:
+            yield from finish(*pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        for _, fut in pending:
+            # Spool files of extractions that finished but were never consumed
+            if fut is not None and fut.done() and not fut.cancelled() and fut.exception() is None:
+                spool = fut.result()["spool"]
+                if os.path.exists(spool):
+                    os.remove(spool)
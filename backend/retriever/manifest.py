@@ -0,0 +1,52 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+
+class IngestManifest:
+    """SQLite record of what has been ingested from a directory into a collection.
+
+    One row per (root, source) file with the SHA-256 of its content and the
+    hashes of the chunks it produced. Ingest compares file hashes against it
+    to skip unchanged files and to find files whose old rows must be replaced.
+    """
+
+    def __init__(self, path: str, root: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " root TEXT NOT NULL, source TEXT NOT NULL, sha256 TEXT NOT NULL,"
+            " chunks TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (root, source))"
+        )
+        self._db.commit()
+
+    def hashes(self) -> Dict[str, str]:
+        with self._lock:
+            cur = self._db.execute("SELECT source, sha256 FROM files WHERE root = ?", (self.root,))
+            return {src: sha for src, sha in cur.fetchall()}
+
+    def update(self, entries: Dict[str, Dict[str, object]]) -> None:
+        """Upsert ``{source: {"sha256": str, "chunks": [str, ...]}}`` in one transaction."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (root, source, sha256, chunks, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.root, src, e["sha256"], json.dumps(e["chunks"]), now) for src, e in entries.items()],
+            )
+
+    def remove(self, sources: Iterable[str]) -> None:
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM files WHERE root = ? AND source = ?", [(self.root, s) for s in sources])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
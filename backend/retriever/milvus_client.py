@@ -1,16 +1,17 @@
 import os
+import asyncio
 from typing import List, Dict, Any
 import json
 import yaml
 import logging
 
-from tools.embeddings import embed_texts
+from tools.embeddings import embed_texts, aembed_texts
+from observability.metrics import timer
+from retriever.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from retriever.filters import build_expr, SCALAR_FIELDS
+from retriever.milvus_conn import get_milvus
+from retriever.search_params import SearchParams, load_milvus_cfg, truncate_vectors
 
-try:
-    from pymilvus import connections, Collection
-except Exception:  # pragma: no cover
-    connections = None  # type: ignore
-    Collection = None  # type: ignore
 
 
 class MilvusRetriever:
@@ -18,79 +19,171 @@ class MilvusRetriever:
         self.host = host
         self.port = port
         self.collection_name = collection
-        self._connected = False
+        self._milvus = get_milvus(host, port)
         # Load retrieval settings
         cfg_path = os.path.join(os.path.dirname(__file__), "..", "configs", "retrieval.yaml")
         with open(os.path.normpath(cfg_path), "r", encoding="utf-8") as f:
             cfg = yaml.safe_load(f) or {}
         self.k_default = int(cfg.get("k", 20))
+        milvus_cfg = load_milvus_cfg()
+        self.search_params = SearchParams(milvus_cfg, default_k=self.k_default)
+        self.truncate_dim = int((milvus_cfg.get("vectors") or {}).get("truncate_dim") or 0)
+        self.default_filters = dict(cfg.get("filters") or {})
+        build_expr(self.default_filters)  # validate at startup
+        hybrid = cfg.get("hybrid") or {}
+        self.hybrid = bool(hybrid.get("enabled", False))
+        self.hybrid_candidates = int(hybrid.get("candidates", 40))
+        self.rrf_k = int(hybrid.get("rrf_k", 60))
+        self.hybrid_weights = [float(hybrid.get("vector_weight", 1.0)), float(hybrid.get("lexical_weight", 1.0))]
+        self.lexical = LexicalIndex(collection) if self.hybrid else None
         self._log = logging.getLogger(__name__)
-        self._log.info("MilvusRetriever initialized host=%s port=%s collection=%s k_default=%s", self.host, self.port, self.collection_name, self.k_default)
+        self._log.info("MilvusRetriever initialized host=%s port=%s collection=%s k_default=%s hybrid=%s", self.host, self.port, self.collection_name, self.k_default, self.hybrid)
 
-    def _connect(self):
-        if self._connected or connections is None:
-            return
-        connections.connect(alias="default", host=self.host, port=self.port)
-        self._connected = True
+    def prepare(self) -> None:
+        """Warm the Milvus connections and collection handle ahead of the first search."""
+        self._milvus.prepare(self.collection_name)
 
-    def retrieve(self, query: str, k: int = None) -> List[Dict[str, Any]]:
-        k = k or self.k_default
-        # 1) embed the query
+    def ping(self) -> bool:
+        return self._milvus.ping(self.collection_name)
+
+    def embed_query(self, query: str) -> List[float]:
         self._log.info("Embedding query for retrieval; len(query)=%d", len(query))
         try:
-            vec = embed_texts([query])[0]
+            return truncate_vectors(embed_texts([query]), self.truncate_dim)[0]
         except Exception as e:
             self._log.exception("Embedding failed: %s", e)
             raise
 
-        # 2) search in Milvus
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        self._log.info("Embedding %d queries for retrieval", len(queries))
+        return truncate_vectors(embed_texts(queries), self.truncate_dim)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        return truncate_vectors(await aembed_texts([query]), self.truncate_dim)[0]
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        return truncate_vectors(await aembed_texts(queries), self.truncate_dim)
+
+    async def aretrieve(self, query: str, vector: List[float] = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        """retrieve() for coroutines. pymilvus 2.4 is blocking, so the search itself runs on a worker thread."""
+        vec = vector if vector is not None else await self.aembed_query(query)
+        return await asyncio.to_thread(self.retrieve, query, vector=vec, **kwargs)
+
+    async def aretrieve_many(self, queries: List[str], vectors: List[List[float]] = None, **kwargs: Any) -> List[List[Dict[str, Any]]]:
+        if vectors is None:
+            vectors = await self.aembed_queries(queries)
+        return await asyncio.to_thread(self.retrieve_many, queries, vectors=vectors, **kwargs)
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = None,
+        vector: List[float] = None,
+        filters: Dict[str, Any] = None,
+        search: Dict[str, Any] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-k chunks for ``query``.
+
+        ``filters`` (see retriever/filters.py) are merged over the ``filters``
+        defaults in configs/retrieval.yaml and pushed down into the Milvus
+        search expression. ``search`` selects a mode preset or explicit
+        ``ef``/``nprobe``/``search_list``/``k`` (see retriever/search_params.py).
+        """
+        # 1) embed the query (callers that already embedded it pass ``vector``)
+        vec = vector if vector is not None else self.embed_query(query)
+        return self.retrieve_many([query], k=k, vectors=[vec], filters=filters, search=search)[0]
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        k: int = None,
+        vectors: List[List[float]] = None,
+        filters: Dict[str, Any] = None,
+        search: Dict[str, Any] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Batched retrieve(): one embedding call and one multi-vector Milvus search for all queries."""
+        k, knobs = self.search_params.resolve(search, k)
+        filters = dict(self.default_filters, **(filters or {}))
+        expr = build_expr(filters)
+        if vectors is None:
+            vectors = self.embed_queries(queries)
+
+        if not self.hybrid:
+            return self._vector_search(vectors, k, expr, knobs)
+
+        # 2) hybrid: dense and BM25 candidates fused by reciprocal rank
+        limit = max(k, self.hybrid_candidates)
+        results: List[List[Dict[str, Any]]] = []
+        for query, dense in zip(queries, self._vector_search(vectors, limit, expr, knobs)):
+            for h in dense:
+                h["vector_score"] = h["score"]
+            with timer("lexical_search"):
+                sparse = self.lexical.search(query, limit, filters=filters)
+            for h in sparse:
+                h["lexical_score"] = h["score"]
+            out = reciprocal_rank_fusion([dense, sparse], self.hybrid_weights, self.rrf_k, k)
+            for h in out:
+                # score stays the vector similarity; lexical-only hits ranked below the dense candidates
+                h["score"] = h.get("vector_score") or 0.0
+            self._log.info("Hybrid retrieval: dense=%d lexical=%d fused=%d", len(dense), len(sparse), len(out))
+            results.append(out)
+        return results
+
+    def _hit_to_item(self, h) -> Dict[str, Any]:
+        # When output_fields provided, use .entity.get
+        try:
+            text = h.entity.get("text")
+        except Exception:
+            text = None
+        try:
+            source = h.entity.get("source")
+        except Exception:
+            source = None
+        try:
+            section = h.entity.get("section")
+        except Exception:
+            section = None
+        try:
+            meta = h.entity.get("meta")
+        except Exception:
+            meta = None
+        if isinstance(meta, str):
+            try:
+                meta = json.loads(meta)
+            except Exception:
+                pass
+        item = {
+            "text": text or "",
+            "source": source or "",
+            "section": section or "",
+            "meta": meta or {},
+            "score": float(h.distance),
+        }
+        for field in SCALAR_FIELDS:
+            try:
+                item[field] = h.entity.get(field)
+            except Exception:
+                pass
+        return item
+
+    def _vector_search(self, vecs: List[List[float]], k: int, expr: str = "", knobs: Dict[str, int] = None) -> List[List[Dict[str, Any]]]:
+        param = self.search_params.param(knobs or self.search_params.defaults, k)
         try:
-            self._connect()
-            if Collection is None:
-                raise RuntimeError("pymilvus not available")
-            col = Collection(self.collection_name)
             # use default field names: "vector" as embedding field; adjust if different
-            res = col.search(
-                data=[vec],
-                anns_field="vector",
-                param={"metric_type": "COSINE", "params": {"ef": 128}},
-                limit=k,
-                output_fields=["text", "source", "section", "meta"],
+            with timer("milvus_search"):
+                res = self._milvus.call(self.collection_name, lambda col: col.search(
+                    data=vecs,
+                    anns_field="vector",
+                    param=param,
+                    limit=k,
+                    expr=expr or None,
+                    output_fields=["text", "source", "section", "meta", *SCALAR_FIELDS],
+                ))
+            out = [[self._hit_to_item(h) for h in hits] for hits in res]
+            self._log.info(
+                "Milvus search completed: nq=%d hits=%d (limit=%d params=%s expr=%s)",
+                len(vecs), sum(len(o) for o in out), k, param["params"], expr or "-",
             )
-            hits = res[0]
-            out: List[Dict[str, Any]] = []
-            for h in hits:
-                fields = h.entity.get("" ) if hasattr(h, "entity") else {}
-                # When output_fields provided, use .entity.fields
-                try:
-                    text = h.entity.get("text")
-                except Exception:
-                    text = None
-                try:
-                    source = h.entity.get("source")
-                except Exception:
-                    source = None
-                try:
-                    section = h.entity.get("section")
-                except Exception:
-                    section = None
-                try:
-                    meta = h.entity.get("meta")
-                except Exception:
-                    meta = None
-                if isinstance(meta, str):
-                    try:
-                        meta = json.loads(meta)
-                    except Exception:
-                        pass
-                out.append({
-                    "text": text or "",
-                    "source": source or "",
-                    "section": section or "",
-                    "meta": meta or {},
-                    "score": float(h.distance),
-                })
-            self._log.info("Milvus search completed: %d hits returned (limit=%d)", len(out), k)
             return out
         except Exception as e:
             self._log.exception("Milvus search failed: %s", e)
@@ -0,0 +1,199 @@
+import os
+import itertools
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from pymilvus import connections, Collection, utility
+    from pymilvus.exceptions import MilvusException, MilvusUnavailableException, ConnectionNotExistException
+    from pymilvus.client.types import Status
+except Exception:  # pragma: no cover
+    connections = None  # type: ignore
+    Collection = None  # type: ignore
+    utility = None  # type: ignore
+    MilvusException = MilvusUnavailableException = ConnectionNotExistException = None  # type: ignore
+    Status = None  # type: ignore
+
+try:
+    import grpc
+except Exception:  # pragma: no cover
+    grpc = None  # type: ignore
+
+from retriever.filters import SCALAR_FIELDS
+
+_log = logging.getLogger(__name__)
+
+# Comma-separated host:port list of Milvus proxies; reads are spread round-robin, writes use the first
+MILVUS_HOSTS = os.getenv("MILVUS_HOSTS", "")
+MILVUS_REPLICAS = int(os.getenv("MILVUS_REPLICAS", "1"))
+
+
+def parse_hosts(spec: str, default_port: str = "19530") -> List[Tuple[str, str]]:
+    out = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        host, _, port = part.partition(":")
+        out.append((host, port or default_port))
+    return out
+
+
+class SchemaMismatch(RuntimeError):
+    """The collection predates fields that ingest writes and retrieval reads."""
+
+
+def check_schema(col, name: str) -> None:
+    """Raise SchemaMismatch, with migration instructions, if ``col`` lacks the filterable metadata fields."""
+    have = {f.name for f in col.schema.fields}
+    missing = [f for f in SCALAR_FIELDS if f not in have]
+    if missing:
+        raise SchemaMismatch(
+            f"Milvus collection '{name}' is missing field(s) {', '.join(missing)} (created before metadata filters). "
+            f"Copy it into the current schema with `python scripts/migrate_index.py --source {name} --target {name}_v2`, "
+            f"then set MILVUS_COLLECTION={name}_v2 (or pass --alias). See 'Migrating older collections' in backend/README.md."
+        )
+
+
+def is_connection_error(e: BaseException) -> bool:
+    """True for transport failures that a reconnect can fix.
+
+    Bad expressions, unknown fields and other server-side validation errors
+    are not: reconnecting would only drop every other caller's handles.
+    """
+    if isinstance(e, ConnectionError):
+        return True
+    if grpc is not None:
+        if isinstance(e, grpc.FutureTimeoutError):  # connect timed out
+            return True
+        if isinstance(e, grpc.RpcError) and callable(getattr(e, "code", None)):
+            return e.code() == grpc.StatusCode.UNAVAILABLE
+    if MilvusException is None or not isinstance(e, MilvusException):
+        return False
+    if isinstance(e, (MilvusUnavailableException, ConnectionNotExistException)):
+        return True
+    # pymilvus re-raises exhausted gRPC retries as MilvusException carrying the gRPC status code
+    return e.code == Status.CONNECT_FAILED or (grpc is not None and e.code == grpc.StatusCode.UNAVAILABLE)
+
+
+class MilvusManager:
+    """Warm Milvus connections and collection handles shared by the retriever and the ingestor.
+
+    - One connection alias per proxy, opened once.
+    - Collection handles are cached per (alias, name), so queries skip the
+      describe round trip.
+    - Load state is checked once per collection; unloaded collections are
+      loaded with ``replica_number`` replicas.
+    - ``call`` runs an operation on a read handle (round-robin across
+      proxies); on a connection failure it reconnects and, for reads,
+      retries once. Other errors are raised as they are.
+    """
+
+    def __init__(self, hosts: List[Tuple[str, str]], replicas: int = MILVUS_REPLICAS):
+        if not hosts:
+            raise ValueError("MilvusManager needs at least one host")
+        self.hosts = hosts
+        self.replicas = replicas
+        self.aliases = [f"milvus-{i}" for i in range(len(hosts))]
+        self._lock = threading.Lock()
+        self._connected: set = set()
+        self._handles: Dict[Tuple[str, str], Any] = {}
+        self._loaded: set = set()
+        self._rr = itertools.cycle(range(len(hosts)))
+
+    def _connect(self, i: int) -> str:
+        alias = self.aliases[i]
+        if alias in self._connected:
+            return alias
+        if connections is None:
+            raise RuntimeError("pymilvus not available")
+        host, port = self.hosts[i]
+        connections.connect(alias=alias, host=host, port=port)
+        self._connected.add(alias)
+        _log.info("Milvus connected: alias=%s host=%s port=%s", alias, host, port)
+        return alias
+
+    def _ensure_loaded(self, name: str, alias: str) -> None:
+        # Loading is collection-wide on the server, so one check per process is enough
+        if name in self._loaded:
+            return
+        state = utility.load_state(name, using=alias)
+        if getattr(state, "name", str(state)) != "Loaded":
+            _log.info("Loading collection %s (replica_number=%d)", name, self.replicas)
+            Collection(name, using=alias).load(replica_number=self.replicas)
+        self._loaded.add(name)
+
+    def _handle(self, name: str, i: int):
+        with self._lock:
+            alias = self._connect(i)
+            key = (alias, name)
+            col = self._handles.get(key)
+            if col is None:
+                col = Collection(name, using=alias)
+                check_schema(col, name)
+                self._ensure_loaded(name, alias)
+                self._handles[key] = col
+            return col
+
+    def collection(self, name: str, write: bool = False):
+        """Cached handle; writes always go through the first proxy."""
+        return self._handle(name, 0 if write else next(self._rr))
+
+    def _reset(self, name: str) -> None:
+        with self._lock:
+            for alias in list(self._connected):
+                try:
+                    connections.disconnect(alias)
+                except Exception:
+                    pass
+            self._connected.clear()
+            self._handles.clear()
+            self._loaded.discard(name)
+
+    def call(self, name: str, fn: Callable[[Any], Any], write: bool = False) -> Any:
+        """Run ``fn(collection)``; on a connection failure reconnect and retry once unless it is a write."""
+        try:
+            return fn(self.collection(name, write=write))
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            _log.warning("Milvus call failed (%s); reconnecting", e)
+            self._reset(name)
+            if write:
+                raise
+            return fn(self.collection(name, write=write))
+
+    def ping(self, name: str) -> bool:
+        """Cheap liveness check: the collection is still loaded on the server."""
+        try:
+            self.collection(name, write=True)
+            state = utility.load_state(name, using=self.aliases[0])
+            return getattr(state, "name", str(state)) == "Loaded"
+        except SchemaMismatch as e:
+            _log.error("%s", e)
+            return False
+        except Exception as e:
+            _log.warning("Milvus ping failed: %s", e)
+            return False
+
+    def prepare(self, name: str) -> None:
+        """Open every connection and load/cache handles ahead of the first request."""
+        for i in range(len(self.hosts)):
+            self._handle(name, i)
+
+
+_managers: Dict[Tuple[Tuple[str, str], ...], MilvusManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_milvus(host: str, port: str) -> MilvusManager:
+    """Process-wide manager for MILVUS_HOSTS if set, otherwise for ``host:port``."""
+    hosts = tuple(parse_hosts(MILVUS_HOSTS) or [(host, str(port))])
+    mgr = _managers.get(hosts)
+    if mgr is None:
+        with _managers_lock:
+            mgr = _managers.get(hosts)
+            if mgr is None:
+                mgr = _managers[hosts] = MilvusManager(list(hosts))
+    return mgr
@@ -0,0 +1,118 @@
+import os
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import yaml
+
+# Index families and the search-time knob each one takes
+HNSW_TYPES = ("HNSW", "HNSW_SQ", "HNSW_PQ")
+IVF_TYPES = ("IVF_FLAT", "IVF_SQ8", "IVF_PQ")
+DISK_TYPES = ("DISKANN",)
+INDEX_TYPES = HNSW_TYPES + IVF_TYPES + DISK_TYPES + ("FLAT",)
+_KNOBS = ("ef", "nprobe", "search_list")
+MILVUS_MAX_TOPK = 16384  # server-side limit on a search's limit
+
+
+def load_milvus_cfg() -> Dict[str, Any]:
+    cfg_path = os.path.join(os.path.dirname(__file__), "..", "configs", "milvus.yaml")
+    with open(os.path.normpath(cfg_path), "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def index_type(cfg: Dict[str, Any]) -> str:
+    t = str((cfg.get("index") or {}).get("type", "HNSW")).upper()
+    if t not in INDEX_TYPES:
+        raise ValueError(f"milvus.yaml: unsupported index type {t!r} (one of {', '.join(INDEX_TYPES)})")
+    return t
+
+
+def vector_dim(cfg: Dict[str, Any]) -> int:
+    """Dimension stored in Milvus: ``vectors.truncate_dim`` when set, else the model's ``vectors.dim``."""
+    vectors = cfg.get("vectors") or {}
+    return int(vectors.get("truncate_dim") or vectors.get("dim", 1536))
+
+
+def truncate_vectors(vecs: List[List[float]], dim: int) -> List[List[float]]:
+    """Matryoshka-style reduction: keep the first ``dim`` components and re-normalize.
+
+    Only meaningful for models trained for it (text-embedding-3-*, nomic-embed-text v1.5).
+    A ``dim`` of 0 or at least the input size leaves vectors unchanged.
+    """
+    out = []
+    for v in vecs:
+        if not dim or dim >= len(v):
+            out.append(v)
+            continue
+        head = v[:dim]
+        norm = math.sqrt(sum(x * x for x in head)) or 1.0
+        out.append([x / norm for x in head])
+    return out
+
+
+class SearchParams:
+    """Resolves index-search settings (metric, effort knob, k) from configs/milvus.yaml plus per-request overrides.
+
+    A request may pass ``{"mode": "fast" | "balanced" | "thorough", "k": int}``
+    plus the knob of the configured index family: ``ef`` (HNSW*),
+    ``nprobe`` (IVF_*) or ``search_list`` (DISKANN). Explicit values win over
+    the mode preset, which wins over the defaults (``search.efSearch`` /
+    ``search.nprobe`` / ``search.search_list``, and ``default_k`` or else
+    milvus.yaml ``retrieval.k``). A requested ``k`` above ``retrieval.max_k``
+    is rejected; presets and defaults are capped at it.
+    """
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None, default_k: Optional[int] = None):
+        cfg = cfg if cfg is not None else load_milvus_cfg()
+        search = cfg.get("search") or {}
+        self.metric_type = str(cfg.get("metric_type", "COSINE"))
+        self.index_type = index_type(cfg)
+        self.defaults = {
+            "ef": int(search.get("efSearch", 80)),
+            "nprobe": int(search.get("nprobe", 16)),
+            "search_list": int(search.get("search_list", 100)),
+        }
+        retrieval = cfg.get("retrieval") or {}
+        self.default_k = int(default_k or retrieval.get("k", 20))
+        self.modes: Dict[str, Dict[str, Any]] = dict(search.get("modes") or {})
+        self.max_k = min(int(retrieval.get("max_k") or MILVUS_MAX_TOPK), MILVUS_MAX_TOPK)
+
+    def validate(self, search: Optional[Dict[str, Any]]) -> None:
+        if not search:
+            return
+        if not isinstance(search, dict):
+            raise ValueError("search must be an object")
+        unknown = set(search) - {"mode", "k", *_KNOBS}
+        if unknown:
+            raise ValueError(f"unsupported search option(s): {', '.join(sorted(unknown))}")
+        mode = search.get("mode")
+        if mode is not None and mode not in self.modes:
+            raise ValueError(f"search.mode must be one of: {', '.join(sorted(self.modes))}")
+        for key in ("k", *_KNOBS):
+            # bool is an int subclass; {"k": true} is not k=1
+            value = search.get(key)
+            if key in search and (isinstance(value, bool) or not isinstance(value, int) or value <= 0):
+                raise ValueError(f"search.{key} must be a positive integer")
+        if search.get("k", 0) > self.max_k:
+            raise ValueError(f"search.k must be at most {self.max_k}")
+
+    def resolve(self, search: Optional[Dict[str, Any]] = None, k: Optional[int] = None) -> Tuple[int, Dict[str, int]]:
+        """Return ``(k, knobs)`` for one request. An explicit ``k`` argument beats everything."""
+        search = search or {}
+        self.validate(search)
+        preset = self.modes.get(search.get("mode") or "", {})
+        k = int(k or search.get("k") or preset.get("k") or self.default_k)
+        k = max(1, min(k, self.max_k))
+        knobs = {name: int(search.get(name) or preset.get(name) or self.defaults[name]) for name in _KNOBS}
+        return k, knobs
+
+    def param(self, knobs: Dict[str, int], limit: int) -> Dict[str, Any]:
+        if self.index_type in HNSW_TYPES:
+            # HNSW rejects ef below the number of results requested
+            params = {"ef": max(knobs["ef"], limit)}
+        elif self.index_type in IVF_TYPES:
+            params = {"nprobe": knobs["nprobe"]}
+        elif self.index_type in DISK_TYPES:
+            params = {"search_list": max(knobs["search_list"], limit)}
+        else:
+            params = {}
+        return {"metric_type": self.metric_type, "params": params}
@@ -0,0 +1,46 @@
+"""Run a file of questions through the /ask pipeline in-process.
+
+Usage: python scripts/ask_batch.py questions.txt [--concurrency N] [--filters '{"jurisdiction": "CA"}'] > answers.jsonl
+
+Reads one question per line and writes one JSON line per answer, in completion order.
+"""
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from dotenv import load_dotenv  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("questions", help="text file with one question per line")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--filters", default="{}", help="JSON metadata filters")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the semantic answer cache")
+    parser.add_argument("--pipeline", choices=["two_pass", "single_pass"], default=None)
+    args = parser.parse_args()
+
+    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
+    if os.path.exists(env_path):
+        load_dotenv(env_path)
+
+    from api.deps import get_orchestrator
+    from tools.answer_cache import get_answer_cache
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    cache = None if args.no_cache else get_answer_cache()
+    results = get_orchestrator().run_batch(
+        queries, cache=cache, filters=json.loads(args.filters), concurrency=args.concurrency,
+        pipeline=args.pipeline,
+    )
+    for i, payload in results:
+        print(json.dumps({"index": i, "query": queries[i], **({"error": payload["error"]} if "error" in payload else {"result": payload})}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
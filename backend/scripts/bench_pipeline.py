@@ -0,0 +1,93 @@
+"""Compare the two_pass (draft + LLM judge) and single_pass (draft with self-assessment) pipelines.
+
+Usage: python scripts/bench_pipeline.py questions.txt [--filters '{"jurisdiction": "CA"}'] [--no-schema]
+
+For each question, retrieval and packing run once; then both pipelines run on the same context.
+two_pass always calls the LLM judge here (no heuristic pre-routing) so verdicts are compared
+model-to-model. Reports mean/p50/p95 latency and prompt tokens per pipeline, pass/fail agreement
+and the mean absolute difference of each rubric score.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from dotenv import load_dotenv  # noqa: E402
+
+DIMENSIONS = ["coverage", "grounding", "citations", "freshness"]
+
+
+def pct(values, p):
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("questions", help="text file with one question per line")
+    parser.add_argument("--filters", default="{}", help="JSON metadata filters")
+    parser.add_argument("--no-schema", action="store_true", help='single_pass with format "json" instead of a schema')
+    args = parser.parse_args()
+
+    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
+    if os.path.exists(env_path):
+        load_dotenv(env_path)
+
+    from api.deps import get_retriever, get_context_packer, get_paralegal_agent, get_router_agent
+    from observability.metrics import llm_usage
+    from tools.llm_scheduler import llm_priority
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    retriever, packer = get_retriever(), get_context_packer()
+    paralegal, router = get_paralegal_agent(), get_router_agent()
+    filters = json.loads(args.filters)
+
+    stats = {name: {"ms": [], "prompt_tokens": []} for name in ("two_pass", "single_pass")}
+    agree, compared, fallbacks = 0, 0, 0
+    diffs = {k: [] for k in DIMENSIONS}
+    # Eval priority: a benchmark against a live server yields to interactive traffic
+    with llm_priority("eval"):
+        for i, query in enumerate(queries):
+            ctx = packer.pack(query, retriever.retrieve(query, filters=filters))
+
+            with llm_usage() as usage:
+                start = time.perf_counter()
+                draft = paralegal.generate(query, ctx)
+                judged = router.evaluate(query, draft, ctx)
+                stats["two_pass"]["ms"].append((time.perf_counter() - start) * 1000)
+            stats["two_pass"]["prompt_tokens"].append(usage.get("prompt_tokens", 0))
+
+            with llm_usage() as usage:
+                start = time.perf_counter()
+                single = paralegal.draft_and_assess(query, ctx, schema=not args.no_schema)
+                stats["single_pass"]["ms"].append((time.perf_counter() - start) * 1000)
+            stats["single_pass"]["prompt_tokens"].append(usage.get("prompt_tokens", 0))
+
+            if single.get("assessment") is None:
+                fallbacks += 1
+                print(f"[{i}] single_pass reply incomplete; excluded from agreement", file=sys.stderr)
+                continue
+            assessed = router.verdict_from_json(single["assessment"])
+            compared += 1
+            agree += int(bool(judged.get("pass")) == bool(assessed.get("pass")))
+            for k in DIMENSIONS:
+                diffs[k].append(abs(judged["scores"].get(k, 0) - assessed["scores"].get(k, 0)))
+            print(f"[{i}] two_pass={judged.get('pass')} single_pass={assessed.get('pass')}", file=sys.stderr)
+
+    print(f"{'pipeline':<12} {'mean_ms':>9} {'p50_ms':>9} {'p95_ms':>9} {'prompt_tok':>11}")
+    for name, s in stats.items():
+        if not s["ms"]:
+            continue
+        print(f"{name:<12} {sum(s['ms']) / len(s['ms']):>9.0f} {pct(s['ms'], 50):>9.0f} {pct(s['ms'], 95):>9.0f} "
+              f"{sum(s['prompt_tokens']) / len(s['prompt_tokens']):>11.0f}")
+    if compared:
+        print(f"\nverdict agreement: {agree}/{compared} ({agree / compared:.1%}); incomplete single_pass replies: {fallbacks}")
+        print("mean |score diff|: " + ", ".join(f"{k}={sum(v) / len(v):.2f}" for k, v in diffs.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Recall-vs-latency benchmark for Milvus HNSW search parameters on a synthetic corpus.
+
+Usage: python scripts/bench_search.py [--n 20000] [--dim 128] [--queries 200] [--k 10]
+                                     [--M 16,36] [--ef 16,32,64,128,256]
+
+Builds an exact (FLAT) collection as ground truth and one HNSW collection per M,
+then reports recall@k and p50/p99 single-query latency for every (M, ef) pair.
+The temporary collections are dropped at the end.
+"""
+import os
+import sys
+import math
+import time
+import random
+import argparse
+
+import yaml
+from pymilvus import connections, FieldSchema, CollectionSchema, DataType, Collection, utility
+
+MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
+MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
+
+
+def _unit(vec):
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+def synthetic_corpus(n, dim, clusters, seed):
+    # Clustered vectors resemble real embeddings better than uniform noise
+    rnd = random.Random(seed)
+    centers = [_unit([rnd.gauss(0, 1) for _ in range(dim)]) for _ in range(clusters)]
+    out = []
+    for _ in range(n):
+        c = centers[rnd.randrange(clusters)]
+        out.append(_unit([x + rnd.gauss(0, 0.35) for x in c]))
+    return out
+
+
+def build(name, dim, vectors, index_params):
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema([
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=False),
+        FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=dim),
+    ])
+    col = Collection(name, schema=schema)
+    for i in range(0, len(vectors), 5000):
+        col.insert([list(range(i, i + len(vectors[i:i + 5000]))), vectors[i:i + 5000]])
+    col.flush()
+    col.create_index("vector", index_params)
+    col.load()
+    return col
+
+
+def search_ids(col, queries, k, params):
+    ids, lat = [], []
+    for q in queries:
+        start = time.perf_counter()
+        res = col.search(data=[q], anns_field="vector", param=params, limit=k)
+        lat.append(time.perf_counter() - start)
+        ids.append([h.id for h in res[0]])
+    return ids, lat
+
+
+def pct(values, p):
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--M", default="16,36")
+    parser.add_argument("--ef", default="16,32,64,128,256")
+    parser.add_argument("--efConstruction", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark collections")
+    args = parser.parse_args()
+
+    cfg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "configs", "milvus.yaml")
+    with open(cfg_path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    metric = cfg.get("metric_type", "COSINE")
+    ef_construction = args.efConstruction or int(((cfg.get("index") or {}).get("params") or {}).get("efConstruction", 200))
+    m_grid = [int(x) for x in args.M.split(",")]
+    ef_grid = [int(x) for x in args.ef.split(",")]
+
+    connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
+    print(f"Generating {args.n} x {args.dim} corpus and {args.queries} queries...", file=sys.stderr)
+    vectors = synthetic_corpus(args.n + args.queries, args.dim, clusters=max(8, args.n // 500), seed=args.seed)
+    corpus, queries = vectors[:args.n], vectors[args.n:]
+
+    created = []
+    try:
+        flat = build("bench_flat", args.dim, corpus, {"index_type": "FLAT", "metric_type": metric, "params": {}})
+        created.append("bench_flat")
+        truth, _ = search_ids(flat, queries, args.k, {"metric_type": metric, "params": {}})
+
+        print(f"{'M':>4} {'ef':>5} {'recall@' + str(args.k):>10} {'p50_ms':>8} {'p99_ms':>8}")
+        for m in m_grid:
+            name = f"bench_hnsw_m{m}"
+            col = build(name, args.dim, corpus, {
+                "index_type": "HNSW", "metric_type": metric, "params": {"M": m, "efConstruction": ef_construction},
+            })
+            created.append(name)
+            for ef in ef_grid:
+                found, lat = search_ids(col, queries, args.k, {"metric_type": metric, "params": {"ef": max(ef, args.k)}})
+                recall = sum(len(set(f) & set(t)) for f, t in zip(found, truth)) / float(args.k * len(queries))
+                print(f"{m:>4} {ef:>5} {recall:>10.4f} {pct(lat, 50) * 1000:>8.2f} {pct(lat, 99) * 1000:>8.2f}")
+    finally:
+        if not args.keep:
+            for name in created:
+                utility.drop_collection(name)
+
+
+if __name__ == "__main__":
+    main()
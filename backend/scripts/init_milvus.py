@@ -1,15 +1,45 @@
 import os
+import sys
 import time
+import yaml
 from pymilvus import (
     connections,
     FieldSchema, CollectionSchema, DataType,
     Collection, utility
 )
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from retriever.milvus_conn import SchemaMismatch, check_schema  # noqa: E402
+
 MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
 MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
 COLLECTION = os.getenv("MILVUS_COLLECTION", "legal_chunks")
-DIM = 1536  # OpenAI text-embedding-3-small
+# Rows are spread over this many partitions by hashing the jurisdiction partition key
+NUM_PARTITIONS = int(os.getenv("MILVUS_NUM_PARTITIONS", "16"))
+
+
+def load_cfg():
+    cfg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "configs", "milvus.yaml")
+    with open(cfg_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def vector_dim(cfg=None):
+    # Stored dimension: vectors.truncate_dim (Matryoshka) when set, else the model's vectors.dim
+    vectors = (cfg if cfg is not None else load_cfg()).get("vectors") or {}
+    return int(vectors.get("truncate_dim") or vectors.get("dim", 1536))
+
+
+def load_index_params(cfg=None):
+    # Index type, metric and build params come from configs/milvus.yaml
+    cfg = cfg if cfg is not None else load_cfg()
+    index = cfg.get("index") or {}
+    return {
+        "index_type": index.get("type", "HNSW"),
+        "metric_type": cfg.get("metric_type", "COSINE"),
+        "params": dict(index.get("params") or {}),
+    }
 
 
 def ensure_collection():
@@ -31,30 +61,51 @@ def ensure_collection():
         raise RuntimeError(f"Failed to connect to Milvus at {MILVUS_HOST}:{MILVUS_PORT}: {last_err}")
 
     if utility.has_collection(COLLECTION):
+        # Ingest and retrieval need the current fields; an older collection has to be migrated
+        check_schema(Collection(COLLECTION), COLLECTION)
         print(f"Collection '{COLLECTION}' already exists")
         return
 
+    cfg = load_cfg()
+    dim, index_params = vector_dim(cfg), load_index_params(cfg)
+    create_collection(COLLECTION, dim, index_params)
+    print(f"Created and loaded collection '{COLLECTION}' ({dim} dims) with {index_params['index_type']} index "
+          f"{index_params['params']} and scalar indexes")
+
+
+def create_collection(name, dim, index_params, description="Legal chunks for RAG"):
+    """Create, index and load a collection with the schema retriever/ingest.py writes."""
+    if index_params["index_type"].upper() in ("HNSW_SQ", "HNSW_PQ"):
+        version = utility.get_server_version()
+        if tuple(int(x) for x in version.lstrip("v").split(".")[:2]) < (2, 5):
+            raise RuntimeError(f"{index_params['index_type']} needs Milvus >= 2.5 (server is {version})")
     fields = [
         FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
         FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
         FieldSchema(name="source", dtype=DataType.VARCHAR, max_length=1024),
         FieldSchema(name="section", dtype=DataType.VARCHAR, max_length=1024),
         FieldSchema(name="meta", dtype=DataType.VARCHAR, max_length=65535),
-        FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=DIM),
+        # Filterable metadata (retriever/filters.py); searches filtered on jurisdiction only touch its partition
+        FieldSchema(name="jurisdiction", dtype=DataType.VARCHAR, max_length=64, is_partition_key=True),
+        FieldSchema(name="source_type", dtype=DataType.VARCHAR, max_length=64),
+        FieldSchema(name="effective_date", dtype=DataType.INT64),  # YYYYMMDD, 0 = unknown
+        FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=dim),
     ]
-    schema = CollectionSchema(fields=fields, description="Legal chunks for RAG")
-    col = Collection(name=COLLECTION, schema=schema)
+    schema = CollectionSchema(fields=fields, description=description)
+    col = Collection(name=name, schema=schema, num_partitions=NUM_PARTITIONS)
 
     # Create index on vector
-    index_params = {
-        "index_type": "HNSW",
-        "metric_type": "COSINE",
-        "params": {"M": 16, "efConstruction": 200},
-    }
     col.create_index(field_name="vector", index_params=index_params)
+    # Scalar indexes so filter expressions don't scan every row
+    col.create_index(field_name="jurisdiction", index_params={"index_type": "INVERTED"}, index_name="idx_jurisdiction")
+    col.create_index(field_name="source_type", index_params={"index_type": "INVERTED"}, index_name="idx_source_type")
+    col.create_index(field_name="effective_date", index_params={"index_type": "STL_SORT"}, index_name="idx_effective_date")
     col.load()
-    print(f"Created and loaded collection '{COLLECTION}' with HNSW index")
+    return col
 
 
 if __name__ == "__main__":
-    ensure_collection()
+    try:
+        ensure_collection()
+    except SchemaMismatch as e:
+        raise SystemExit(f"ERROR: {e}")
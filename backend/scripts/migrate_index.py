@@ -0,0 +1,192 @@
+"""Copy the chunk collection into a new one with a different index type and/or truncated vectors.
+
+Usage: python scripts/migrate_index.py --target legal_chunks_sq8 [--source legal_chunks]
+                                       [--index IVF_SQ8] [--params '{"nlist": 1024}']
+                                       [--truncate-dim 512] [--queries 100] [--k 10] [--alias legal_chunks_live]
+
+Index type, build params and truncate_dim default to configs/milvus.yaml, so the usual flow is:
+edit milvus.yaml, run this script, check the recall/memory report, then point MILVUS_COLLECTION
+(or the alias) at the target. Vectors are truncated Matryoshka-style (first N dims, re-normalized),
+which only works if the source holds vectors at least that wide.
+
+A source created before the metadata filter fields (jurisdiction, source_type, effective_date)
+can be migrated too: those columns are filled from each row's meta JSON.
+
+The report compares the source and target collections on vectors sampled from the source:
+loaded segment memory, and overlap@k of the target's results with the source's.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pymilvus import connections, Collection, utility  # noqa: E402
+
+from init_milvus import MILVUS_HOST, MILVUS_PORT, COLLECTION, load_cfg, vector_dim, load_index_params, create_collection  # noqa: E402
+from retriever.search_params import SearchParams, truncate_vectors  # noqa: E402
+from retriever.filters import SCALAR_FIELDS, scalar_values  # noqa: E402
+
+FIELDS = ["text", "source", "section", "meta", "jurisdiction", "source_type", "effective_date", "vector"]
+
+
+def _scalars(row):
+    # Older collections have no scalar columns; derive them from meta the way ingest does
+    try:
+        meta = json.loads(row.get("meta") or "{}")
+    except ValueError:
+        meta = {}
+    try:
+        return scalar_values(meta if isinstance(meta, dict) else {})
+    except ValueError:
+        return scalar_values({k: v for k, v in meta.items() if k != "effective_date"})
+
+
+def copy_rows(src, dst, dim, batch_size):
+    copied = 0
+    present = {f.name for f in src.schema.fields}
+    fields = [f for f in FIELDS if f in present]
+    derive = any(f not in present for f in SCALAR_FIELDS)
+    if derive:
+        print(f"  source lacks {', '.join(f for f in SCALAR_FIELDS if f not in present)}; filling from meta", file=sys.stderr)
+    it = src.query_iterator(batch_size=batch_size, expr="", output_fields=fields)
+    try:
+        while True:
+            rows = it.next()
+            if not rows:
+                break
+            vecs = truncate_vectors([r["vector"] for r in rows], dim)
+            dst.insert([
+                {**(_scalars(r) if derive else {}), **{f: r[f] for f in fields if f != "vector"}, "vector": v}
+                for r, v in zip(rows, vecs)
+            ])
+            copied += len(rows)
+            print(f"  copied {copied} rows", file=sys.stderr)
+    finally:
+        it.close()
+    dst.flush()
+    return copied
+
+
+def loaded_bytes(name):
+    return sum(int(getattr(s, "mem_size", 0) or 0) for s in utility.get_query_segment_info(name))
+
+
+def estimate_bytes(rows, dim, index_params):
+    """Rough vector-index footprint, for when segment info is not reported."""
+    t, p = index_params["index_type"].upper(), index_params["params"]
+    if t in ("IVF_SQ8", "HNSW_SQ"):
+        per = dim
+    elif t in ("IVF_PQ", "HNSW_PQ"):
+        per = int(p.get("m", dim // 8)) * int(p.get("nbits", 8)) // 8
+    elif t == "DISKANN":
+        per = dim // 4  # PQ codes kept in memory; full vectors stay on disk
+    else:
+        per = dim * 4
+    if t.startswith("HNSW"):
+        per += int(p.get("M", 16)) * 2 * 4
+    return rows * per
+
+
+def _search_params(col):
+    try:
+        return SearchParams(dict(load_cfg(), index={"type": _index_type(col)}))
+    except ValueError:  # e.g. AUTOINDEX: let the server pick
+        return SearchParams(dict(load_cfg(), index={"type": "FLAT"}))
+
+
+def overlap(src, dst, dim, queries, k):
+    src_params, dst_params = _search_params(src), _search_params(dst)
+    total, lat = 0, []
+    for q in queries:
+        a = src.search([q], "vector", src_params.param(src_params.defaults, k), limit=k,
+                       output_fields=["text"])[0]
+        start = time.perf_counter()
+        b = dst.search(truncate_vectors([q], dim), "vector", dst_params.param(dst_params.defaults, k), limit=k,
+                       output_fields=["text"])[0]
+        lat.append(time.perf_counter() - start)
+        # Primary keys differ between collections, so compare on chunk text
+        total += len({h.entity.get("text") for h in a} & {h.entity.get("text") for h in b})
+    lat.sort()
+    return total / float(k * len(queries)), lat[len(lat) // 2], lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+
+
+def _index_type(col):
+    for idx in col.indexes:
+        if idx.field_name == "vector":
+            return idx.params.get("index_type", "HNSW")
+    return "FLAT"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=COLLECTION)
+    parser.add_argument("--target", required=True)
+    parser.add_argument("--index", default=None, help="index type (default: milvus.yaml index.type)")
+    parser.add_argument("--params", default=None, help="JSON build params (default: milvus.yaml index.params)")
+    parser.add_argument("--truncate-dim", type=int, default=None, help="default: milvus.yaml vectors.truncate_dim")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100, help="sampled source vectors for the recall report")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--alias", default=None, help="point this alias at the target when done")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cfg = load_cfg()
+    index_params = load_index_params(cfg)
+    if args.index:
+        index_params["index_type"] = args.index.upper()
+    if args.params is not None:
+        index_params["params"] = json.loads(args.params)
+    dim = args.truncate_dim if args.truncate_dim is not None else vector_dim(cfg)
+
+    connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
+    if utility.has_collection(args.target):
+        raise SystemExit(f"target collection '{args.target}' already exists")
+    src = Collection(args.source)
+    src.load()
+    src_dim = next(f.params["dim"] for f in src.schema.fields if f.name == "vector")
+    if dim > src_dim:
+        raise SystemExit(f"cannot widen vectors: source has {src_dim} dims, target wants {dim}")
+
+    print(f"Copying '{args.source}' ({src_dim} dims) -> '{args.target}' ({dim} dims, "
+          f"{index_params['index_type']} {index_params['params']})", file=sys.stderr)
+    dst = create_collection(args.target, dim, index_params, description=f"Migrated from {args.source}")
+    rows = copy_rows(src, dst, dim, args.batch_size)
+    dst.load()
+
+    # Sample query vectors from the source itself
+    rnd = random.Random(args.seed)
+    ids = [r["id"] for r in src.query(expr="id >= 0", output_fields=["id"], limit=16384)]
+    sample = rnd.sample(ids, min(args.queries, len(ids)))
+    queries = [r["vector"] for r in src.query(expr=f"id in {sample}", output_fields=["vector"])] if sample else []
+
+    print(f"\nrows: {rows}")
+    for label, name, d, params in (("source", args.source, src_dim, {"index_type": _index_type(src), "params": {}}),
+                                   ("target", args.target, dim, index_params)):
+        print(f"{label:>7}: {name}  loaded={loaded_bytes(name) / 2**20:.1f} MiB  "
+              f"estimate={estimate_bytes(rows, d, params) / 2**20:.1f} MiB")
+    if queries:
+        rec, p50, p99 = overlap(src, dst, dim, queries, args.k)
+        print(f"overlap@{args.k} vs source: {rec:.4f}  target p50={p50 * 1000:.2f}ms p99={p99 * 1000:.2f}ms")
+
+    if args.alias:
+        if args.alias in _all_aliases():
+            utility.alter_alias(args.target, args.alias)
+        else:
+            utility.create_alias(args.target, args.alias)
+        print(f"alias '{args.alias}' -> '{args.target}'")
+
+
+def _all_aliases():
+    out = set()
+    for name in utility.list_collections():
+        out.update(utility.list_aliases(name))
+    return out
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Production entry point: serve the app with waitress (threads) or uvicorn (worker processes).
+
+Usage: python serve.py
+
+SERVER=waitress (default) runs one process with WEB_THREADS request threads.
+SERVER=uvicorn runs the Flask app under uvicorn's WSGI interface.
+SERVER=asgi runs asgi.py under uvicorn: the /ask routes on asyncio, everything
+else on the Flask app.
+
+WEB_WORKERS must stay 1: ingest jobs, the answer cache and the Ollama
+scheduler live in process memory, so extra workers would split job state and
+multiply OLLAMA_MAX_IN_FLIGHT by the worker count.
+"""
+import os
+import sys
+import logging
+
+from dotenv import load_dotenv
+
+env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(env_path):
+    load_dotenv(env_path)
+
+SERVER = os.getenv("SERVER", "waitress").lower()
+HOST = os.getenv("APP_HOST", "0.0.0.0")
+PORT = int(os.getenv("APP_PORT", "8000"))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+
+_log = logging.getLogger("serve")
+
+
+def main() -> None:
+    if WEB_WORKERS != 1:
+        sys.exit(
+            "WEB_WORKERS must be 1: ingest jobs, the answer cache and the Ollama scheduler are per process. "
+            "Scale with WEB_THREADS (waitress) or SERVER=asgi instead."
+        )
+    if SERVER == "waitress":
+        from waitress import serve
+        from main import create_app
+
+        app = create_app()
+        _log.info("Serving with waitress on %s:%d threads=%d", HOST, PORT, WEB_THREADS)
+        # Streams are flushed as they are written; keep the channel open for slow LLM answers
+        serve(app, host=HOST, port=PORT, threads=WEB_THREADS, channel_timeout=int(os.getenv("OLLAMA_TIMEOUT", "300")))
+    elif SERVER == "uvicorn":
+        import uvicorn
+
+        # Each worker imports main and calls create_app itself
+        uvicorn.run(
+            "main:create_app",
+            factory=True,
+            interface="wsgi",
+            host=HOST,
+            port=PORT,
+            workers=WEB_WORKERS,
+            log_level=os.getenv("LOG_LEVEL", "INFO").lower(),
+        )
+    elif SERVER == "asgi":
+        import uvicorn
+
+        uvicorn.run(
+            "asgi:app",
+            host=HOST,
+            port=PORT,
+            workers=WEB_WORKERS,
+            timeout_keep_alive=int(os.getenv("ASGI_KEEP_ALIVE", "5")),
+            log_level=os.getenv("LOG_LEVEL", "INFO").lower(),
+        )
+    else:
+        sys.exit(f"SERVER must be waitress, uvicorn or asgi, not {SERVER!r}")
+
+
+if __name__ == "__main__":
+    main()
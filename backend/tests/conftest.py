@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the app modules the way main.py does, from the backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,87 @@
+import pytest
+
+from tools import answer_cache
+from tools.answer_cache import SemanticAnswerCache, sources_fingerprint
+
+CTX = [{"source": "ca.txt", "section": "335.1", "text": "Two years."}, {"source": "ny.txt", "section": "214", "text": "Three years."}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_fingerprint_ignores_order_but_not_content():
+    assert sources_fingerprint(CTX) == sources_fingerprint(list(reversed(CTX)))
+    assert sources_fingerprint(CTX) != sources_fingerprint(CTX[:1])
+    assert sources_fingerprint(CTX) != sources_fingerprint([dict(CTX[0], text="Ten years."), CTX[1]])
+
+
+def test_hit_on_similar_query_and_same_sources():
+    c = SemanticAnswerCache(threshold=0.95)
+    c.store([1.0, 0.0], CTX, {"answer": "Two years."})
+    payload, sim = c.lookup([0.99, 0.05], CTX)
+    assert payload == {"answer": "Two years."} and sim >= 0.95
+    # Scale does not matter: vectors are compared by cosine
+    assert c.lookup([10.0, 0.0], CTX)[1] == pytest.approx(1.0)
+
+
+def test_miss_on_dissimilar_query_other_sources_or_other_dimension():
+    c = SemanticAnswerCache(threshold=0.95)
+    c.store([1.0, 0.0], CTX, {"answer": "Two years."})
+    assert c.lookup([0.0, 1.0], CTX) is None
+    assert c.lookup([1.0, 0.0], CTX[:1]) is None
+    assert c.lookup([1.0, 0.0, 0.0], CTX) is None
+    assert c.stats()["misses"] == 3 and c.stats()["hits"] == 0
+
+
+def test_returns_the_closest_entry():
+    c = SemanticAnswerCache(threshold=0.5)
+    c.store([1.0, 0.2], CTX, {"answer": "far"})
+    c.store([1.0, 0.0], CTX, {"answer": "near"})
+    assert c.lookup([1.0, 0.0], CTX)[0] == {"answer": "near"}
+
+
+def test_lookup_returns_a_copy():
+    c = SemanticAnswerCache()
+    c.store([1.0], CTX, {"answer": "a"})
+    c.lookup([1.0], CTX)[0]["answer"] = "changed"
+    assert c.lookup([1.0], CTX)[0] == {"answer": "a"}
+
+
+def test_entries_expire(clock):
+    c = SemanticAnswerCache(ttl=60)
+    c.store([1.0], CTX, {"answer": "a"})
+    clock[0] += 59
+    assert c.lookup([1.0], CTX) is not None
+    clock[0] += 2
+    assert c.lookup([1.0], CTX) is None
+    assert c.stats()["items"] == 0
+
+
+def test_evicts_least_recently_hit(clock):
+    c = SemanticAnswerCache(max_items=2)
+    c.store([1.0, 0.0], CTX, {"answer": "a"})
+    clock[0] += 1
+    c.store([0.0, 1.0], CTX, {"answer": "b"})
+    clock[0] += 1
+    c.lookup([1.0, 0.0], CTX)  # a is now more recent than b
+    clock[0] += 1
+    c.store([-1.0, 0.0], CTX, {"answer": "c"})
+    assert c.lookup([0.0, 1.0], CTX) is None
+    assert c.lookup([1.0, 0.0], CTX)[0] == {"answer": "a"}
+
+
+def test_invalidate():
+    c = SemanticAnswerCache()
+    c.store([1.0], CTX, {"answer": "a"})
+    c.invalidate()
+    assert c.lookup([1.0], CTX) is None
+    assert c.stats()["invalidations"] == 1 and c.stats()["items"] == 0
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ENABLED", False)
+    assert answer_cache.get_answer_cache() is None
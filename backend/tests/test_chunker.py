@@ -0,0 +1,87 @@
+from retriever.chunker import LegalChunker, sentence_starts
+from retriever.context_packer import estimate_tokens
+
+CFG = {"tokenizer": "estimate", "min_tokens": 30}
+
+DOC = """TITLE 2
+CHAPTER 3
+Section 5. Limitations
+(a) An action on a written contract must be brought within four years. The period runs from breach. It is tolled during absence from the state.
+(b) An action on an oral contract must be brought within two years. Section 1983 claims are different and borrow the personal injury period. Courts apply that rule consistently.
+
+Section 6. Damages
+Damages are limited to actual loss.
+"""
+
+
+def _chunks(doc=DOC, max_tokens=40, overlap_tokens=15, **kw):
+    chunker = LegalChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens, cfg=CFG)
+    return list(chunker.chunks(doc.splitlines(keepends=True), **kw))
+
+
+def test_section_path_and_subsection_markers():
+    sections = [c["section"] for c in _chunks()]
+    assert sections[0] == "TITLE 2 > CHAPTER 3 > Section 5. Limitations (a)"
+    assert "TITLE 2 > CHAPTER 3 > Section 5. Limitations (b)" in sections
+    assert sections[-1] == "TITLE 2 > CHAPTER 3 > Section 6. Damages"
+
+
+def test_bare_headings_fold_into_the_first_chunk():
+    first = _chunks()[0]
+    assert first["text"].startswith("TITLE 2\n\nCHAPTER 3\n\nSection 5. Limitations\n\n(a) An action")
+
+
+def test_prose_mentioning_a_section_is_not_a_heading():
+    chunks = _chunks()
+    assert not any(c["section"].endswith("Section 1983 claims are different") for c in chunks)
+    assert any(c["text"].startswith("Section 1983 claims") and c["section"].endswith("(b)") for c in chunks)
+
+
+def test_chunks_do_not_cross_sections():
+    for c in _chunks():
+        assert not ("Limitations" in c["section"] and "Damages are limited" in c["text"])
+        assert not ("Damages" in c["section"] and "written contract" in c["text"])
+
+
+def test_chunk_size_bound():
+    doc = "Section 1. Rules\n" + " ".join(f"Sentence number {i} states a rule of law." for i in range(60)) + "\n"
+    chunks = _chunks(doc, max_tokens=50, overlap_tokens=12)
+    assert len(chunks) > 3
+    for c in chunks:
+        assert estimate_tokens(c["text"]) <= 50 + 10  # joins add a few characters
+
+
+def test_overlap_is_an_exact_trailing_sentence_copy():
+    doc = "Section 1. Rules\n" + " ".join(f"Sentence number {i} states a rule of law." for i in range(60)) + "\n"
+    chunks = _chunks(doc, max_tokens=50, overlap_tokens=12)
+    carried = 0
+    for prev, cur in zip(chunks, chunks[1:]):
+        head = cur["text"].split("\n\n")[0]
+        if head != cur["text"] and prev["text"].endswith(head):
+            carried += 1
+            assert estimate_tokens(head) <= 12
+            assert head[0].isupper()
+    assert carried > 0
+
+
+def test_no_overlap_when_disabled():
+    doc = "Section 1. Rules\n" + " ".join(f"Sentence number {i} states a rule of law." for i in range(60)) + "\n"
+    chunks = _chunks(doc, max_tokens=50, overlap_tokens=0)
+    text = " ".join(c["text"].replace("\n\n", " ") for c in chunks)
+    assert text.count("Sentence number 7 ") == 1
+
+
+def test_pages_follow_form_feeds():
+    chunker = LegalChunker(max_tokens=200, overlap_tokens=0, cfg=CFG)
+    chunks = list(chunker.chunks(["First page text here.\fSecond page text here.\n"], first_page=3))
+    assert chunks == [{"text": "First page text here. Second page text here.", "section": "", "page_start": 3, "page_end": 4}]
+
+
+def test_default_section():
+    chunks = _chunks("Plain paragraph without any heading at all.\n", default_section="item-0")
+    assert chunks[0]["section"] == "item-0"
+
+
+def test_sentence_starts_skips_legal_abbreviations():
+    text = "See Cal. Civ. Proc. Code § 335.1, cf. Smith v. Jones. The rule applies. Next one."
+    assert [text[i:] for i in sentence_starts(text)] == [text, "The rule applies. Next one.", "Next one."]
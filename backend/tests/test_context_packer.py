@@ -0,0 +1,63 @@
+from retriever.context_packer import ContextPacker, estimate_tokens
+
+CFG = {"enabled": True, "token_budget": 2000, "dedup_threshold": 0.85, "min_merge_overlap": 20}
+
+FIRST = "An action on a written contract must be brought within four years. The period runs from the breach."
+SECOND = "The period runs from the breach. It is tolled while the defendant is absent from the state."
+
+
+def _hit(text, source="code.txt", score=0.5, **kw):
+    return dict({"text": text, "source": source, "section": "s", "score": score}, **kw)
+
+
+def test_disabled_or_empty_passes_through():
+    ctx = [_hit(FIRST)]
+    assert ContextPacker(dict(CFG, enabled=False)).pack("q", ctx) is ctx
+    assert ContextPacker(CFG).pack("q", []) == []
+
+
+def test_merges_overlapping_neighbours_from_the_same_source():
+    out = ContextPacker(CFG).pack("limitation period", [_hit(FIRST, score=0.4), _hit(SECOND, score=0.7, fused_score=0.03)])
+    assert len(out) == 1
+    assert out[0]["text"] == FIRST + SECOND[len("The period runs from the breach."):]
+    assert out[0]["score"] == 0.7
+    assert out[0]["fused_score"] == 0.03
+
+
+def test_does_not_merge_across_sources():
+    out = ContextPacker(CFG).pack("limitation period", [_hit(FIRST), _hit(SECOND, source="other.txt")])
+    assert len(out) == 2
+
+
+def test_short_overlap_is_not_merged():
+    out = ContextPacker(dict(CFG, min_merge_overlap=200)).pack("q", [_hit(FIRST), _hit(SECOND)])
+    assert len(out) == 2
+
+
+def test_drops_near_duplicates():
+    dup = FIRST.replace("four years", "four (4) years")
+    out = ContextPacker(dict(CFG, dedup_threshold=0.6)).pack("q", [_hit(FIRST), _hit(dup, source="copy.txt")])
+    assert [c["source"] for c in out] == ["code.txt"]
+
+
+def test_rerank_prefers_query_term_coverage():
+    ctx = [
+        _hit("Damages are limited to actual loss suffered by the plaintiff.", source="a"),
+        _hit("Tolling suspends the limitation period while the defendant is absent.", source="b"),
+    ]
+    out = ContextPacker(dict(CFG, weights={"retrieval": 0.1, "terms": 0.9})).pack("tolling of the limitation period", ctx)
+    assert [c["source"] for c in out] == ["b", "a"]
+    assert out[0]["rerank_score"] > out[1]["rerank_score"]
+
+
+def test_token_budget_skips_what_does_not_fit():
+    long_text = "word " * 400
+    ctx = [_hit(long_text, source="big"), _hit(FIRST, source="small")]
+    out = ContextPacker(CFG).pack("written contract", ctx, token_budget=estimate_tokens(FIRST) + 5)
+    assert [c["source"] for c in out] == ["small"]
+
+
+def test_does_not_mutate_input():
+    ctx = [_hit(FIRST), _hit(SECOND)]
+    ContextPacker(CFG).pack("q", ctx)
+    assert ctx[0]["text"] == FIRST and "rerank_score" not in ctx[0]
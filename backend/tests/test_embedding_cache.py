@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from tools import embedding_cache
+from tools.embedding_cache import EmbeddingCache, cache_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "emb.sqlite")
+
+
+def test_cache_key_separates_backend_and_model():
+    keys = {cache_key("openai", "m", "t"), cache_key("ollama", "m", "t"), cache_key("openai", "m2", "t"), cache_key("openai", "m", "t2")}
+    assert len(keys) == 4
+    assert cache_key("openai", "m", "t") == cache_key("openai", "m", "t")
+
+
+def test_put_and_get_round_trip(path):
+    c = EmbeddingCache(mem_items=10, disk_items=10, path=path)
+    c.put_many({"a": [0.5, 1.0], "b": [2.0, -1.0]})
+    assert c.get_many(["a", "b", "c"]) == {"a": [0.5, 1.0], "b": [2.0, -1.0]}
+    s = c.stats()
+    assert (s["hits_mem"], s["hits_disk"], s["misses"]) == (2, 0, 1)
+    assert s["hit_ratio"] == round(2 / 3, 4)
+
+
+def test_disk_tier_survives_restart_and_refills_memory(path):
+    EmbeddingCache(mem_items=10, disk_items=10, path=path).put_many({"a": [0.25, 0.5]})
+    c = EmbeddingCache(mem_items=10, disk_items=10, path=path)
+    assert c.stats()["disk_items"] == 1
+    assert c.get_many(["a"]) == {"a": [0.25, 0.5]}
+    assert c.get_many(["a"]) == {"a": [0.25, 0.5]}
+    s = c.stats()
+    assert (s["hits_disk"], s["hits_mem"]) == (1, 1)
+
+
+def test_memory_tier_is_lru_bounded(tmp_path):
+    c = EmbeddingCache(mem_items=2, disk_items=0, path=str(tmp_path / "unused.sqlite"))
+    c.put_many({"a": [1.0], "b": [2.0]})
+    c.get_many(["a"])  # a is now most recently used
+    c.put_many({"c": [3.0]})
+    assert set(c.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert c.stats()["disk_items"] == 0
+
+
+def test_disk_tier_evicts_least_recently_used(path):
+    c = EmbeddingCache(mem_items=1, disk_items=10, path=path)
+    c.put_many({f"k{i}": [float(i)] for i in range(10)})
+    c.put_many({"new": [1.0]})
+    s = c.stats()
+    # Over the bound: the overflow plus 10% of the bound go
+    assert s["disk_items"] == 9 and s["evictions_disk"] == 2
+    assert c.get_many(["new"]) == {"new": [1.0]}
+
+
+def test_vectors_are_stored_as_float32(path):
+    c = EmbeddingCache(mem_items=0, disk_items=10, path=path)
+    c.put_many({"a": [0.1]})
+    assert c.get_many(["a"])["a"][0] == pytest.approx(0.1, rel=1e-6)
+
+
+def test_concurrent_access(path):
+    c = EmbeddingCache(mem_items=50, disk_items=1000, path=path)
+
+    def work(n):
+        for i in range(50):
+            c.put_many({f"{n}-{i}": [float(i)]})
+            assert c.get_many([f"{n}-{i}"]) == {f"{n}-{i}": [float(i)]}
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert c.stats()["disk_items"] == 200
+
+
+def test_disabled_cache(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "ENABLED", False)
+    assert embedding_cache.get_embedding_cache() is None
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+import requests
+
+from tools import embeddings
+from tools.embedding_cache import EmbeddingCache
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.response = FakeResponse(status, headers)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    c = EmbeddingCache(mem_items=100, disk_items=100, path=str(tmp_path / "emb.sqlite"))
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: c)
+    return c
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    out = []
+    monkeypatch.setattr(embeddings.time, "sleep", out.append)
+
+    async def asleep(d):
+        out.append(d)
+
+    monkeypatch.setattr(embeddings.asyncio, "sleep", asleep)
+    return out
+
+
+def _fake_backend(fail=()):
+    """A backend that raises the given errors first, then embeds each text as [len(text)]."""
+    fail = list(fail)
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        if fail:
+            raise fail.pop(0)
+        return [[float(len(t))] for t in texts]
+
+    async def aembed(texts):
+        return embed(texts)
+
+    return embed, aembed, calls
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_cached_embeds_each_distinct_miss_once(cache, use_async):
+    embed, aembed, calls = _fake_backend()
+    texts = ["a", "bb", "a", "ccc"]
+
+    def run(t):
+        if use_async:
+            return asyncio.run(embeddings._acached("test", "m", aembed, t))
+        return embeddings._cached("test", "m", embed, t)
+
+    assert run(texts) == [[1.0], [2.0], [1.0], [3.0]]
+    assert calls == [["a", "bb", "ccc"]]
+    assert run(["ccc", "dddd"]) == [[3.0], [4.0]]
+    assert calls[-1] == ["dddd"]
+    assert run(["a"]) == [[1.0]] and len(calls) == 2
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_cached_without_cache(monkeypatch, use_async):
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: None)
+    embed, aembed, calls = _fake_backend()
+    if use_async:
+        out = asyncio.run(embeddings._acached("test", "m", aembed, ["x", "yy"]))
+    else:
+        out = embeddings._cached("test", "m", embed, ["x", "yy"])
+    assert out == [[1.0], [2.0]]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_backoff_retries_then_succeeds(cache, sleeps, monkeypatch, use_async):
+    monkeypatch.setattr(embeddings.random, "uniform", lambda a, b: 1.0)
+    embed, aembed, calls = _fake_backend([HTTPError(503), HTTPError(429, {"retry-after": "7"}), requests.ConnectionError()])
+    if use_async:
+        out = asyncio.run(embeddings._awith_backoff(aembed, ["a"]))
+    else:
+        out = embeddings._with_backoff(embed, ["a"])
+    assert out == [[1.0]]
+    # Exponential from BACKOFF_BASE, with the server's Retry-After taking precedence
+    assert sleeps == [embeddings.BACKOFF_BASE, 7.0, embeddings.BACKOFF_BASE * 4]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_backoff_gives_up(sleeps, monkeypatch, use_async):
+    monkeypatch.setattr(embeddings, "MAX_RETRIES", 1)
+    embed, aembed, calls = _fake_backend([HTTPError(500), HTTPError(500)])
+    with pytest.raises(HTTPError):
+        if use_async:
+            asyncio.run(embeddings._awith_backoff(aembed, ["a"]))
+        else:
+            embeddings._with_backoff(embed, ["a"])
+    assert len(sleeps) == 1 and len(calls) == 2
+
+
+def test_client_errors_are_not_retried(sleeps):
+    assert embeddings._backoff_delay(HTTPError(400), 0) is None
+    assert embeddings._backoff_delay(ValueError("bad"), 0) is None
+    assert sleeps == []
+
+
+def test_backoff_is_capped(monkeypatch):
+    monkeypatch.setattr(embeddings.random, "uniform", lambda a, b: 1.0)
+    monkeypatch.setattr(embeddings, "MAX_RETRIES", 100)
+    assert embeddings._backoff_delay(HTTPError(502), 50) == embeddings.BACKOFF_MAX
+
+
+def test_embed_texts_keeps_order_across_batches(monkeypatch):
+    monkeypatch.setattr(embeddings, "_embed_batch", lambda b: [[float(t)] for t in b])
+    texts = [str(i) for i in range(10)]
+    assert embeddings.embed_texts(texts, batch_size=3, workers=4) == [[float(i)] for i in range(10)]
+
+    async def abatch(b):
+        await asyncio.sleep(0)
+        return [[float(t)] for t in b]
+
+    monkeypatch.setattr(embeddings, "_aembed_batch", abatch)
+    assert asyncio.run(embeddings.aembed_texts(texts, batch_size=3, workers=2)) == [[float(i)] for i in range(10)]
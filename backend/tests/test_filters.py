@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from retriever.filters import build_expr, matches, scalar_values, to_date_int
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, 0),
+        ("", 0),
+        (0, 0),
+        ("2020", 20200101),
+        (2020, 20200101),
+        ("2021-03-04", 20210304),
+        (20210304, 20210304),
+        (datetime.date(2021, 3, 4), 20210304),
+        (datetime.datetime(2021, 3, 4, 12, 0), 20210304),
+    ],
+)
+def test_to_date_int(value, expected):
+    assert to_date_int(value) == expected
+
+
+@pytest.mark.parametrize("value", [True, 3.5, "2021-03", {"gte": "2020"}, ["2020"]])
+def test_to_date_int_rejects(value):
+    with pytest.raises(ValueError):
+        to_date_int(value)
+
+
+def test_build_expr_empty():
+    assert build_expr(None) == ""
+    assert build_expr({}) == ""
+    assert build_expr({"jurisdiction": "", "source_type": []}) == ""
+
+
+def test_build_expr_fields_and_ranges():
+    expr = build_expr({
+        "jurisdiction": "CA",
+        "source_type": ["statute", "case"],
+        "effective_date": {"gte": "2020-01-01", "lt": 2024},
+    })
+    assert expr == (
+        'jurisdiction == "CA" and source_type in ["statute", "case"]'
+        " and effective_date >= 20200101 and effective_date < 20240101"
+    )
+
+
+def test_build_expr_quotes_values():
+    assert build_expr({"jurisdiction": 'CA" or id > 0 or "'}) == 'jurisdiction == "CA\\" or id > 0 or \\""'
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"court": "9th"},
+        {"jurisdiction": {"eq": "CA"}},
+        {"source_type": ["statute", ["case"]]},
+        {"effective_date": {"since": "2020"}},
+        {"effective_date": "sometime"},
+    ],
+)
+def test_build_expr_rejects(filters):
+    with pytest.raises(ValueError):
+        build_expr(filters)
+
+
+def test_matches_agrees_with_build_expr():
+    meta = {"jurisdiction": "CA", "source_type": "statute", "effective_date": "2021-06-01"}
+    assert matches(meta, None)
+    assert matches(meta, {"jurisdiction": ["CA", "NY"], "effective_date": {"gte": 2021}})
+    assert not matches(meta, {"source_type": "case"})
+    assert not matches(meta, {"effective_date": {"lt": "2021-06-01"}})
+    assert matches(meta, {"effective_date": "2021-06-01"})
+
+
+def test_scalar_values_defaults():
+    assert scalar_values({}) == {"jurisdiction": "", "source_type": "", "effective_date": 0}
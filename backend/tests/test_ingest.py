@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+from retriever import ingest as ingest_mod
+from retriever.ingest import IngestCancelled, Ingestor, _pipelined
+from retriever.lexical_index import LexicalIndex
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = []
+        self.deletes = []
+        self.flushes = 0
+
+    def insert(self, rows):
+        self.rows.extend(rows)
+
+    def delete(self, expr):
+        self.deletes.append(expr)
+
+    def flush(self):
+        self.flushes += 1
+
+
+@pytest.fixture
+def ingestor(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_mod, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(ingest_mod, "embed_texts", lambda texts, **kw: [[float(len(t)), 1.0] for t in texts])
+    ing = Ingestor("localhost", "19530", "test")
+    ing.truncate_dim = 0
+    ing._lexical = LexicalIndex("test", path=str(tmp_path / "lex.sqlite"))
+    col = FakeCollection()
+    monkeypatch.setattr(ing, "_collection", lambda: col)
+    return ing, col
+
+
+def _counter():
+    counts = {}
+    return counts, lambda counter, n: counts.__setitem__(counter, counts.get(counter, 0) + n)
+
+
+def test_inline_texts_are_inserted(ingestor):
+    ing, col = ingestor
+    counts, progress = _counter()
+    res = ing.ingest("", {"texts": ["First statute text.", {"text": "Second one.", "jurisdiction": "CA"}]}, on_progress=progress)
+    assert res == {"inserted": 2, "replaced_files": 0, "removed_files": 0}
+    assert counts["rows_inserted"] == 2 and "files_skipped" not in counts
+    assert [r["section"] for r in col.rows] == ["item-0", "item-1"]
+    assert col.rows[1]["jurisdiction"] == "CA"
+    assert col.flushes == 1
+    # Inline texts are never deduplicated against an earlier run
+    assert ing.ingest("", {"texts": ["First statute text."]})["inserted"] == 1
+
+
+def test_unchanged_files_are_skipped_and_changed_ones_replaced(ingestor, tmp_path):
+    ing, col = ingestor
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("Section 1. Alpha applies.\n")
+    (docs / "b.txt").write_text("Section 2. Beta applies.\n")
+    assert ing.ingest(str(docs), {})["inserted"] == 2
+
+    counts, progress = _counter()
+    res = ing.ingest(str(docs), {}, on_progress=progress)
+    assert res == {"inserted": 0, "replaced_files": 0, "removed_files": 0}
+    assert counts["files_read"] == 2 and counts["files_skipped"] == 2
+
+    (docs / "a.txt").write_text("Section 1. Alpha was amended.\n")
+    (docs / "b.txt").unlink()
+    res = ing.ingest(str(docs), {})
+    assert res == {"inserted": 1, "replaced_files": 1, "removed_files": 1}
+    assert col.deletes == ['source == "a.txt"', 'source == "b.txt"']
+    assert [h["source"] for h in ing._lexical.search("applies amended", 5)] == ["a.txt"]
+
+    # force re-ingests unchanged files
+    assert ing.ingest(str(docs), {"force": True})["inserted"] == 1
+
+
+def test_changed_file_without_chunks_drops_its_old_rows(ingestor, tmp_path):
+    ing, col = ingestor
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("Some text.\n")
+    ing.ingest(str(docs), {})
+    (docs / "a.txt").write_text("   \n")
+    res = ing.ingest(str(docs), {})
+    assert res["inserted"] == 0 and res["replaced_files"] == 1
+    assert col.deletes == ['source == "a.txt"']
+    # Recorded as empty, so the next run skips it
+    counts, progress = _counter()
+    ing.ingest(str(docs), {}, on_progress=progress)
+    assert counts["files_skipped"] == 1
+
+
+def test_cancel_keeps_checkpoint_and_resume_finishes(ingestor, tmp_path):
+    ing, col = ingestor
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(3):
+        (docs / f"{i}.txt").write_text(f"Section {i}. Text {i}.\n")
+    with pytest.raises(IngestCancelled):
+        ing.ingest(str(docs), {}, should_cancel=lambda: True)
+    assert col.rows == []
+    assert ing.ingest(str(docs), {})["inserted"] == 3
+
+
+def test_bad_source_raises(ingestor, tmp_path):
+    ing, _ = ingestor
+    with pytest.raises(ValueError):
+        ing.ingest(str(tmp_path / "missing"), {})
+
+
+
+def test_pipelined_forwards_errors_and_stops_producer():
+    def gen():
+        yield 1
+        raise RuntimeError("boom")
+
+    out = []
+    with pytest.raises(RuntimeError):
+        for x in _pipelined(gen(), 1):
+            out.append(x)
+    assert out == [1]
+
+
+def test_pipelined_producer_exits_when_consumer_stops_on_a_full_queue():
+    def gen():
+        yield 1
+        yield 2
+        raise RuntimeError("boom")
+
+    before = threading.active_count()
+    batches = _pipelined(gen(), 1)
+    assert next(batches) == 1
+    time.sleep(0.1)  # item 2 fills the queue; the error has nowhere to go
+    batches.close()
+    deadline = time.monotonic() + 3
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == before
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from jobs.ingest_jobs import IngestJobQueue
+from retriever.ingest import IngestCancelled
+
+
+def _wait_for(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+class Runner:
+    """Stands in for Ingestor.ingest: reports progress, then blocks until released or cancelled."""
+
+    def __init__(self, result=None, error=None):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.result = result if result is not None else {"inserted": 3}
+        self.error = error
+
+    def __call__(self, source_uri, options, on_progress, should_cancel):
+        on_progress("files_read", 2)
+        self.started.set()
+        while not self.release.wait(0.01):
+            if should_cancel():
+                raise IngestCancelled()
+        if self.error:
+            raise self.error
+        on_progress("rows_inserted", 3)
+        return self.result
+
+
+@pytest.fixture
+def jobs_dir(tmp_path):
+    return str(tmp_path / "jobs")
+
+
+def _status(q, job_id):
+    return q.get(job_id)["status"]
+
+
+def test_job_runs_to_completion(jobs_dir):
+    run = Runner()
+    finished = []
+    q = IngestJobQueue(run, workers=1, jobs_dir=jobs_dir, on_finish=finished.append)
+    job = q.submit("/data", {})
+    assert job["status"] in ("queued", "running") and len(job["id"]) == 32
+    run.started.wait(2)
+    assert _status(q, job["id"]) == "running"
+    run.release.set()
+    _wait_for(lambda: _status(q, job["id"]) == "succeeded")
+    job = q.get(job["id"])
+    assert job["result"] == {"inserted": 3}
+    assert job["progress"]["files_read"] == 2 and job["progress"]["rows_inserted"] == 3
+    assert [j["id"] for j in finished] == [job["id"]]
+    # Persisted for other processes and restarts
+    with open(os.path.join(jobs_dir, f"{job['id']}.json"), encoding="utf-8") as f:
+        assert json.load(f)["status"] == "succeeded"
+
+
+def test_failed_job_records_the_error(jobs_dir):
+    run = Runner(error=RuntimeError("milvus down"))
+    run.release.set()
+    q = IngestJobQueue(run, workers=1, jobs_dir=jobs_dir)
+    job_id = q.submit("/data", {})["id"]
+    _wait_for(lambda: _status(q, job_id) == "failed")
+    assert q.get(job_id)["error"] == "milvus down"
+
+
+def test_cancel_running_and_queued_jobs(jobs_dir):
+    run = Runner()
+    q = IngestJobQueue(run, workers=1, jobs_dir=jobs_dir)
+    running = q.submit("/a", {})["id"]
+    run.started.wait(2)
+    queued = q.submit("/b", {})["id"]
+    assert _status(q, queued) == "queued"
+
+    assert q.cancel(queued)["status"] == "cancelled"
+    q.cancel(running)
+    _wait_for(lambda: _status(q, running) == "cancelled")
+    # The cancelled queued job never starts, even once a worker frees up
+    time.sleep(0.05)
+    assert _status(q, queued) == "cancelled"
+    assert q.cancel("0" * 32) is None
+    # Cancelling a finished job changes nothing
+    assert q.cancel(running)["status"] == "cancelled"
+
+
+def test_unknown_or_malformed_ids(jobs_dir):
+    q = IngestJobQueue(Runner(), workers=1, jobs_dir=jobs_dir)
+    assert q.get("f" * 32) is None
+    assert q.get("../../etc/passwd") is None
+
+
+def test_restart_interrupts_jobs_of_a_dead_owner(jobs_dir):
+    run = Runner()
+    q1 = IngestJobQueue(run, workers=1, jobs_dir=jobs_dir)
+    job_id = q1.submit("/data", {})["id"]
+    run.started.wait(2)
+    # q1's process "dies": its owner lock is released without the job finishing
+    q1._owner_file.close()
+
+    q2 = IngestJobQueue(Runner(), workers=1, jobs_dir=jobs_dir)
+    job = q2.get(job_id)
+    assert job["status"] == "interrupted" and job["finished_at"]
+    assert not os.path.exists(q2._owner_path(q1._owner))
+    run.release.set()
+
+
+def test_jobs_of_a_live_peer_are_left_alone(jobs_dir):
+    run = Runner()
+    q1 = IngestJobQueue(run, workers=1, jobs_dir=jobs_dir)
+    job_id = q1.submit("/data", {})["id"]
+    run.started.wait(2)
+
+    q2 = IngestJobQueue(Runner(), workers=1, jobs_dir=jobs_dir)
+    assert _status(q2, job_id) == "running"
+    run.release.set()
+    _wait_for(lambda: _status(q1, job_id) == "succeeded")
+    # q2 re-reads jobs it does not own, so it sees the peer's progress
+    assert _status(q2, job_id) == "succeeded"
+    assert q2.get(job_id)["result"] == {"inserted": 3}
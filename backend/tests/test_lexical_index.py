@@ -0,0 +1,40 @@
+from retriever.lexical_index import LexicalIndex, chunk_key, reciprocal_rank_fusion
+
+
+def _hit(source, text, **kw):
+    return dict({"source": source, "text": text}, **kw)
+
+
+def test_rrf_orders_by_fused_rank_and_keeps_score():
+    dense = [_hit("a", "x", score=0.9, vector_score=0.9), _hit("b", "y", score=0.5, vector_score=0.5)]
+    sparse = [_hit("b", "y", score=7.0, lexical_score=7.0), _hit("c", "z", score=3.0, lexical_score=3.0)]
+    out = reciprocal_rank_fusion([dense, sparse], [1.0, 1.0], 60, 3)
+    assert [h["source"] for h in out] == ["b", "a", "c"]
+    assert out[0]["fused_score"] == round(1 / 62 + 1 / 61, 6)
+    # Fields come from the first list an item appears in, plus what later lists add
+    assert out[0]["score"] == 0.5 and out[0]["lexical_score"] == 7.0
+    assert all("key" not in h for h in out)
+
+
+def test_rrf_weights_and_k():
+    dense = [_hit("a", "x")]
+    sparse = [_hit("b", "y")]
+    out = reciprocal_rank_fusion([dense, sparse], [1.0, 2.0], 60, 1)
+    assert [h["source"] for h in out] == ["b"]
+
+
+def test_index_search_filters_and_delete(tmp_path):
+    idx = LexicalIndex("test", path=str(tmp_path / "lex.sqlite"))
+    idx.add([
+        {"text": "Cal. Civ. Proc. Code 335.1 sets a two year limit", "source": "ca.txt", "meta": {"jurisdiction": "CA"}},
+        {"text": "NY CPLR 214 sets a three year limit", "source": "ny.txt", "meta": {"jurisdiction": "NY"}},
+    ])
+    hits = idx.search("335.1 limit", 5)
+    assert hits[0]["source"] == "ca.txt"
+    assert hits[0]["key"] == chunk_key("ca.txt", hits[0]["text"])
+    assert [h["source"] for h in idx.search("limit", 5, filters={"jurisdiction": "NY"})] == ["ny.txt"]
+    # FTS5 syntax in the query is taken literally
+    assert idx.search('limit" OR "x', 5)
+    assert idx.search("the of and", 5) == []
+    idx.delete_source("ca.txt")
+    assert [h["source"] for h in idx.search("limit", 5)] == ["ny.txt"]
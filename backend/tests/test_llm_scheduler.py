@@ -0,0 +1,210 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tools import llm_scheduler
+from tools.llm_scheduler import LLMOverloaded, LLMScheduler, llm_priority
+
+
+def _wait_for(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def _waiting(s):
+    return sum(s.stats()["waiting"].values())
+
+
+def _take_in_thread(s, order, name, priority):
+    def run():
+        with s.slot("m", priority=priority):
+            order.append(name)
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def test_slot_yields_host_and_releases():
+    s = LLMScheduler(["http://a"], max_in_flight=2)
+    with s.slot("m") as host:
+        assert host == "http://a"
+        assert s.stats()["in_flight"] == {"http://a m": 1}
+    assert s.stats()["in_flight"] == {}
+
+
+def test_freed_slot_goes_to_higher_priority_first():
+    s = LLMScheduler(["h"], max_in_flight=1, queue_timeout=5)
+    order = []
+    with s.slot("m"):
+        batch = _take_in_thread(s, order, "batch", "batch")
+        _wait_for(lambda: _waiting(s) == 1)
+        evals = _take_in_thread(s, order, "eval", "eval")
+        _wait_for(lambda: _waiting(s) == 2)
+        interactive = _take_in_thread(s, order, "interactive", "interactive")
+        _wait_for(lambda: _waiting(s) == 3)
+    for t in (batch, evals, interactive):
+        t.join(2)
+    assert order == ["interactive", "batch", "eval"]
+
+
+def test_new_call_does_not_jump_the_queue():
+    s = LLMScheduler(["h"], max_in_flight=1, queue_timeout=5)
+    order = []
+    with s.slot("m"):
+        first = _take_in_thread(s, order, "first", "batch")
+        _wait_for(lambda: _waiting(s) == 1)
+        second = _take_in_thread(s, order, "second", "batch")
+        _wait_for(lambda: _waiting(s) == 2)
+    first.join(2)
+    second.join(2)
+    assert order == ["first", "second"]
+
+
+def test_interactive_shed_when_queue_full():
+    s = LLMScheduler(["h"], max_in_flight=1, max_queue=1, queue_timeout=5)
+    with s.slot("m"):
+        waiter = _take_in_thread(s, [], "w", "interactive")
+        _wait_for(lambda: _waiting(s) == 1)
+        with pytest.raises(LLMOverloaded) as exc:
+            s.admit("m")
+        assert exc.value.retry_after >= 1
+        with pytest.raises(LLMOverloaded):
+            with s.slot("m"):
+                pass
+        # Batch work is never shed for queue length
+        s.admit("m", priority="batch")
+    waiter.join(2)
+
+
+def test_interactive_shed_after_queue_timeout():
+    s = LLMScheduler(["h"], max_in_flight=1, queue_timeout=0.05)
+    with s.slot("m"):
+        with pytest.raises(LLMOverloaded):
+            with s.slot("m"):
+                pass
+    assert _waiting(s) == 0
+
+
+def test_llm_priority_context():
+    s = LLMScheduler(["h"], max_in_flight=1, max_queue=1, queue_timeout=5)
+    with s.slot("m"):
+        waiter = _take_in_thread(s, [], "w", "interactive")
+        _wait_for(lambda: _waiting(s) == 1)
+        with pytest.raises(LLMOverloaded):
+            s.admit("m")
+        with llm_priority("batch"):
+            s.admit("m")
+    waiter.join(2)
+    with pytest.raises(ValueError):
+        with llm_priority("urgent"):
+            pass
+
+
+def test_least_busy_host_and_cooldown(monkeypatch):
+    s = LLMScheduler(["a", "b"], max_in_flight=2)
+    with s.slot("m") as first, s.slot("m") as second:
+        assert {first, second} == {"a", "b"}
+    s.mark_down("a")
+    assert s.stats()["hosts_down"] == ["a"]
+    for _ in range(4):
+        with s.slot("m") as host:
+            assert host == "b"
+    # After the cooldown the host is used again
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: time.time() + 10 * llm_scheduler.HOST_COOLDOWN)
+    assert s.stats()["hosts_down"] == []
+
+
+def test_all_hosts_down_still_serves():
+    s = LLMScheduler(["a", "b"], max_in_flight=1)
+    s.mark_down("a")
+    s.mark_down("b")
+    with s.slot("m") as host:
+        assert host in ("a", "b")
+
+
+def test_single_host_is_never_marked_down():
+    s = LLMScheduler(["a"])
+    s.mark_down("a")
+    assert s.stats()["hosts_down"] == []
+
+
+def test_aslot_shares_slots_with_threads():
+    s = LLMScheduler(["h"], max_in_flight=1, queue_timeout=5)
+
+    async def main():
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with s.slot("m"):
+                held.set()
+                release.wait(2)
+
+        t = threading.Thread(target=hold)
+        t.start()
+        held.wait(2)
+
+        async def call():
+            async with s.aslot("m") as host:
+                return host
+
+        task = asyncio.ensure_future(call())
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        release.set()
+        assert await asyncio.wait_for(task, 2) == "h"
+        t.join(2)
+
+    asyncio.run(main())
+    assert s.stats()["in_flight"] == {}
+
+
+def test_aslot_cancelled_waiter_leaves_no_trace():
+    s = LLMScheduler(["h"], max_in_flight=1, queue_timeout=5)
+
+    async def main():
+        async with s.aslot("m"):
+            task = asyncio.ensure_future(s.aslot("m").__aenter__())
+            await asyncio.sleep(0.02)
+            assert _waiting(s) == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert _waiting(s) == 0
+
+    asyncio.run(main())
+    assert s.stats()["in_flight"] == {}
+
+
+def test_aslot_timeout_sheds():
+    s = LLMScheduler(["h"], max_in_flight=1, queue_timeout=0.05)
+
+    async def main():
+        async with s.aslot("m"):
+            with pytest.raises(LLMOverloaded):
+                async with s.aslot("m"):
+                    pass
+
+    asyncio.run(main())
+    assert _waiting(s) == 0
+
+
+def test_abandoned_grant_does_not_feed_hold_time():
+    s = LLMScheduler(["h"], max_in_flight=1)
+    with s._cond:
+        host, w = s._enter("m", "batch")
+        assert host == "h" and w is None
+        _, w = s._enter("m", "batch")
+    s._release("h", "m", 2.0)  # hands the slot to the waiter
+    assert w.host == "h"
+    with s._cond:
+        granted = s._abandon(w)
+    s._release(granted, "m", None)
+    assert s._hold_ewma["m"] == 2.0
+    assert s.stats()["in_flight"] == {}
@@ -0,0 +1,81 @@
+import grpc
+import pytest
+from pymilvus.client.types import Status
+from pymilvus.exceptions import MilvusException
+
+from retriever import milvus_conn
+from retriever.milvus_conn import MilvusManager, SchemaMismatch, is_connection_error, parse_hosts
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    mgr = MilvusManager([("a", "19530"), ("b", "19530")])
+    handles = []
+
+    def handle(name, i):
+        handles.append(i)
+        return f"col-{i}"
+
+    resets = []
+    monkeypatch.setattr(mgr, "_handle", handle)
+    monkeypatch.setattr(mgr, "_reset", lambda name: resets.append(name))
+    return mgr, handles, resets
+
+
+def _failing(*errors):
+    errors = list(errors)
+    calls = []
+
+    def fn(col):
+        calls.append(col)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return fn, calls
+
+
+def test_parse_hosts():
+    assert parse_hosts("a:1, b ,") == [("a", "1"), ("b", "19530")]
+
+
+@pytest.mark.parametrize("err", [
+    MilvusException(code=Status.CONNECT_FAILED, message="Fail connecting to server"),
+    MilvusException(code=grpc.StatusCode.UNAVAILABLE, message="Retry run out of 75 retry times"),
+    ConnectionError("reset by peer"),
+])
+def test_connection_errors_reconnect_and_retry_reads(manager, err):
+    mgr, handles, resets = manager
+    fn, calls = _failing(err)
+    assert is_connection_error(err)
+    assert mgr.call("c", fn) == "ok"
+    assert resets == ["c"] and len(calls) == 2
+
+
+def test_connection_errors_on_writes_are_not_retried(manager):
+    mgr, handles, resets = manager
+    fn, calls = _failing(ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        mgr.call("c", fn, write=True)
+    assert resets == ["c"] and calls == ["col-0"]
+
+
+@pytest.mark.parametrize("err", [
+    MilvusException(code=1100, message="cannot parse expression: jurisdiction = 'CA'"),
+    MilvusException(code=65535, message="field nonexistent not exist"),
+    SchemaMismatch("old collection"),
+    ValueError("bad"),
+])
+def test_other_errors_leave_connections_alone(manager, err):
+    mgr, handles, resets = manager
+    fn, calls = _failing(err)
+    assert not is_connection_error(err)
+    with pytest.raises(type(err)):
+        mgr.call("c", fn)
+    assert resets == [] and len(calls) == 1
+
+
+def test_get_milvus_is_shared_per_host(monkeypatch):
+    monkeypatch.setattr(milvus_conn, "MILVUS_HOSTS", "")
+    assert milvus_conn.get_milvus("x", "1") is milvus_conn.get_milvus("x", "1")
+    assert milvus_conn.get_milvus("x", "1") is not milvus_conn.get_milvus("y", "1")
@@ -0,0 +1,241 @@
+import asyncio
+import threading
+
+import pytest
+
+from agents.orchestrator import AskOrchestrator
+from tools.answer_cache import SemanticAnswerCache
+
+CTX = [{"source": "ca.txt", "section": "335.1", "text": "Two years.", "score": 0.8}]
+WEB = [{"url": "https://example.com", "text": "Fresh."}]
+
+
+class Retriever:
+    def prepare(self):
+        pass
+
+    def embed_query(self, query):
+        return [1.0, 0.0]
+
+    async def aembed_query(self, query):
+        return self.embed_query(query)
+
+    def retrieve(self, query, vector=None, filters=None, search=None):
+        return [dict(c) for c in CTX]
+
+    async def aretrieve(self, query, **kw):
+        return self.retrieve(query, **kw)
+
+    def embed_queries(self, queries):
+        return [[1.0, float(i)] for i in range(len(queries))]
+
+    async def aembed_queries(self, queries):
+        return self.embed_queries(queries)
+
+    def retrieve_many(self, queries, vectors=None, filters=None, search=None):
+        return [self.retrieve(q) for q in queries]
+
+    async def aretrieve_many(self, queries, **kw):
+        return self.retrieve_many(queries, **kw)
+
+
+class Paralegal:
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, query, ctx):
+        self.calls.append("generate")
+        if query == "boom":
+            raise RuntimeError("ollama down")
+        return {"text": "Two years [R1].", "citations": []}
+
+    async def agenerate(self, query, ctx):
+        return self.generate(query, ctx)
+
+    def draft_and_assess(self, query, ctx, schema=True):
+        self.calls.append("draft_and_assess")
+        return {"text": "Two years [R1].", "citations": [], "assessment": None}
+
+    async def adraft_and_assess(self, query, ctx, schema=True):
+        return self.draft_and_assess(query, ctx, schema)
+
+
+class Router:
+    def __init__(self, passed, web_likely=False):
+        self.passed = passed
+        self.likely = web_likely
+        self.judged = threading.Event()
+
+    def web_likely(self, query, ctx):
+        return self.likely
+
+    def route(self, query, draft, ctx):
+        self.judged.set()
+        return {"pass": self.passed, "tier": "heuristic"}
+
+    async def aroute(self, query, draft, ctx):
+        return self.route(query, draft, ctx)
+
+
+class Synthesizer:
+    def synthesize(self, query, ctx, web_ctx, draft, verdict):
+        return {"text": f"answer ({len(web_ctx)} web)", "citations": ["c"]}
+
+    async def asynthesize(self, *args):
+        return self.synthesize(*args)
+
+    def synthesize_stream(self, query, ctx, web_ctx, draft, verdict):
+        yield from ("ans", "wer")
+
+    async def asynthesize_stream(self, *args):
+        for t in self.synthesize_stream(*args):
+            yield t
+
+    def citations(self, ctx, web_ctx):
+        return ["c"]
+
+
+class Firecrawl:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def search_and_extract(self, query):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("firecrawl 500")
+        return WEB
+
+    async def asearch_and_extract(self, query):
+        return self.search_and_extract(query)
+
+
+def _orch(passed=True, web_likely=False, speculative=False, fail_web=False, pipeline=None):
+    return AskOrchestrator(
+        Retriever(), Paralegal(), Router(passed, web_likely), Synthesizer(), Firecrawl(fail_web),
+        speculative_web=speculative, pipeline=pipeline,
+    )
+
+
+def _run(o, use_async, **kw):
+    return asyncio.run(o.arun("q", **kw)) if use_async else o.run("q", **kw)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_passing_verdict_skips_the_web(use_async):
+    o = _orch(passed=True)
+    out = _run(o, use_async)
+    assert out["answer"] == "answer (0 web)" and out["web_sources"] == []
+    assert out["routing"]["pass"] is True and out["cache"] == {"hit": False}
+    assert out["sources"][0]["source"] == "ca.txt"
+    assert {"embed", "retrieve", "draft", "judge", "synthesize", "total"} <= set(out["timings"])
+    assert o.firecrawl.calls == 0
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_failing_verdict_falls_back_to_the_web(use_async):
+    o = _orch(passed=False)
+    out = _run(o, use_async)
+    assert out["web_sources"] == WEB and out["answer"] == "answer (1 web)"
+    assert o.firecrawl.calls == 1 and "web_wait" in out["timings"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_web_failure_still_answers_from_the_corpus(use_async):
+    o = _orch(passed=False, fail_web=True)
+    out = _run(o, use_async)
+    assert out["web_sources"] == [] and out["answer"] == "answer (0 web)"
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_speculative_search_is_reused_on_fallback(use_async):
+    o = _orch(passed=False, web_likely=True, speculative=True)
+    assert _run(o, use_async)["web_sources"] == WEB
+    assert o.firecrawl.calls == 1
+
+
+@pytest.mark.parametrize("likely, speculative, calls", [(False, True, 0), (True, False, 0)])
+def test_no_speculative_search_unless_enabled_and_likely(likely, speculative, calls):
+    o = _orch(passed=True, web_likely=likely, speculative=speculative)
+    o.run("q")
+    assert o.firecrawl.calls == calls
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_single_pass_pipeline_per_request(use_async):
+    o = _orch()
+    _run(o, use_async, pipeline="single_pass")
+    assert o.paralegal.calls == ["draft_and_assess"]
+
+
+def test_unknown_pipeline_is_rejected():
+    with pytest.raises(ValueError):
+        _orch(pipeline="three_pass")
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_answer_cache_hit_skips_the_agents(use_async):
+    o = _orch()
+    cache = SemanticAnswerCache()
+    first = _run(o, use_async, cache=cache)
+    second = _run(o, use_async, cache=cache)
+    assert first["cache"] == {"hit": False}
+    assert second["cache"]["hit"] is True and second["answer"] == first["answer"]
+    assert o.paralegal.calls == ["generate"]
+
+
+def test_stream_events_in_order():
+    o = _orch(passed=False)
+    events = list(o.events("q", stream=True))
+    names = [e for e, _ in events]
+    assert names == ["retrieved", "drafted", "judged", "web", "token", "token", "done"]
+    assert events[-1][1]["answer"] == "answer"
+
+
+def test_batch_isolates_failures_and_never_speculates():
+    o = _orch(passed=False, web_likely=True, speculative=True)
+    results = dict(o.run_batch(["q1", "boom", "q3"]))
+    assert results[1] == {"error": "ollama down"}
+    assert results[0]["answer"] == results[2]["answer"] == "answer (1 web)"
+    # One fallback search per failed verdict, none started speculatively for the failed query
+    assert o.firecrawl.calls == 2
+
+
+def test_async_batch():
+    o = _orch()
+
+    async def collect():
+        return {i: r async for i, r in o.arun_batch(["q1", "boom"])}
+
+    results = asyncio.run(collect())
+    assert results[1] == {"error": "ollama down"} and results[0]["answer"] == "answer (0 web)"
+
+
+def test_async_path_packs_and_caches_off_the_event_loop():
+    threads = {}
+
+    class Packer:
+        def pack(self, query, ctx):
+            threads["pack"] = threading.current_thread()
+            return ctx
+
+    class Cache(SemanticAnswerCache):
+        def lookup(self, vec, ctx):
+            threads["lookup"] = threading.current_thread()
+            return super().lookup(vec, ctx)
+
+        def store(self, vec, ctx, payload):
+            threads["store"] = threading.current_thread()
+            super().store(vec, ctx, payload)
+
+    o = _orch()
+    o.packer = Packer()
+
+    async def main():
+        threads["loop"] = threading.current_thread()
+        return await o.arun("q", cache=Cache())
+
+    assert asyncio.run(main())["answer"] == "answer (0 web)"
+    loop = threads.pop("loop")
+    assert set(threads) == {"pack", "lookup", "store"}
+    assert all(t is not loop for t in threads.values())
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+from agents import paralegal as paralegal_mod
+from agents.paralegal import ParalegalAgent, _salvage_draft
+from agents.prompts import DRAFT_INSTRUCTIONS, shared_prefix
+
+CTX = [{"source": "ca.txt", "section": "335.1", "text": "Two years for personal injury."}]
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    """Queue of raw model replies; records the prompts and formats the agent sent."""
+    queue, sent = [], []
+
+    def generate(model, prompt, fmt=None, **kw):
+        sent.append((prompt, fmt))
+        return queue.pop(0)
+
+    async def agenerate(model, prompt, fmt=None, **kw):
+        return generate(model, prompt, fmt=fmt, **kw)
+
+    monkeypatch.setattr(paralegal_mod, "ollama_generate", generate)
+    monkeypatch.setattr(paralegal_mod, "ollama_agenerate", agenerate)
+    return queue, sent
+
+
+def test_both_pipelines_draft_from_the_same_instructions():
+    p = ParalegalAgent()
+    draft, assess = p._draft_prompt("q", CTX), p._assess_prompt("q", CTX)
+    for prompt in (draft, assess):
+        assert prompt.startswith(shared_prefix(CTX) + "TASK:\n" + DRAFT_INSTRUCTIONS + "\n")
+    assert draft.endswith("DRAFT:") and assess.endswith("JSON:")
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"draft": "Two years [R1].", "scores": {"cov', "Two years [R1]."),
+    ('{"draft": "Says \\"two\\" years", "pass": tr', 'Says "two" years'),
+    ('{"draft": "Two ye', None),
+    ('{"draft": "  ", "pass": true', None),
+    ("not json", None),
+    ("", None),
+])
+def test_salvage_draft(raw, expected):
+    assert _salvage_draft(raw) == expected
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_complete_reply_carries_the_assessment(replies, use_async):
+    queue, sent = replies
+    queue.append(json.dumps({"draft": "Two years [R1].", "scores": {"coverage": 5}, "pass": True, "notes": "ok"}))
+    p = ParalegalAgent()
+    out = asyncio.run(p.adraft_and_assess("q", CTX)) if use_async else p.draft_and_assess("q", CTX)
+    assert out["text"] == "Two years [R1]."
+    assert out["assessment"] == {"pass": True, "scores": {"coverage": 5}, "notes": "ok"}
+    assert out["citations"] == [{"source": "ca.txt", "section": "335.1"}]
+    assert sent[0][1] == paralegal_mod.DRAFT_AND_ASSESS_SCHEMA
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_reply_cut_off_after_the_draft_keeps_it_for_the_judge(replies, use_async):
+    queue, sent = replies
+    queue.append('{"draft": "Two years [R1].", "scores": {"coverage": 4, "grou')
+    p = ParalegalAgent()
+    out = asyncio.run(p.adraft_and_assess("q", CTX, schema=False)) if use_async else p.draft_and_assess("q", CTX, schema=False)
+    assert out["text"] == "Two years [R1]." and out["assessment"] is None
+    assert len(sent) == 1 and sent[0][1] == "json"
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_reply_cut_off_inside_the_draft_is_redrafted(replies, use_async):
+    queue, sent = replies
+    queue.extend(['{"draft": "Two ye', "Two years [R1]."])
+    p = ParalegalAgent()
+    out = asyncio.run(p.adraft_and_assess("q", CTX)) if use_async else p.draft_and_assess("q", CTX)
+    assert out["text"] == "Two years [R1]." and out["assessment"] is None
+    assert sent[1][0] == p._draft_prompt("q", CTX)
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import pytest
+
+from agents import router as router_mod
+from agents.router import RouterAgent, parse_json_object
+
+CTX = [
+    {"source": "ca.txt", "section": "335.1", "text": "Two years.", "score": 0.82},
+    {"source": "ny.txt", "section": "214", "text": "Three years.", "score": 0.55},
+]
+CITED = {"text": "California allows two years for personal injury [R1]. New York allows three years instead [R2]."}
+JUDGE_PASS = {"pass": True, "scores": {"coverage": 5, "grounding": 4, "citations": 4, "freshness": 5}, "notes": "ok"}
+
+
+@pytest.fixture
+def router():
+    # The shipped thresholds and phrase lists
+    return RouterAgent()
+
+
+@pytest.fixture
+def judge(monkeypatch):
+    """Replies of the LLM judge; records how often it was called."""
+    replies, calls = [], []
+
+    def generate(model, prompt, **kw):
+        calls.append(prompt)
+        return replies.pop(0)
+
+    async def agenerate(model, prompt, **kw):
+        return generate(model, prompt, **kw)
+
+    monkeypatch.setattr(router_mod, "ollama_generate", generate)
+    monkeypatch.setattr(router_mod, "ollama_agenerate", agenerate)
+    return replies, calls
+
+
+def test_strong_cited_draft_passes_without_the_judge(router, judge):
+    _, calls = judge
+    v = router.route("How long to sue for personal injury?", CITED, CTX)
+    assert v["pass"] is True and v["tier"] == "heuristic" and v["notes"] == "heuristic pass"
+    assert set(v["scores"]) == set(router_mod.DIMENSIONS) and all(0 <= x <= 5 for x in v["scores"].values())
+    assert calls == []
+
+
+@pytest.mark.parametrize("query, draft, ctx, reason", [
+    ("q", CITED, [], "no_context"),
+    ("q", CITED, [dict(c, score=0.1) for c in CTX], "weak_retrieval"),
+    ("q", {"text": "The context does not address this question at all [R1]."}, CTX, "draft_uncertain"),
+    ("q", {"text": "California allows two years for personal injury claims."}, CTX, "uncited_draft"),
+    ("What is the latest ruling on this?", CITED, CTX, "freshness"),
+    ("Any new law this year?", CITED, CTX, "freshness"),
+])
+def test_heuristic_fail_reasons(router, query, draft, ctx, reason):
+    v = router.pre_route(query, draft, ctx)
+    assert v["pass"] is False and v["tier"] == "heuristic"
+    assert reason in v["notes"]
+
+
+def test_statutory_wording_is_not_a_freshness_signal(router):
+    assert router.signals("What is the current limit under the statute as amended?", CITED, CTX)["fresh"] == []
+    # Keywords match whole words only
+    assert router.signals("Is this statute outdated?", CITED, CTX)["fresh"] == []
+
+
+def test_middling_retrieval_is_inconclusive_and_goes_to_the_judge(router, judge):
+    replies, calls = judge
+    replies.append("Sure! ```json\n" + json.dumps(JUDGE_PASS) + "\n```")
+    ctx = [dict(c, score=0.45) for c in CTX]
+    assert router.pre_route("q", CITED, ctx) is None
+    v = router.route("q", CITED, ctx)
+    assert v["tier"] == "llm" and v["pass"] is True and len(calls) == 1
+
+
+def test_invalid_reference_blocks_a_heuristic_pass(router):
+    draft = {"text": "California allows two years for personal injury [R1]. New York allows three years [R7]."}
+    assert router.pre_route("q", draft, CTX) is None
+
+
+def test_vector_score_is_used_over_fused_score(router):
+    # Hybrid hits: score is the vector similarity and lexical-only hits carry 0.0
+    ctx = [dict(CTX[0], score=0.0, vector_score=0.82, fused_score=0.03)]
+    assert router.signals("q", CITED, ctx)["top_score"] == 0.82
+
+
+def test_self_assessment_replaces_the_judge(router, judge):
+    _, calls = judge
+    ctx = [dict(c, score=0.45) for c in CTX]
+    v = router.route("q", dict(CITED, assessment=JUDGE_PASS), ctx)
+    assert v["tier"] == "self" and v["pass"] is True and calls == []
+
+
+def test_unparseable_self_assessment_falls_back_to_the_judge(router, judge):
+    replies, calls = judge
+    replies.append(json.dumps(JUDGE_PASS))
+    ctx = [dict(c, score=0.45) for c in CTX]
+    v = asyncio.run(router.aroute("q", dict(CITED, assessment={"scores": "n/a"}), ctx))
+    assert v["tier"] == "llm" and len(calls) == 1
+
+
+def test_heuristics_can_be_disabled(judge):
+    replies, calls = judge
+    replies.append(json.dumps(JUDGE_PASS))
+    r = RouterAgent(cfg={"heuristics": {"enabled": False}})
+    assert r.route("q", CITED, CTX)["tier"] == "llm" and len(calls) == 1
+
+
+def test_web_likely(router):
+    assert not router.web_likely("How long to sue?", CTX)
+    assert router.web_likely("What is the most recent decision?", CTX)
+    assert router.web_likely("How long to sue?", [dict(c, score=0.1) for c in CTX])
+    assert router.web_likely("How long to sue?", [])
+
+
+@pytest.mark.parametrize("obj, passed", [
+    (JUDGE_PASS, True),
+    (dict(JUDGE_PASS, **{"pass": False}), False),
+    (dict(JUDGE_PASS, scores={"coverage": 5, "grounding": 5, "citations": 5, "freshness": 2}), False),
+    (dict(JUDGE_PASS, scores={"coverage": 4, "grounding": 4, "citations": 3, "freshness": 4}), False),
+    (dict(JUDGE_PASS, scores={"coverage": "9", "grounding": 4, "citations": 4, "freshness": 4}), True),
+])
+def test_verdict_from_json_applies_thresholds(router, obj, passed):
+    v = router.verdict_from_json(obj)
+    assert v["pass"] is passed and max(v["scores"].values()) <= 5
+
+
+@pytest.mark.parametrize("obj", [None, {}, {"scores": "high"}, {"scores": {"coverage": "x"}}])
+def test_verdict_from_json_parse_errors_fail(router, obj):
+    v = router.verdict_from_json(obj)
+    assert v == {"pass": False, "scores": {k: 0 for k in router_mod.DIMENSIONS}, "notes": "judge_parse_error"}
+
+
+def test_parse_json_object():
+    assert parse_json_object('Here: {"a": {"b": 1}} and then {"c": 2} trailing') == {"c": 2}
+    assert parse_json_object('```json\n{"pass": true}\n```') == {"pass": True}
+    assert parse_json_object("no json here") is None
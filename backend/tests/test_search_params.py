@@ -0,0 +1,103 @@
+import pytest
+
+from retriever.search_params import MILVUS_MAX_TOPK, SearchParams, index_type, truncate_vectors, vector_dim
+
+MODES = {
+    "fast": {"ef": 32, "nprobe": 4, "k": 5},
+    "balanced": {"ef": 80},
+    "thorough": {"ef": 256, "nprobe": 64, "search_list": 300, "k": 50},
+}
+
+
+def _cfg(index="HNSW", k=20, max_k=100, **extra):
+    cfg = {
+        "metric_type": "IP",
+        "index": {"type": index},
+        "search": {"efSearch": 64, "nprobe": 16, "search_list": 100, "modes": MODES},
+        "retrieval": {"k": k, "max_k": max_k},
+    }
+    cfg.update(extra)
+    return cfg
+
+
+def test_defaults():
+    p = SearchParams(_cfg())
+    assert p.resolve() == (20, {"ef": 64, "nprobe": 16, "search_list": 100})
+    assert p.metric_type == "IP" and p.max_k == 100
+
+
+def test_default_k_argument_beats_config():
+    assert SearchParams(_cfg(), default_k=7).resolve()[0] == 7
+
+
+def test_mode_presets_and_explicit_overrides():
+    p = SearchParams(_cfg())
+    assert p.resolve({"mode": "fast"}) == (5, {"ef": 32, "nprobe": 4, "search_list": 100})
+    assert p.resolve({"mode": "thorough", "ef": 100}) == (50, {"ef": 100, "nprobe": 64, "search_list": 300})
+    assert p.resolve({"mode": "balanced", "k": 12})[0] == 12
+    # An explicit k argument beats the request
+    assert p.resolve({"mode": "fast", "k": 12}, k=3)[0] == 3
+
+
+def test_max_k_rejects_requests_and_caps_presets():
+    p = SearchParams(_cfg(max_k=30))
+    assert p.resolve({"k": 30})[0] == 30
+    with pytest.raises(ValueError, match="at most 30"):
+        p.resolve({"k": 31})
+    assert p.resolve({"mode": "thorough"})[0] == 30
+    assert SearchParams(_cfg(k=500, max_k=30)).resolve()[0] == 30
+
+
+def test_max_k_defaults_to_the_server_limit():
+    assert SearchParams(_cfg(max_k=None)).max_k == MILVUS_MAX_TOPK
+    assert SearchParams(_cfg(max_k=10 ** 6)).max_k == MILVUS_MAX_TOPK
+
+
+@pytest.mark.parametrize("search, message", [
+    ("fast", "must be an object"),
+    ({"mode": "turbo"}, "search.mode must be one of"),
+    ({"k": 0}, "search.k must be a positive integer"),
+    ({"k": "10"}, "search.k must be a positive integer"),
+    ({"k": True}, "search.k must be a positive integer"),
+    ({"ef": 1.5}, "search.ef must be a positive integer"),
+    ({"nprobe": False}, "search.nprobe must be a positive integer"),
+    ({"limit": 5}, "unsupported search option"),
+])
+def test_validate_rejects(search, message):
+    with pytest.raises(ValueError, match=message):
+        SearchParams(_cfg()).validate(search)
+
+
+@pytest.mark.parametrize("index, limit, expected", [
+    ("HNSW", 10, {"ef": 64}),
+    ("HNSW_SQ", 100, {"ef": 100}),
+    ("IVF_PQ", 100, {"nprobe": 16}),
+    ("DISKANN", 150, {"search_list": 150}),
+    ("FLAT", 10, {}),
+])
+def test_param_per_index_family(index, limit, expected):
+    p = SearchParams(_cfg(index=index, max_k=1000))
+    k, knobs = p.resolve()
+    assert p.param(knobs, limit) == {"metric_type": "IP", "params": expected}
+
+
+def test_index_type_and_dims():
+    assert index_type({"index": {"type": "hnsw"}}) == "HNSW"
+    with pytest.raises(ValueError):
+        index_type({"index": {"type": "ANNOY"}})
+    assert vector_dim({"vectors": {"dim": 768}}) == 768
+    assert vector_dim({"vectors": {"dim": 1536, "truncate_dim": 512}}) == 512
+
+
+def test_truncate_vectors():
+    assert truncate_vectors([[3.0, 4.0, 12.0]], 2) == [[0.6, 0.8]]
+    assert truncate_vectors([[1.0, 2.0]], 0) == [[1.0, 2.0]]
+    assert truncate_vectors([[1.0, 2.0]], 5) == [[1.0, 2.0]]
+
+
+def test_shipped_config_resolves():
+    p = SearchParams()
+    k, _ = p.resolve()
+    assert 1 <= k <= p.max_k
+    for mode in p.modes:
+        p.resolve({"mode": mode})
@@ -0,0 +1,110 @@
+import os
+import math
+import time
+import hashlib
+import logging
+import operator
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+
+_log = logging.getLogger(__name__)
+
+# Env configuration
+ENABLED = os.getenv("ANSWER_CACHE", "true").lower() in ("1", "true", "yes")
+THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+MAX_ITEMS = int(os.getenv("ANSWER_CACHE_MAX_ITEMS", "512"))
+
+
+def _normalize(vec: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+def sources_fingerprint(ctx: List[Dict[str, Any]]) -> str:
+    """Order-independent hash of the retrieved chunks, so a cached answer is only reused on the same evidence."""
+    h = hashlib.sha256()
+    for item in sorted(f"{c.get('source', '')}\0{c.get('section', '')}\0{c.get('text', '')}" for c in ctx):
+        h.update(item.encode("utf-8"))
+        h.update(b"\1")
+    return h.hexdigest()
+
+
+class SemanticAnswerCache:
+    """In-process cache of final /ask payloads keyed by query embedding.
+
+    A lookup hits when a stored query is within ``threshold`` cosine
+    similarity, was stored less than ``ttl`` seconds ago, and was answered
+    from the same retrieved sources. ``invalidate()`` drops everything and is
+    called when an ingest finishes.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD, ttl: float = TTL, max_items: int = MAX_ITEMS):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def lookup(self, vec: List[float], ctx: List[Dict[str, Any]]) -> Optional[Tuple[Dict[str, Any], float]]:
+        q = _normalize(vec)
+        fp = sources_fingerprint(ctx)
+        now = time.time()
+        best: Optional[Dict[str, Any]] = None
+        best_sim = -1.0
+        with self._lock:
+            self._entries = [e for e in self._entries if now - e["stored_at"] < self.ttl]
+            for e in self._entries:
+                if e["fingerprint"] != fp or len(e["vec"]) != len(q):
+                    continue
+                sim = sum(map(operator.mul, q, e["vec"]))
+                if sim > best_sim:
+                    best, best_sim = e, sim
+            if best is not None and best_sim >= self.threshold:
+                best["last_hit"] = now
+                self._stats["hits"] += 1
+                return dict(best["payload"]), best_sim
+            self._stats["misses"] += 1
+        return None
+
+    def store(self, vec: List[float], ctx: List[Dict[str, Any]], payload: Dict[str, Any]) -> None:
+        now = time.time()
+        entry = {
+            "vec": _normalize(vec),
+            "fingerprint": sources_fingerprint(ctx),
+            "payload": payload,
+            "stored_at": now,
+            "last_hit": now,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_items:
+                # Evict the least recently used entry
+                self._entries.remove(min(self._entries, key=lambda e: e["last_hit"]))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+        _log.info("Answer cache invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, items=len(self._entries), threshold=self.threshold, ttl=self.ttl)
+
+
+_cache: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Process-wide answer cache, or None when ANSWER_CACHE is disabled."""
+    global _cache
+    if not ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache()
+    return _cache
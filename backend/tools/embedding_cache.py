@@ -0,0 +1,135 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+
+_log = logging.getLogger(__name__)
+
+# Env configuration
+ENABLED = os.getenv("EMBEDDINGS_CACHE", "true").lower() in ("1", "true", "yes")
+MEM_ITEMS = int(os.getenv("EMBEDDINGS_CACHE_MEM_ITEMS", "10000"))
+DISK_ITEMS = int(os.getenv("EMBEDDINGS_CACHE_DISK_ITEMS", "1000000"))  # 0 disables the disk tier
+DISK_PATH = os.getenv("EMBEDDINGS_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", ".cache", "embeddings.sqlite"))
+
+
+def cache_key(backend: str, model: str, text: str) -> str:
+    return hashlib.sha256(f"{backend}\0{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier content-addressed embedding cache.
+
+    An in-process LRU sits in front of a SQLite table of float32 blobs. Both
+    tiers are bounded by item count; the disk tier evicts the least recently
+    used 10% when it overflows.
+    """
+
+    def __init__(self, mem_items: int = MEM_ITEMS, disk_items: int = DISK_ITEMS, path: str = DISK_PATH):
+        self.mem_items = mem_items
+        self.disk_items = disk_items
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._stats = {"hits_mem": 0, "hits_disk": 0, "misses": 0, "evictions_disk": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_count = 0
+        if disk_items > 0:
+            path = os.path.normpath(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _remember(self, key: str, vec: List[float]) -> None:
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_items:
+            self._mem.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            pending = []
+            for k in keys:
+                v = self._mem.get(k)
+                if v is not None:
+                    self._mem.move_to_end(k)
+                    found[k] = v
+                    self._stats["hits_mem"] += 1
+                else:
+                    pending.append(k)
+            if pending and self._db is not None:
+                now = time.time()
+                for i in range(0, len(pending), 500):
+                    part = pending[i:i + 500]
+                    marks = ",".join("?" * len(part))
+                    rows = self._db.execute(f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part).fetchall()
+                    for k, blob in rows:
+                        vec = array("f")
+                        vec.frombytes(blob)
+                        found[k] = vec.tolist()
+                        self._remember(k, found[k])
+                    if rows:
+                        self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k, _ in rows])
+                self._db.commit()
+                self._stats["hits_disk"] += sum(1 for k in pending if k in found)
+            self._stats["misses"] += sum(1 for k in pending if k not in found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            for k, v in items.items():
+                self._remember(k, v)
+            if self._db is None:
+                return
+            now = time.time()
+            cur = self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vec, last_used) VALUES (?, ?, ?)",
+                [(k, array("f", v).tobytes(), now) for k, v in items.items()],
+            )
+            self._disk_count += max(cur.rowcount, 0)
+            if self._disk_count > self.disk_items:
+                drop = self._disk_count - self.disk_items + max(1, self.disk_items // 10)
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (drop,)
+                )
+                self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self._stats["evictions_disk"] += drop
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["mem_items"] = len(self._mem)
+            out["disk_items"] = self._disk_count
+        lookups = out["hits_mem"] + out["hits_disk"] + out["misses"]
+        out["hit_ratio"] = round((out["hits_mem"] + out["hits_disk"]) / lookups, 4) if lookups else 0.0
+        return out
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache, or None when EMBEDDINGS_CACHE is disabled."""
+    global _cache
+    if not ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+                _log.info("Embedding cache ready: mem_items=%d disk_items=%d path=%s", MEM_ITEMS, DISK_ITEMS, DISK_PATH)
+    return _cache
@@ -1,17 +1,34 @@
 import os
+import time
+import random
+import asyncio
 import logging
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Dict, List, Optional, Callable, Tuple
 
-from .openai_client import get_openai
-from .ollama_client import OLLAMA_HOST
+import httpx
 import requests
 
+from .http_pool import get_async_client
+from .openai_client import get_openai, get_async_openai
+from .ollama_client import OLLAMA_HOST, get_ollama_session, keep_alive_for
+from .embedding_cache import get_embedding_cache, cache_key
+from observability.metrics import timer
+
 _log = logging.getLogger(__name__)
 
 # Env configuration
 BACKEND = os.getenv("EMBEDDINGS_BACKEND", "openai").lower()  # openai | ollama
 OPENAI_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
 OLLAMA_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+BATCH_SIZE = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "64"))
+WORKERS = int(os.getenv("EMBEDDINGS_WORKERS", "4"))
+MAX_RETRIES = int(os.getenv("EMBEDDINGS_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("EMBEDDINGS_BACKOFF_BASE", "1.0"))  # seconds
+BACKOFF_MAX = float(os.getenv("EMBEDDINGS_BACKOFF_MAX", "30"))  # seconds
+
+# Whether the Ollama server supports batched POST /api/embed; None until probed
+_ollama_batch_api: Optional[bool] = None
 
 
 def _embed_openai(texts: List[str], model: str = OPENAI_MODEL) -> List[List[float]]:
@@ -21,13 +38,14 @@ def _embed_openai(texts: List[str], model: str = OPENAI_MODEL) -> List[List[floa
     return [item.embedding for item in resp.data]
 
 
-def _embed_ollama(texts: List[str], model: str = OLLAMA_MODEL) -> List[List[float]]:
+def _embed_ollama_legacy(texts: List[str], model: str) -> List[List[float]]:
+    # One request per text against the older /api/embeddings endpoint
     url = f"{OLLAMA_HOST}/api/embeddings"
     vecs: List[List[float]] = []
-    _log.info("Embeddings (ollama): host=%s model=%s batch=%d", OLLAMA_HOST, model, len(texts))
+    session = get_ollama_session()
     for t in texts:
-        payload = {"model": model, "prompt": t}
-        r = requests.post(url, json=payload, timeout=120)
+        payload = {"model": model, "prompt": t, "keep_alive": keep_alive_for(model)}
+        r = session.post(url, json=payload, timeout=120)
         r.raise_for_status()
         data = r.json()
         v = data.get("embedding") or data.get("data", [{}])[0].get("embedding")
@@ -37,24 +55,250 @@ def _embed_ollama(texts: List[str], model: str = OLLAMA_MODEL) -> List[List[floa
     return vecs
 
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+def _embed_ollama(texts: List[str], model: str = OLLAMA_MODEL) -> List[List[float]]:
+    global _ollama_batch_api
+    _log.info("Embeddings (ollama): host=%s model=%s batch=%d", OLLAMA_HOST, model, len(texts))
+    if _ollama_batch_api is False:
+        return _embed_ollama_legacy(texts, model)
+
+    r = get_ollama_session().post(
+        f"{OLLAMA_HOST}/api/embed", json={"model": model, "input": texts, "keep_alive": keep_alive_for(model)}, timeout=120
+    )
+    if r.status_code == 404 and "model" not in r.text.lower():
+        # Server predates /api/embed; remember and use the per-text endpoint from now on
+        _log.info("Ollama /api/embed unavailable; using /api/embeddings")
+        _ollama_batch_api = False
+        return _embed_ollama_legacy(texts, model)
+    r.raise_for_status()
+    _ollama_batch_api = True
+    vecs = r.json().get("embeddings") or []
+    if len(vecs) != len(texts):
+        raise RuntimeError(f"Ollama embeddings: expected {len(texts)} vectors, got {len(vecs)}")
+    return vecs
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(e: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying a failed batch, or None to give up.
+
+    Exponential (with jitter) on 429/5xx and connection errors; a
+    server-provided Retry-After takes precedence over the computed delay.
+    """
+    if attempt >= MAX_RETRIES or not _retryable(e):
+        return None
+    delay = _retry_after(e)
+    if delay is None:
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+    _log.warning("Embedding batch failed (%s); retry %d/%d in %.1fs", e, attempt + 1, MAX_RETRIES, delay)
+    return delay
+
+
+def _with_backoff(fn: Callable[[List[str]], List[List[float]]], texts: List[str]) -> List[List[float]]:
+    attempt = 0
+    while True:
+        try:
+            return fn(texts)
+        except Exception as e:
+            delay = _backoff_delay(e, attempt)
+            if delay is None:
+                raise
+            attempt += 1
+            time.sleep(delay)
+
+
+def _cache_plan(cache, backend: str, model: str, texts: List[str]) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+    """Keys for ``texts``, the vectors already cached, and key -> text for each distinct miss."""
+    keys = [cache_key(backend, model, t) for t in texts]
+    found = cache.get_many(keys) if cache is not None else {}
+    missing: Dict[str, str] = {}
+    for k, t in zip(keys, texts):
+        if k not in found:
+            missing.setdefault(k, t)
+    return keys, found, missing
+
+
+def _cache_fill(cache, keys: List[str], found: Dict[str, List[float]], missing: Dict[str, str], vecs: List[List[float]]) -> List[List[float]]:
+    """Store the freshly embedded misses and return vectors in the order of ``keys``."""
+    fresh = dict(zip(missing.keys(), vecs))
+    if cache is not None:
+        cache.put_many(fresh)
+    found.update(fresh)
+    return [found[k] for k in keys]
+
+
+def _cached(backend: str, model: str, fn: Callable[[List[str]], List[List[float]]], texts: List[str]) -> List[List[float]]:
+    """Serve what the embedding cache has and embed only the misses (each distinct text once)."""
+    cache = get_embedding_cache()
+    keys, found, missing = _cache_plan(cache, backend, model, texts)
+    vecs: List[List[float]] = []
+    if missing:
+        with timer("embed", backend=backend):
+            vecs = _with_backoff(fn, list(missing.values()))
+    return _cache_fill(cache, keys, found, missing, vecs)
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    backend = BACKEND
+    fallback = os.getenv("EMBEDDINGS_FALLBACK", "").lower()
+
+    if backend == "openai":
+        try:
+            return _cached("openai", OPENAI_MODEL, _embed_openai, texts)
+        except Exception as e:
+            _log.exception("OpenAI embeddings failed: %s", e)
+            if fallback == "ollama":
+                _log.info("Falling back to Ollama embeddings...")
+                return _cached("ollama", OLLAMA_MODEL, _embed_ollama, texts)
+            raise
+    elif backend == "ollama":
+        return _cached("ollama", OLLAMA_MODEL, _embed_ollama, texts)
+    else:
+        raise ValueError(f"Unsupported EMBEDDINGS_BACKEND={backend}")
+
+
+def embed_texts(texts: List[str], batch_size: Optional[int] = None, workers: Optional[int] = None) -> List[List[float]]:
     """Return embeddings. Honors EMBEDDINGS_BACKEND and falls back if configured.
     Set EMBEDDINGS_BACKEND=openai|ollama.
     Optionally set EMBEDDINGS_FALLBACK=ollama to try Ollama if OpenAI fails.
+
+    Vectors are served from the shared embedding cache when possible.
+    Inputs are split into batches of ``batch_size`` (EMBEDDINGS_BATCH_SIZE) and
+    up to ``workers`` (EMBEDDINGS_WORKERS) batches run concurrently. Output
+    order always matches input order.
     """
+    batch_size = max(1, int(batch_size or BATCH_SIZE))
+    workers = max(1, int(workers or WORKERS))
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if len(batches) <= 1 or workers == 1:
+        out: List[List[float]] = []
+        for b in batches:
+            out.extend(_embed_batch(b))
+        return out
+
+    _log.info("Embedding %d texts in %d batches (batch_size=%d workers=%d)", len(texts), len(batches), batch_size, workers)
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches)), thread_name_prefix="embed") as pool:
+        # map() yields results in submission order, so reassembly is order-preserving
+        results = pool.map(_embed_batch, batches)
+        out = []
+        for vecs in results:
+            out.extend(vecs)
+    return out
+
+
+# Async variants for the ASGI path: same batching, caching, backoff and fallback, on httpx.AsyncClient
+
+
+async def _aembed_openai(texts: List[str], model: str = OPENAI_MODEL) -> List[List[float]]:
+    _log.info("Embeddings (openai, async): model=%s, batch=%d", model, len(texts))
+    resp = await get_async_openai().embeddings.create(model=model, input=texts)
+    return [item.embedding for item in resp.data]
+
+
+async def _aembed_ollama(texts: List[str], model: str = OLLAMA_MODEL) -> List[List[float]]:
+    global _ollama_batch_api
+    _log.info("Embeddings (ollama, async): host=%s model=%s batch=%d", OLLAMA_HOST, model, len(texts))
+    client = get_async_client("ollama", retries=2)
+    if _ollama_batch_api is not False:
+        r = await client.post(
+            f"{OLLAMA_HOST}/api/embed", json={"model": model, "input": texts, "keep_alive": keep_alive_for(model)}, timeout=120
+        )
+        if not (r.status_code == 404 and "model" not in r.text.lower()):
+            r.raise_for_status()
+            _ollama_batch_api = True
+            vecs = r.json().get("embeddings") or []
+            if len(vecs) != len(texts):
+                raise RuntimeError(f"Ollama embeddings: expected {len(texts)} vectors, got {len(vecs)}")
+            return vecs
+        _log.info("Ollama /api/embed unavailable; using /api/embeddings")
+        _ollama_batch_api = False
+
+    # Per-text requests, at most EMBEDDINGS_WORKERS at a time like the threaded path
+    sem = asyncio.Semaphore(max(1, WORKERS))
+
+    async def one(t: str) -> List[float]:
+        async with sem:
+            r = await client.post(
+                f"{OLLAMA_HOST}/api/embeddings", json={"model": model, "prompt": t, "keep_alive": keep_alive_for(model)}, timeout=120
+            )
+        r.raise_for_status()
+        data = r.json()
+        v = data.get("embedding") or data.get("data", [{}])[0].get("embedding")
+        if not v:
+            raise RuntimeError("Ollama embeddings: missing 'embedding' in response")
+        return v
+
+    return list(await asyncio.gather(*(one(t) for t in texts)))
+
+
+async def _awith_backoff(fn: Callable[[List[str]], Awaitable[List[List[float]]]], texts: List[str]) -> List[List[float]]:
+    attempt = 0
+    while True:
+        try:
+            return await fn(texts)
+        except Exception as e:
+            delay = _backoff_delay(e, attempt)
+            if delay is None:
+                raise
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+async def _acached(
+    backend: str, model: str, fn: Callable[[List[str]], Awaitable[List[List[float]]]], texts: List[str]
+) -> List[List[float]]:
+    cache = get_embedding_cache()
+    keys, found, missing = _cache_plan(cache, backend, model, texts)
+    vecs: List[List[float]] = []
+    if missing:
+        with timer("embed", backend=backend):
+            vecs = await _awith_backoff(fn, list(missing.values()))
+    return _cache_fill(cache, keys, found, missing, vecs)
+
+
+async def _aembed_batch(texts: List[str]) -> List[List[float]]:
     backend = BACKEND
     fallback = os.getenv("EMBEDDINGS_FALLBACK", "").lower()
 
     if backend == "openai":
         try:
-            return _embed_openai(texts)
+            return await _acached("openai", OPENAI_MODEL, _aembed_openai, texts)
         except Exception as e:
             _log.exception("OpenAI embeddings failed: %s", e)
             if fallback == "ollama":
                 _log.info("Falling back to Ollama embeddings...")
-                return _embed_ollama(texts)
+                return await _acached("ollama", OLLAMA_MODEL, _aembed_ollama, texts)
             raise
     elif backend == "ollama":
-        return _embed_ollama(texts)
+        return await _acached("ollama", OLLAMA_MODEL, _aembed_ollama, texts)
     else:
         raise ValueError(f"Unsupported EMBEDDINGS_BACKEND={backend}")
+
+
+async def aembed_texts(texts: List[str], batch_size: Optional[int] = None, workers: Optional[int] = None) -> List[List[float]]:
+    """``embed_texts`` for coroutines: up to ``workers`` batches in flight on the event loop, output in input order."""
+    batch_size = max(1, int(batch_size or BATCH_SIZE))
+    sem = asyncio.Semaphore(max(1, int(workers or WORKERS)))
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    async def run(b: List[str]) -> List[List[float]]:
+        async with sem:
+            return await _aembed_batch(b)
+
+    out: List[List[float]] = []
+    for vecs in await asyncio.gather(*(run(b) for b in batches)):
+        out.extend(vecs)
+    return out
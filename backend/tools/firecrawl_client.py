@@ -1,8 +1,12 @@
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
+import httpx
 import requests
 
+from .http_pool import get_session, get_async_client
+from observability.metrics import timer
+
 _log = logging.getLogger(__name__)
 
 
@@ -11,7 +15,7 @@ class FirecrawlClient:
         self.api_key = api_key
         self.base_url = "https://api.firecrawl.dev"
         self.timeout = 25
-        self._session = requests.Session()
+        self._session = get_session("firecrawl")
 
     def _headers(self) -> Dict[str, str]:
         return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
@@ -30,35 +34,67 @@ class FirecrawlClient:
         if not self.api_key:
             _log.warning("Firecrawl API key missing; skipping web search")
             return []
-        payload = {"query": query, "limit": limit}
+        with timer("firecrawl"):
+            return self._search(query, limit)
+
+    def _results(self, r, label: str) -> Optional[List[Dict[str, Any]]]:
+        # Works on requests and httpx responses alike
+        if r.status_code == 200:
+            data = r.json()
+            items = data.get("results") or data.get("data") or []
+            out = self._normalize(items)
+            _log.info("Firecrawl (%s) returned %d results", label, len(out))
+            return out
+        _log.warning("Firecrawl %s /v1/search non-200: %s %s", label, r.status_code, r.text[:300])
+        return None
+
+    def _search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        url = f"{self.base_url}/v1/search"
         try:
             # Prefer POST /v1/search with JSON body
-            url = f"{self.base_url}/v1/search"
-            r = self._session.post(url, json=payload, headers=self._headers(), timeout=self.timeout)
-            if r.status_code == 200:
-                data = r.json()
-                items = data.get("results") or data.get("data") or []
-                out = self._normalize(items)
-                _log.info("Firecrawl returned %d results", len(out))
+            r = self._session.post(url, json={"query": query, "limit": limit}, headers=self._headers(), timeout=self.timeout)
+            out = self._results(r, "POST")
+            if out is not None:
                 return out
-            else:
-                _log.warning("Firecrawl POST /v1/search non-200: %s %s", r.status_code, r.text[:300])
         except requests.RequestException as e:
             _log.exception("Firecrawl POST /v1/search failed: %s", e)
 
         # Fallback: GET with query params if POST path not available
         try:
-            url = f"{self.base_url}/v1/search"
             r = self._session.get(url, params={"q": query, "limit": limit}, headers=self._headers(), timeout=self.timeout)
-            if r.status_code == 200:
-                data = r.json()
-                items = data.get("results") or data.get("data") or []
-                out = self._normalize(items)
-                _log.info("Firecrawl (GET fallback) returned %d results", len(out))
+            out = self._results(r, "GET")
+            if out is not None:
                 return out
-            else:
-                _log.warning("Firecrawl GET /v1/search non-200: %s %s", r.status_code, r.text[:300])
         except requests.RequestException as e:
             _log.exception("Firecrawl GET /v1/search failed: %s", e)
 
         return []
+
+    async def asearch_and_extract(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """``search_and_extract`` on the shared httpx.AsyncClient."""
+        if not self.api_key:
+            _log.warning("Firecrawl API key missing; skipping web search")
+            return []
+        with timer("firecrawl"):
+            return await self._asearch(query, limit)
+
+    async def _asearch(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        client = get_async_client("firecrawl")
+        url = f"{self.base_url}/v1/search"
+        try:
+            r = await client.post(url, json={"query": query, "limit": limit}, headers=self._headers(), timeout=self.timeout)
+            out = self._results(r, "POST")
+            if out is not None:
+                return out
+        except httpx.HTTPError as e:
+            _log.exception("Firecrawl POST /v1/search failed: %s", e)
+
+        try:
+            r = await client.get(url, params={"q": query, "limit": limit}, headers=self._headers(), timeout=self.timeout)
+            out = self._results(r, "GET")
+            if out is not None:
+                return out
+        except httpx.HTTPError as e:
+            _log.exception("Firecrawl GET /v1/search failed: %s", e)
+
+        return []
@@ -0,0 +1,151 @@
+import os
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_log = logging.getLogger(__name__)
+
+# Env configuration
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # distinct hosts kept per session
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))  # keep-alive connections per host
+POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "false").lower() in ("1", "true", "yes")
+KEEPALIVE = os.getenv("HTTP_KEEPALIVE", "true").lower() in ("1", "true", "yes")
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))  # seconds, httpx clients only
+RETRY_TOTAL = int(os.getenv("HTTP_RETRY_TOTAL", "2"))
+RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "1.5"))
+
+_sessions: Dict[str, requests.Session] = {}
+_async_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def default_retry(allowed_methods=("GET", "POST")) -> Retry:
+    return Retry(
+        total=RETRY_TOTAL,
+        read=RETRY_TOTAL,
+        connect=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=allowed_methods,
+        raise_on_status=False,
+    )
+
+
+def _build(retry: Retry) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=POOL_BLOCK,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not KEEPALIVE:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def get_session(name: str, retry: Optional[Retry] = None) -> requests.Session:
+    """Return the shared pooled session registered under ``name``.
+
+    Sessions are created once per name and reused by every caller, so
+    connections stay open across requests instead of being re-established.
+    The retry policy only applies when the session is first created.
+    """
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _build(retry or default_retry())
+            _sessions[name] = session
+            _log.info(
+                "HTTP pool created: name=%s pool_connections=%d pool_maxsize=%d block=%s keepalive=%s",
+                name, POOL_CONNECTIONS, POOL_MAXSIZE, POOL_BLOCK, KEEPALIVE,
+            )
+    return session
+
+
+def httpx_limits():
+    """Connection limits for httpx-based clients (e.g. the OpenAI SDK), from the same env."""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+        max_keepalive_connections=POOL_MAXSIZE if KEEPALIVE else 0,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def get_async_client(name: str, retries: int = RETRY_TOTAL):
+    """Shared ``httpx.AsyncClient`` registered under ``name``, for the async serving path.
+
+    Clients are bound to the event loop that first uses them; the ASGI app
+    runs one loop per process and closes them on shutdown (``aclose_all``).
+    ``retries`` only covers failed connection attempts.
+    """
+    import httpx
+
+    client = _async_clients.get(name)
+    if client is not None and not client.is_closed:
+        return client
+    with _lock:
+        client = _async_clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(limits=httpx_limits(), retries=retries))
+            _async_clients[name] = client
+            _log.info("Async HTTP client created: name=%s max_connections=%d keepalive=%s", name, POOL_CONNECTIONS * POOL_MAXSIZE, KEEPALIVE)
+    return client
+
+
+async def aclose_all() -> None:
+    """Close every async client, including the one under AsyncOpenAI."""
+    with _lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Per-session, per-host connection counters.
+
+    ``connections`` is how many sockets urllib3 has opened for the host and
+    ``requests`` how many requests went through them; their ratio shows how
+    well keep-alive connections are being reused.
+    """
+    out: Dict[str, Any] = {}
+    with _lock:
+        items = list(_sessions.items())
+    for name, session in items:
+        hosts: Dict[str, Any] = {}
+        adapters = {id(a): a for a in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened = getattr(pool, "num_connections", 0)
+                served = getattr(pool, "num_requests", 0)
+                hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                    "connections": opened,
+                    "requests": served,
+                    "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                    "reuse_ratio": round(1 - opened / served, 4) if served else 0.0,
+                }
+        out[name] = hosts
+    return out
+
+
+def close_all() -> None:
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,267 @@
+import os
+import time
+import asyncio
+import itertools
+import threading
+import logging
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from observability.metrics import LLM_QUEUE_DEPTH, LLM_IN_FLIGHT, LLM_QUEUE_WAIT, LLM_SHED
+
+_log = logging.getLogger(__name__)
+
+# Env configuration
+MAX_IN_FLIGHT = int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "2"))  # concurrent calls per model per host
+MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "16"))  # interactive calls waiting per model before shedding
+QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "30"))  # seconds an interactive call may wait
+HOST_COOLDOWN = float(os.getenv("OLLAMA_HOST_COOLDOWN", "30"))  # seconds a host is skipped after a connection error
+
+# Lower rank is served first. Only interactive calls are shed; batch and eval work waits its turn.
+PRIORITIES = {"interactive": 0, "batch": 1, "eval": 2}
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+
+
+@contextmanager
+def llm_priority(name: str):
+    """Run the Ollama calls made by the enclosed block (this thread, or this asyncio task) at priority ``name``."""
+    if name not in PRIORITIES:
+        raise ValueError(f"priority must be one of: {', '.join(PRIORITIES)}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LLMOverloaded(RuntimeError):
+    """Raised instead of queueing a call that would wait too long; maps to HTTP 503."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("model", "priority", "rank", "seq", "host", "future", "loop")
+
+    def __init__(self, model: str, priority: str, seq: int):
+        self.model = model
+        self.priority = priority
+        self.rank = PRIORITIES[priority]
+        self.seq = seq
+        self.host: Optional[str] = None
+        # Set for waiters on an event loop (aslot); thread waiters use the condition instead
+        self.future: Optional["asyncio.Future"] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _resolve(fut: "asyncio.Future", host: str) -> None:
+    if not fut.done():
+        fut.set_result(host)
+
+
+class LLMScheduler:
+    """Client-side admission control for Ollama generate calls.
+
+    Each (host, model) pair has ``max_in_flight`` slots. A call takes the free
+    slot on the least busy healthy host, or queues; freed slots go to waiters
+    by priority, then arrival. Interactive calls are rejected with
+    ``LLMOverloaded`` when ``max_queue`` interactive calls for the model are
+    already waiting, or after ``queue_timeout`` seconds in the queue.
+    Threads use ``slot`` and coroutines ``aslot``; both draw on the same slots.
+    """
+
+    def __init__(
+        self,
+        hosts: List[str],
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_queue: int = MAX_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+    ):
+        if not hosts:
+            raise ValueError("at least one Ollama host is required")
+        self.hosts = list(hosts)
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._down_until: Dict[str, float] = {}
+        self._waiting: List[_Waiter] = []
+        self._hold_ewma: Dict[str, float] = {}  # seconds a slot is held, per model
+        self._seq = itertools.count()
+        self._rr = itertools.count()
+        self._cond = threading.Condition()
+
+    def _free_host(self, model: str) -> Optional[str]:
+        now = time.monotonic()
+        healthy = [h for h in self.hosts if self._down_until.get(h, 0.0) <= now] or self.hosts
+        # Rotate the start so equally busy hosts take turns
+        start = next(self._rr) % len(healthy)
+        best, best_n = None, self.max_in_flight
+        for h in healthy[start:] + healthy[:start]:
+            n = self._in_flight.get((h, model), 0)
+            if n < best_n:
+                best, best_n = h, n
+        return best
+
+    def _grant(self, host: str, model: str) -> None:
+        n = self._in_flight.get((host, model), 0) + 1
+        self._in_flight[(host, model)] = n
+        LLM_IN_FLIGHT.set(n, host=host, model=model)
+
+    def _publish_depth(self, model: str) -> None:
+        for priority in PRIORITIES:
+            depth = sum(1 for w in self._waiting if w.model == model and w.priority == priority)
+            LLM_QUEUE_DEPTH.set(depth, model=model, priority=priority)
+
+    def _dispatch(self) -> None:
+        granted = False
+        for w in sorted(self._waiting, key=lambda w: (w.rank, w.seq)):
+            host = self._free_host(w.model)
+            if host is not None:
+                w.host = host
+                self._grant(host, w.model)
+                self._waiting.remove(w)
+                self._publish_depth(w.model)
+                if w.future is not None:
+                    w.loop.call_soon_threadsafe(_resolve, w.future, host)
+                granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _retry_after(self, model: str) -> int:
+        # Rough time until the queue ahead drains at the current service rate
+        slots = self.max_in_flight * len(self.hosts)
+        depth = sum(1 for w in self._waiting if w.model == model)
+        return max(1, int(round(self._hold_ewma.get(model, 5.0) * (depth + 1) / slots)))
+
+    def _shed(self, model: str, priority: str, reason: str) -> LLMOverloaded:
+        LLM_SHED.inc(model=model, priority=priority, reason=reason)
+        retry_after = self._retry_after(model)
+        _log.warning("Ollama call shed: model=%s priority=%s reason=%s retry_after=%ds", model, priority, reason, retry_after)
+        return LLMOverloaded(f"LLM overloaded ({reason}); retry in {retry_after}s", retry_after)
+
+    def _check_queue(self, model: str, priority: str) -> None:
+        if priority != "interactive" or self.max_queue <= 0:
+            return
+        depth = sum(1 for w in self._waiting if w.model == model and w.rank == 0)
+        if depth >= self.max_queue:
+            raise self._shed(model, priority, "queue_full")
+
+    def admit(self, model: str, priority: Optional[str] = None) -> None:
+        """Raise ``LLMOverloaded`` now if a call for ``model`` would be shed, before any other work is done."""
+        with self._cond:
+            self._check_queue(model, priority or _priority.get())
+
+    def _enter(self, model: str, priority: str) -> Tuple[Optional[str], Optional[_Waiter]]:
+        # Caller holds the condition. Returns a granted host, or the queued waiter.
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of: {', '.join(PRIORITIES)}")
+        self._check_queue(model, priority)
+        ahead = any(w.model == model and w.rank <= PRIORITIES[priority] for w in self._waiting)
+        host = None if ahead else self._free_host(model)
+        if host is not None:
+            self._grant(host, model)
+            return host, None
+        w = _Waiter(model, priority, next(self._seq))
+        self._waiting.append(w)
+        self._publish_depth(model)
+        return None, w
+
+    def _timeout(self, priority: str) -> Optional[float]:
+        return self.queue_timeout if priority == "interactive" and self.queue_timeout > 0 else None
+
+    def _abandon(self, w: _Waiter) -> Optional[str]:
+        # Caller holds the condition. Dequeue a waiter that gave up; returns its host if it was granted meanwhile.
+        if w.host is None:
+            self._waiting.remove(w)
+            self._publish_depth(w.model)
+        return w.host
+
+    def _release(self, host: str, model: str, held: Optional[float]) -> None:
+        # held=None: the slot was never used, so it says nothing about service time
+        with self._cond:
+            n = self._in_flight[(host, model)] - 1
+            self._in_flight[(host, model)] = n
+            LLM_IN_FLIGHT.set(n, host=host, model=model)
+            if held is not None:
+                prev = self._hold_ewma.get(model)
+                self._hold_ewma[model] = held if prev is None else 0.8 * prev + 0.2 * held
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, model: str, priority: Optional[str] = None) -> Iterator[str]:
+        """Hold a slot for one call to ``model``; yields the host to send it to."""
+        priority = priority or _priority.get()
+        start = time.monotonic()
+        with self._cond:
+            host, w = self._enter(model, priority)
+            timeout = self._timeout(priority)
+            while host is None and w.host is None:
+                remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                if remaining is not None and remaining <= 0:
+                    self._abandon(w)
+                    raise self._shed(model, priority, "queue_timeout")
+                self._cond.wait(remaining)
+            host = host or w.host
+        acquired = time.monotonic()
+        LLM_QUEUE_WAIT.observe(acquired - start, model=model, priority=priority)
+        try:
+            yield host
+        finally:
+            self._release(host, model, time.monotonic() - acquired)
+
+    @asynccontextmanager
+    async def aslot(self, model: str, priority: Optional[str] = None) -> AsyncIterator[str]:
+        """``slot`` for coroutines: waits on a future instead of blocking the event loop."""
+        priority = priority or _priority.get()
+        start = time.monotonic()
+        with self._cond:
+            host, w = self._enter(model, priority)
+            if w is not None:
+                w.loop = asyncio.get_running_loop()
+                w.future = w.loop.create_future()
+        if host is None:
+            try:
+                host = await asyncio.wait_for(asyncio.shield(w.future), self._timeout(priority))
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._cond:
+                    host = self._abandon(w)
+                if host is not None:
+                    # Granted just as we gave up: hand the slot back
+                    self._release(host, model, None)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                with self._cond:
+                    raise self._shed(model, priority, "queue_timeout") from None
+        acquired = time.monotonic()
+        LLM_QUEUE_WAIT.observe(acquired - start, model=model, priority=priority)
+        try:
+            yield host
+        finally:
+            self._release(host, model, time.monotonic() - acquired)
+
+    def mark_down(self, host: str) -> None:
+        """Skip ``host`` for HOST_COOLDOWN seconds while other hosts are available."""
+        if len(self.hosts) < 2:
+            return
+        with self._cond:
+            self._down_until[host] = time.monotonic() + HOST_COOLDOWN
+        _log.warning("Ollama host %s marked down for %.0fs", host, HOST_COOLDOWN)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "in_flight": {f"{h} {m}": n for (h, m), n in sorted(self._in_flight.items()) if n},
+                "waiting": {
+                    p: sum(1 for w in self._waiting if w.priority == p) for p in PRIORITIES
+                },
+                "hosts_down": [h for h, t in self._down_until.items() if t > now],
+            }
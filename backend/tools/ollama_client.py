@@ -1,60 +1,313 @@
 import os
-from typing import Dict, Any
+import json
+import time
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Union
+import threading
+import httpx
 import requests
 import logging
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+from .http_pool import get_session, get_async_client
+from .llm_scheduler import LLMScheduler
+from observability.metrics import record_llm
+
+# One host, or a comma-separated list to spread generate calls over; embeddings use the first
+OLLAMA_HOSTS = [h.strip().rstrip("/") for h in os.getenv("OLLAMA_HOST", "http://localhost:11434").split(",") if h.strip()]
+OLLAMA_HOST = OLLAMA_HOSTS[0]
 OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", "300"))  # seconds
+# How long Ollama keeps a model (and its KV cache) loaded after a call, e.g. "30m";
+# pinned models get -1 and stay resident until the server restarts
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_PINNED_MODELS = [m.strip() for m in os.getenv("OLLAMA_PINNED_MODELS", "").split(",") if m.strip()]
 _log = logging.getLogger(__name__)
 
 
-def generate(model: str, prompt: str, temperature: float = 0.2, max_tokens: int = 1024) -> str:
-    """Calls Ollama non-streaming for a full response."""
-    url = f"{OLLAMA_HOST}/api/generate"
-    payload: Dict[str, Any] = {
+def keep_alive_for(model: str) -> Union[str, int]:
+    if model in OLLAMA_PINNED_MODELS or model.split(":")[0] in OLLAMA_PINNED_MODELS:
+        return -1
+    return OLLAMA_KEEP_ALIVE
+
+
+def _payload(
+    model: str, prompt: str, temperature: float, max_tokens: int, stream: bool, fmt: Optional[Union[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
+        "stream": stream,
+        "keep_alive": keep_alive_for(model),
         "options": {
             "temperature": temperature,
             "num_predict": max_tokens,
         },
     }
-    try:
-        _log.info(
-            "Ollama request: model=%s host=%s len(prompt)=%d num_predict=%d temp=%.2f timeout=%ds",
-            model,
-            OLLAMA_HOST,
-            len(prompt),
-            max_tokens,
-            temperature,
-            OLLAMA_TIMEOUT,
-        )
+    if fmt:
+        # "json", or a JSON schema the output is constrained to (Ollama >= 0.5)
+        payload["format"] = fmt
+    return payload
 
-        # Session with retries on transient failures, including read timeouts
-        session = requests.Session()
-        retry = Retry(
-            total=2,
-            read=2,
-            connect=2,
-            backoff_factor=1.5,
-            status_forcelist=(502, 503, 504),
-            allowed_methods=("POST",),
-            raise_on_status=False,
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
 
-        # Use (connect, read) tuple for timeout
-        r = session.post(url, json=payload, timeout=(15, OLLAMA_TIMEOUT))
+def get_ollama_session() -> requests.Session:
+    # Shared pooled session. Only connection failures are retried: a generation that timed out
+    # or was rejected under load may still be running, and resending it only adds to the load.
+    retry = Retry(
+        total=2,
+        read=0,
+        connect=2,
+        status=0,
+        backoff_factor=1.5,
+        allowed_methods=("GET", "POST"),
+        raise_on_status=False,
+    )
+    return get_session("ollama", retry=retry)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler that every generate call goes through (see tools/llm_scheduler.py)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler(OLLAMA_HOSTS)
+    return _scheduler
+
+
+def _log_usage(prefix: str, data: Dict[str, Any]) -> None:
+    # A prompt_eval_count well below the prompt's token count means Ollama reused a cached prefix
+    _log.info(
+        "%s: tokens=%s prompt_tokens=%s prompt_eval_ms=%.0f load_ms=%.0f",
+        prefix,
+        data.get("eval_count"),
+        data.get("prompt_eval_count"),
+        (data.get("prompt_eval_duration") or 0) / 1e6,
+        (data.get("load_duration") or 0) / 1e6,
+    )
+
+
+def preload_models(models: Optional[List[str]] = None) -> List[str]:
+    """Load ``models`` (default: OLLAMA_PINNED_MODELS) with their keep_alive, so the first request skips the load."""
+    loaded = []
+    session = get_ollama_session()
+    for host, model in [(h, m) for h in OLLAMA_HOSTS for m in (models if models is not None else OLLAMA_PINNED_MODELS)]:
+        # A request without a prompt only loads the model
+        try:
+            r = session.post(
+                f"{host}/api/generate",
+                json={"model": model, "keep_alive": keep_alive_for(model)},
+                timeout=(15, OLLAMA_TIMEOUT),
+            )
+            if r.status_code >= 400:
+                # Embedding-only models reject /api/generate; an empty /api/embed loads them instead
+                r = session.post(
+                    f"{host}/api/embed",
+                    json={"model": model, "input": [], "keep_alive": keep_alive_for(model)},
+                    timeout=(15, OLLAMA_TIMEOUT),
+                )
+            r.raise_for_status()
+            loaded.append(model)
+            _log.info("Ollama model preloaded: %s on %s keep_alive=%s", model, host, keep_alive_for(model))
+        except requests.RequestException as e:
+            _log.warning("Ollama preload failed for %s on %s: %s", model, host, e)
+    return loaded
+
+
+def pull_model(model: str) -> None:
+    """Download ``model`` on every host that lacks it (POST /api/pull); blocks until done."""
+    session = get_ollama_session()
+    for host in OLLAMA_HOSTS:
+        _log.info("Ollama pull: %s on %s", model, host)
+        r = session.post(f"{host}/api/pull", json={"model": model, "stream": False}, timeout=(15, None))
         r.raise_for_status()
-        data = r.json()
-        _log.info("Ollama response received: tokens=%s", data.get("eval_count"))
-        return data.get("response", "")
+
+
+def ping() -> Dict[str, bool]:
+    """Whether each Ollama host answers GET /api/version."""
+    out = {}
+    for host in OLLAMA_HOSTS:
+        try:
+            out[host] = get_ollama_session().get(f"{host}/api/version", timeout=(2, 5)).ok
+        except requests.RequestException:
+            out[host] = False
+    return out
+
+
+def loaded_models() -> List[Dict[str, Any]]:
+    """Models currently resident on each Ollama host (GET /api/ps), with size and expiry."""
+    out = []
+    for host in OLLAMA_HOSTS:
+        r = get_ollama_session().get(f"{host}/api/ps", timeout=(5, 15))
+        r.raise_for_status()
+        out.extend(
+            {
+                "host": host,
+                "name": m.get("name"),
+                "size_vram": m.get("size_vram"),
+                "expires_at": m.get("expires_at"),
+                "pinned": keep_alive_for(m.get("name") or "") == -1,
+            }
+            for m in r.json().get("models") or []
+        )
+    return out
+
+
+def generate(
+    model: str, prompt: str, temperature: float = 0.2, max_tokens: int = 1024, fmt: Optional[Union[str, Dict[str, Any]]] = None
+) -> str:
+    """Calls Ollama non-streaming for a full response. ``fmt`` constrains the output ("json" or a schema).
+
+    Waits for a scheduler slot first; raises ``LLMOverloaded`` if the call is shed.
+    """
+    payload = _payload(model, prompt, temperature, max_tokens, stream=False, fmt=fmt)
+    scheduler = get_scheduler()
+    with scheduler.slot(model) as host:
+        try:
+            _log.info(
+                "Ollama request: model=%s host=%s len(prompt)=%d num_predict=%d temp=%.2f timeout=%ds",
+                model,
+                host,
+                len(prompt),
+                max_tokens,
+                temperature,
+                OLLAMA_TIMEOUT,
+            )
+
+            session = get_ollama_session()
+            start = time.perf_counter()
+            # Use (connect, read) tuple for timeout
+            r = session.post(f"{host}/api/generate", json=payload, timeout=(15, OLLAMA_TIMEOUT))
+            r.raise_for_status()
+            data = r.json()
+            record_llm(model, len(prompt), time.perf_counter() - start, data)
+            _log_usage("Ollama response received", data)
+            return data.get("response", "")
+        except requests.ConnectionError as e:
+            scheduler.mark_down(host)
+            _log.exception("Ollama request failed: %s", e)
+            raise
+        except requests.RequestException as e:
+            _log.exception("Ollama request failed: %s", e)
+            raise
+
+
+def generate_stream(model: str, prompt: str, temperature: float = 0.2, max_tokens: int = 1024) -> Iterator[str]:
+    """Calls Ollama with streaming enabled and yields response tokens as they arrive.
+
+    Ollama emits one JSON object per line; each carries a partial ``response``
+    and the final one has ``done: true`` plus the eval counters.
+    """
+    payload = _payload(model, prompt, temperature, max_tokens, stream=True)
+    scheduler = get_scheduler()
+    # The slot is held until the stream ends or the consumer closes the generator
+    with scheduler.slot(model) as host:
+        yield from _stream(scheduler, host, model, prompt, payload, temperature, max_tokens)
+
+
+def _stream(
+    scheduler: LLMScheduler, host: str, model: str, prompt: str, payload: Dict[str, Any], temperature: float, max_tokens: int
+) -> Iterator[str]:
+    _log.info(
+        "Ollama stream request: model=%s host=%s len(prompt)=%d num_predict=%d temp=%.2f timeout=%ds",
+        model,
+        host,
+        len(prompt),
+        max_tokens,
+        temperature,
+        OLLAMA_TIMEOUT,
+    )
+    session = get_ollama_session()
+    start = time.perf_counter()
+    try:
+        # The read timeout applies between chunks, not to the whole generation
+        with session.post(f"{host}/api/generate", json=payload, timeout=(15, OLLAMA_TIMEOUT), stream=True) as r:
+            r.raise_for_status()
+            for line in r.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(f"Ollama stream error: {data['error']}")
+                token = data.get("response", "")
+                if token:
+                    yield token
+                if data.get("done"):
+                    record_llm(model, len(prompt), time.perf_counter() - start, data)
+                    _log_usage("Ollama stream finished", data)
+                    break
+    except requests.ConnectionError as e:
+        scheduler.mark_down(host)
+        _log.exception("Ollama stream request failed: %s", e)
+        raise
     except requests.RequestException as e:
-        _log.exception("Ollama request failed: %s", e)
+        _log.exception("Ollama stream request failed: %s", e)
         raise
 
+
+def _async_client() -> httpx.AsyncClient:
+    # Connection retries only, like the sync session
+    return get_async_client("ollama", retries=2)
+
+
+def _async_timeout() -> httpx.Timeout:
+    return httpx.Timeout(OLLAMA_TIMEOUT, connect=15)
+
+
+async def agenerate(
+    model: str, prompt: str, temperature: float = 0.2, max_tokens: int = 1024, fmt: Optional[Union[str, Dict[str, Any]]] = None
+) -> str:
+    """``generate`` for coroutines, on the shared httpx.AsyncClient; waits for a slot without holding a thread."""
+    payload = _payload(model, prompt, temperature, max_tokens, stream=False, fmt=fmt)
+    scheduler = get_scheduler()
+    async with scheduler.aslot(model) as host:
+        _log.info("Ollama async request: model=%s host=%s len(prompt)=%d num_predict=%d", model, host, len(prompt), max_tokens)
+        start = time.perf_counter()
+        try:
+            r = await _async_client().post(f"{host}/api/generate", json=payload, timeout=_async_timeout())
+            r.raise_for_status()
+        except httpx.ConnectError as e:
+            scheduler.mark_down(host)
+            _log.exception("Ollama async request failed: %s", e)
+            raise
+        except httpx.HTTPError as e:
+            _log.exception("Ollama async request failed: %s", e)
+            raise
+        data = r.json()
+        record_llm(model, len(prompt), time.perf_counter() - start, data)
+        _log_usage("Ollama async response received", data)
+        return data.get("response", "")
+
+
+async def agenerate_stream(model: str, prompt: str, temperature: float = 0.2, max_tokens: int = 1024) -> AsyncIterator[str]:
+    """``generate_stream`` for coroutines; the slot is held until the stream ends or the generator is closed."""
+    payload = _payload(model, prompt, temperature, max_tokens, stream=True)
+    scheduler = get_scheduler()
+    async with scheduler.aslot(model) as host:
+        _log.info("Ollama async stream request: model=%s host=%s len(prompt)=%d num_predict=%d", model, host, len(prompt), max_tokens)
+        start = time.perf_counter()
+        try:
+            async with _async_client().stream("POST", f"{host}/api/generate", json=payload, timeout=_async_timeout()) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(f"Ollama stream error: {data['error']}")
+                    token = data.get("response", "")
+                    if token:
+                        yield token
+                    if data.get("done"):
+                        record_llm(model, len(prompt), time.perf_counter() - start, data)
+                        _log_usage("Ollama async stream finished", data)
+                        break
+        except httpx.ConnectError as e:
+            scheduler.mark_down(host)
+            _log.exception("Ollama async stream request failed: %s", e)
+            raise
+        except httpx.HTTPError as e:
+            _log.exception("Ollama async stream request failed: %s", e)
+            raise
@@ -1,18 +1,43 @@
 import os
+import threading
 from typing import List
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from .http_pool import httpx_limits, get_async_client, RETRY_TOTAL
 
 _client = None
+_async_client = None
+_async_http = None
+_lock = threading.Lock()
 
 
 def get_openai() -> OpenAI:
     global _client
     if _client is None:
         base = os.getenv("OPENAI_BASE_URL")
-        _client = OpenAI(base_url=base) if base else OpenAI()
+        # One pooled httpx client for the process, sized from the shared HTTP_POOL_* settings
+        http_client = httpx.Client(limits=httpx_limits())
+        kwargs = {"http_client": http_client, "max_retries": RETRY_TOTAL}
+        _client = OpenAI(base_url=base, **kwargs) if base else OpenAI(**kwargs)
     return _client
 
 
+def get_async_openai() -> AsyncOpenAI:
+    """AsyncOpenAI on the shared "openai" async client, which http_pool.aclose_all closes on shutdown."""
+    global _async_client, _async_http
+    # The SDK retries itself, so the transport does not
+    http_client = get_async_client("openai", retries=0)
+    if _async_client is None or http_client is not _async_http:
+        with _lock:
+            if _async_client is None or http_client is not _async_http:
+                base = os.getenv("OPENAI_BASE_URL")
+                kwargs = {"http_client": http_client, "max_retries": RETRY_TOTAL}
+                _async_client = AsyncOpenAI(base_url=base, **kwargs) if base else AsyncOpenAI(**kwargs)
+                _async_http = http_client
+    return _async_client
+
+
 def embed_texts(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
     client = get_openai()
     resp = client.embeddings.create(model=model, input=texts)